@@ -0,0 +1,269 @@
+"""
+    Deterministic synthetic databases at production scale.
+
+    Starts from the shipped database (provinces, municipalities, settings), adds
+    customers with valid DNI/NIE control letters, real province/city pairs taken from
+    ``municipios``, products whose popularity follows a Zipf law, and invoices with
+    their sale lines. The schema is then migrated to the latest version and the change
+    log is emptied, so the result looks like a fully synced production database. The
+    same scale and seed always give the same rows.
+
+    Datasets are cached in benchmarks/datasets/ and reused while GENERATOR_VERSION and the
+    schema version do not change. Usage (from the repository root):
+
+        python benchmarks/generateData.py [1k|100k|1m|number_of_customers ...] [--force]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6 import QtCore, QtSql
+
+from migrations import Migrations
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+SEED = 2024
+GENERATOR_VERSION = "1"
+SETTING_KEY = "bench_generator"
+DATASET_DIR = os.path.join(ROOT, "benchmarks", "datasets")
+
+DNI_LETTERS = "TRWAGMYFPDXBNJZSQVHLCKE"
+NIE_PREFIXES = "XYZ"
+NIE_SHARE = 0.08
+
+NAMES = ["Juan", "María", "José", "Carmen", "Antonio", "Ana", "Manuel", "Laura", "Francisco", "Lucía",
+         "David", "Marta", "Javier", "Elena", "Daniel", "Sara", "Carlos", "Paula", "Miguel", "Cristina",
+         "Alejandro", "Isabel", "Pablo", "Raquel", "Sergio", "Beatriz", "Raúl", "Nuria", "Adrián", "Silvia",
+         "Diego", "Patricia", "Álvaro", "Rosa", "Jorge", "Pilar", "Iván", "Alba", "Rubén", "Noelia"]
+SURNAMES = ["García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez",
+            "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez",
+            "Romero", "Alonso", "Gutiérrez", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos",
+            "Gil", "Ramírez", "Serrano", "Blanco", "Molina", "Morales", "Suárez", "Ortega", "Delgado",
+            "Castro", "Ortiz", "Rubio", "Marín", "Sanz", "Núñez", "Iglesias", "Medina", "Garrido",
+            "Cortés", "Castillo", "Santos", "Lozano", "Guerrero", "Cano", "Prieto", "Méndez", "Cruz",
+            "Calvo", "Gallego", "Vidal", "León", "Márquez", "Herrera", "Peña", "Vega"]
+STREETS = ["Calle Mayor", "Calle Real", "Calle Nueva", "Avenida de la Constitución", "Calle del Sol",
+           "Plaza de España", "Calle de la Iglesia", "Rúa do Príncipe", "Avenida de Madrid", "Calle Luna"]
+PRODUCTS = {
+    "Foods": ["Manzanas", "Pan Integral", "Jamón Serrano", "Aceite de Oliva", "Queso Curado", "Arroz", "Café"],
+    "Furniture": ["Sofá De Esquina", "Mesa Comedor", "Silla Nórdica", "Estantería", "Cama Doble", "Armario"],
+    "Clothes": ["Camiseta Básica", "Pantalón Vaquero", "Chaqueta", "Zapatillas", "Bufanda", "Vestido"],
+    "Electronic": ["Auriculares Inalámbricos", "Teclado", "Ratón", "Monitor", "Altavoz", "Cargador USB"],
+}
+LINES_PER_INVOICE = [1, 2, 3, 4, 5, 6]
+LINES_WEIGHTS = [30, 25, 20, 12, 8, 5]
+
+
+def dniLetter(number):
+    """Control letter of a DNI number, or of a NIE once its prefix is replaced by 0/1/2."""
+    return DNI_LETTERS[number % 23]
+
+
+def makeDni(number):
+    """A valid DNI for a number below 10^8."""
+    return f"{number:08d}{dniLetter(number)}"
+
+
+def makeNie(number):
+    """A valid NIE for a number below 3 * 10^7 (X, Y and Z take 10^7 numbers each)."""
+    return f"{NIE_PREFIXES[number // 10 ** 7]}{number % 10 ** 7:07d}{dniLetter(number)}"
+
+
+def zipfWeights(total, exponent):
+    """Cumulative Zipf weights for random.choices(cum_weights=...): rank 1 is the most popular."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, total + 1)))
+
+
+def formatDate(day):
+    return day.strftime("%d/%m/%Y")
+
+
+def customerRows(rnd, total, places):
+    # Multiplying by a number coprime with the modulus walks the whole range without
+    # repeating, so every DNI, NIE and mobile is unique without keeping a set
+    dnis = nies = 0
+    for index in range(total):
+        if rnd.random() < NIE_SHARE:
+            dni_nie = makeNie((nies * 2_654_437 + 98_765) % (3 * 10 ** 7))
+            nies += 1
+        else:
+            dni_nie = makeDni((dnis * 48_271_043 + 1_234_567) % 10 ** 8)
+            dnis += 1
+        name = rnd.choice(NAMES)
+        first, second = rnd.choice(SURNAMES), rnd.choice(SURNAMES)
+        province, city = rnd.choice(places)
+        yield (dni_nie,
+               formatDate(date(2015, 1, 1) + timedelta(days=rnd.randrange(3650))),
+               f"{first} {second}", name,
+               f"{name}.{first}{index}@example.com".lower(),
+               600_000_000 + (index * 7_919_993 + 4_321) % 10 ** 8,
+               f"{rnd.choice(STREETS)} {rnd.randrange(1, 200)}",
+               province, city,
+               "electronic" if rnd.random() < 0.7 else "paper",
+               "True" if rnd.random() < 0.9 else "False")
+
+
+def productRows(rnd, total):
+    families = list(PRODUCTS)
+    for index in range(total):
+        family = families[index % len(families)]
+        yield (f"{rnd.choice(PRODUCTS[family])} {index + 1:06d}", rnd.randrange(0, 500), family,
+               round(rnd.lognormvariate(2.5, 1.0), 2), "€" if rnd.random() < 0.8 else "$")
+
+
+def generate(path, customers, seed=SEED):
+    """
+        Builds a synthetic database.
+
+        :param path: The file to create, overwritten if it exists.
+        :type path: str
+        :param customers: The number of customers; there are as many invoices, about
+                          2.6 sale lines per invoice and one product per 100 customers.
+        :type customers: int
+        :param seed: The random seed.
+        :type seed: int
+        :return: The number of rows per table.
+        :rtype: dict
+    """
+    rnd = random.Random(seed)
+    shutil.copy(os.path.join(ROOT, "data", "bbdd.sqlite"), path)
+
+    con = sqlite3.connect(path)
+    if con.execute("PRAGMA user_version;").fetchone()[0] != 0:
+        raise RuntimeError("the shipped database is expected at schema version 0")
+    con.execute("PRAGMA journal_mode = OFF;")
+    con.execute("PRAGMA synchronous = OFF;")
+    for table in ("customers", "products", "invoices", "sales"):
+        con.execute(f"DELETE FROM {table};")
+    con.execute("DELETE FROM sqlite_sequence;")
+
+    places = con.execute("SELECT p.provincia, m.municipio FROM municipios m "
+                         "JOIN provincias p ON p.idprov = m.idprov ORDER BY m.idprov, m.idmuni;").fetchall()
+    con.executemany("INSERT INTO customers VALUES (?,?,?,?,?,?,?,?,?,?,?);", customerRows(rnd, customers, places))
+    dni_nies = [row[0] for row in con.execute("SELECT dni_nie FROM customers ORDER BY rowid;")]
+
+    product_count = max(50, customers // 100)
+    con.executemany("INSERT INTO products (name, stock, family, unit_price, currency) VALUES (?,?,?,?,?);",
+                    productRows(rnd, product_count))
+    products = con.execute("SELECT code, name, unit_price FROM products ORDER BY code;").fetchall()
+
+    # Popularity does not follow the code order
+    rnd.shuffle(products)
+    product_weights = zipfWeights(len(products), 1.1)
+    rnd.shuffle(dni_nies)
+    customer_weights = zipfWeights(len(dni_nies), 0.6)
+
+    first_day, days = date(2023, 1, 1), 3 * 365
+    buyers = rnd.choices(dni_nies, cum_weights=customer_weights, k=customers)
+    con.executemany("INSERT INTO invoices (idFac, dni_nie, date) VALUES (?,?,?);", (
+        (number + 1, buyer, formatDate(first_day + timedelta(days=number * days // customers)))
+        for number, buyer in enumerate(buyers)))
+
+    def saleRows():
+        for invoice in range(1, customers + 1):
+            lines = rnd.choices(LINES_PER_INVOICE, weights=LINES_WEIGHTS)[0]
+            for code, name, price in rnd.choices(products, cum_weights=product_weights, k=lines):
+                amount = rnd.randrange(1, 11)
+                yield invoice, code, amount, name, price, round(amount * price, 2)
+
+    con.executemany("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total) "
+                    "VALUES (?,?,?,?,?,?);", saleRows())
+    con.commit()
+    con.close()
+
+    migrate(path)
+
+    con = sqlite3.connect(path)
+    last_seq = con.execute("SELECT coalesce(max(seq), 0) FROM changes;").fetchone()[0]
+    con.execute("DELETE FROM changes;")
+    con.executemany("INSERT OR REPLACE INTO settings (id, value) VALUES (?, ?);",
+                    [("sync_seq", str(last_seq)), (SETTING_KEY, GENERATOR_VERSION)])
+    counts = {table: con.execute(f"SELECT count(*) FROM {table};").fetchone()[0]
+              for table in ("customers", "products", "invoices", "sales")}
+    con.commit()
+    con.close()
+    return counts
+
+
+def migrate(path):
+    """Applies the application migrations with a private Qt connection."""
+    name = "generateData"
+    db = QtSql.QSqlDatabase.addDatabase("QSQLITE", name)
+    db.setDatabaseName(path)
+    try:
+        if not db.open() or not Migrations.migrate(db):
+            raise RuntimeError(f"could not migrate {path}")
+    finally:
+        db.close()
+        del db
+        QtSql.QSqlDatabase.removeDatabase(name)
+
+
+def isCurrent(path):
+    """True if the file was built by this version of the generator and has the latest schema."""
+    if not os.path.exists(path):
+        return False
+    con = sqlite3.connect(path)
+    try:
+        row = con.execute("SELECT value FROM settings WHERE id = ?;", (SETTING_KEY,)).fetchone()
+        version = con.execute("PRAGMA user_version;").fetchone()[0]
+        return row is not None and row[0] == GENERATOR_VERSION and version == Migrations.latestVersion()
+    except sqlite3.Error:
+        return False
+    finally:
+        con.close()
+
+
+def customersFor(scale):
+    """The number of customers of a scale name ("1k", "100k", "1m") or of a plain number."""
+    scale = str(scale).lower()
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+
+def dataset(scale, seed=SEED, force=False):
+    """
+        Returns the path of a cached dataset, generating it first if needed.
+
+        :param scale: "1k", "100k", "1m" or a number of customers.
+        :type scale: str|int
+        :param force: Regenerates the dataset even if it is current.
+        :type force: bool
+        :return: The path of the database file.
+        :rtype: str
+    """
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    path = os.path.join(DATASET_DIR, f"bbdd_{str(scale).lower()}_{seed}.sqlite")
+    if force or not isCurrent(path):
+        partial = f"{path}.partial"
+        generate(partial, customersFor(scale), seed)
+        os.replace(partial, path)
+    return path
+
+
+def main():
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith("-")]
+    force = "--force" in sys.argv[1:]
+    app = QtCore.QCoreApplication(sys.argv)
+
+    for scale in arguments or list(SCALES):
+        start = time.perf_counter()
+        path = dataset(scale, force=force)
+        con = sqlite3.connect(path)
+        counts = ", ".join(f"{table} {con.execute(f'SELECT count(*) FROM {table};').fetchone()[0]}"
+                           for table in ("customers", "products", "invoices", "sales"))
+        con.close()
+        print(f"{scale}: {path} ({counts}) in {time.perf_counter() - start:.1f} s")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
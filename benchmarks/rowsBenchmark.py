@@ -0,0 +1,90 @@
+"""
+    Memory/throughput comparison between the old per-row Python lists and the
+    typed row namedtuples returned by the Connection readers.
+
+    Usage (from the repository root):
+
+        python benchmarks/rowsBenchmark.py [number_of_customers]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6 import QtCore, QtSql
+
+from rows import CustomerRow, columnList, fetchRows
+
+
+def buildDatabase(path, total):
+    """Creates a customers table with ``total`` synthetic rows."""
+    rnd = random.Random(1234)
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE "customers" ("dni_nie" TEXT NOT NULL, "adddata" TEXT, "surname" TEXT, "name" TEXT, '
+                '"mail" TEXT, "mobile" INTEGER, "address" TEXT, "province" TEXT, "city" TEXT, '
+                '"invoicetype" TEXT, "historical" TEXT, PRIMARY KEY("dni_nie"))')
+    con.executemany("INSERT INTO customers VALUES (?,?,?,?,?,?,?,?,?,?,?)", (
+        (f"{i:08d}X", "01/01/2024", f"Surname{rnd.randrange(5000)}", f"Name{i}", f"user{i}@example.com",
+         600000000 + i, f"Calle {i}", "Pontevedra", "Vigo", "electronic", "True")
+        for i in range(total)))
+    con.commit()
+    con.close()
+
+
+def readAsLists(query):
+    rows = []
+    while query.next():
+        rows.append([query.value(i) for i in range(query.record().count())])
+    return rows
+
+
+def readAsRows(query):
+    return fetchRows(query, CustomerRow)
+
+
+def measure(reader, forward_only):
+    query = QtSql.QSqlQuery()
+    query.setForwardOnly(forward_only)
+    query.prepare(f"SELECT {columnList(CustomerRow)} FROM customers ORDER BY surname;")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    query.exec()
+    rows = reader(query)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    query.finish()
+    return len(rows), elapsed, current
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = QtCore.QCoreApplication(sys.argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite")
+        buildDatabase(path, total)
+
+        db = QtSql.QSqlDatabase.addDatabase("QSQLITE")
+        db.setDatabaseName(path)
+        db.open()
+
+        print(f"{'reader':<28}{'rows':>10}{'seconds':>10}{'MiB':>10}")
+        for label, reader, forward_only in (("list per row", readAsLists, False),
+                                            ("CustomerRow (fetchRows)", readAsRows, True)):
+            count, elapsed, memory = measure(reader, forward_only)
+            print(f"{label:<28}{count:>10}{elapsed:>10.3f}{memory / 2 ** 20:>10.1f}")
+
+        db.close()
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
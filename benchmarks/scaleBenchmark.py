@@ -0,0 +1,288 @@
+"""
+    Scale benchmark of every Connection reader and writer and of every table population.
+
+    Runs each operation a few times against the synthetic databases built by
+    generateData.py (1k, 100k and 1M customers by default) and reports min, median and
+    max latencies. Every scale works on a copy of the cached dataset, so the writers do
+    not change it. The customer cache is disabled and the product catalog is emptied
+    before every catalog read, so the timings are those of the SQL path. The table
+    populations run synchronously on the GUI thread, without the background executor.
+
+    Usage (from the repository root):
+
+        python benchmarks/scaleBenchmark.py [1k|100k|1m|number_of_customers ...]
+                                            [--repeat=N] [--json=results.json]
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6 import QtCore, QtSql, QtWidgets
+
+import generateData
+
+import globals
+from connection import Connection
+from customerCache import CustomerCache
+from customers import Customers
+from invoice import Invoice
+from productCatalog import ProductCatalog
+from products import Products
+from queryStats import QueryStats
+from repository import Repository
+from window import Ui_window
+
+DEFAULT_REPEAT = 5
+
+
+class Field:
+    """Stands in for the form widgets the Connection writers read with text()."""
+    def __init__(self, value):
+        self.value = value
+
+    def text(self):
+        return str(self.value)
+
+
+def measure(action, repeat, setup=None):
+    """
+        Times ``action`` ``repeat`` times.
+
+        :param action: Called with the arguments returned by ``setup`` for every run.
+        :param setup: Untimed, called with the run number before every run.
+        :return: {"runs", "min_ms", "median_ms", "max_ms"}
+        :rtype: dict
+    """
+    samples = []
+    for run in range(repeat):
+        args = setup(run) if setup is not None else ()
+        start = time.perf_counter()
+        action(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"runs": repeat, "min_ms": min(samples), "median_ms": statistics.median(samples), "max_ms": max(samples)}
+
+
+def customerFields(number, province="Madrid", city="Madrid"):
+    """Form fields of a benchmark customer; the DNI does not collide with the generated ones."""
+    return [Field(value) for value in (
+        generateData.makeNie(29_000_000 + number), "01/01/2026", "Bench Mark", f"Run{number}",
+        f"bench{number}@example.com", 799_000_000 + number, "Calle Bench 1", province, city)] + ["paper"]
+
+
+def readers(fixtures):
+    customer, product, invoice = fixtures["customer"], fixtures["product"], fixtures["invoice"]
+
+    def coldProducts():
+        ProductCatalog.invalidate()
+        return Connection.getProducts()
+
+    def secondCustomerPage():
+        _, cursor = Connection.getCustomersPage(True, None, 500)
+        return Connection.getCustomersPage(True, cursor, 500)
+
+    def secondInvoicePage():
+        _, cursor = Connection.getInvoicesPage(None, 500)
+        return Connection.getInvoicesPage(cursor, 500)
+
+    return [
+        ("getProvinces", Connection.getProvinces),
+        ("getCities", lambda: Connection.getCities(customer.province)),
+        ("getCustomers(historical=True)", lambda: Connection.getCustomers(True)),
+        ("getCustomers(historical=False)", lambda: Connection.getCustomers(False)),
+        ("getCustomersPage(first)", lambda: Connection.getCustomersPage(True, None, 500)),
+        ("getCustomersPage(second)", secondCustomerPage),
+        ("iterCustomers", lambda: sum(1 for _ in Connection.iterCustomers(True))),
+        ("getCustomerData(dni)", lambda: Connection.getCustomerData(customer.dni_nie, "dni")),
+        ("getCustomerData(phone)", lambda: Connection.getCustomerData(customer.mobile, "phone")),
+        ("getSetting", lambda: Connection.getSetting("theme")),
+        ("getSettings", Connection.getSettings),
+        ("getProducts(cold)", coldProducts),
+        ("getProducts(cached)", Connection.getProducts),
+        ("getProductData", lambda: Connection.getProductData(product.name)),
+        ("getProductFamilies", Connection.getProductFamilies),
+        ("search", lambda: Connection.search(f"{customer.surname.split()[0]} {customer.name[:2]}", None, 20)),
+        ("getAllInvoices", Connection.getAllInvoices),
+        ("getInvoicesPage(first)", lambda: Connection.getInvoicesPage(None, 500)),
+        ("getInvoicesPage(second)", secondInvoicePage),
+        ("iterInvoices", lambda: sum(1 for _ in Connection.iterInvoices())),
+        ("getSale", lambda: Connection.getSale(invoice.idFac)),
+        ("getInvoiceTotals", lambda: Connection.getInvoiceTotals(invoice.idFac)),
+        ("getStockShortages", lambda: Connection.getStockShortages([(product.code, 1), (product.code + 1, 10**6)])),
+        ("getRevenueByFamily(quarter)", lambda: Connection.getRevenueByFamily("2025-07-01", "2025-09-30")),
+        ("getRevenueByDay(quarter)", lambda: Connection.getRevenueByDay("2025-07-01", "2025-09-30")),
+        ("getTopProducts(quarter)", lambda: Connection.getTopProducts("2025-07-01", "2025-09-30", 10)),
+        ("getTopCustomers(quarter)", lambda: Connection.getTopCustomers("2025-07-01", "2025-09-30", 10)),
+    ]
+
+
+def writers(fixtures):
+    customer, product = fixtures["customer"], fixtures["product"]
+    line = [product.code, 1, product.name, product.unit_price, product.unit_price]
+    invoices = {}
+
+    def newInvoice(run):
+        Connection.addInvoice([customer.dni_nie, "01/01/2026"])
+        invoices[run] = Connection.getInvoicesPage(None, 1)[0][0].idFac
+        return invoices[run],
+
+    def invoiceWithSales(run):
+        id_factura, = newInvoice(run)
+        Connection.saveSales(id_factura, [line, line])
+        return id_factura,
+
+    return [
+        ("addCustomer", lambda fields: Connection.addCustomer(fields),
+         lambda run: (customerFields(1000 + run, customer.province, customer.city),)),
+        ("setCustomerData", lambda fields: Connection.setCustomerData(fields),
+         lambda run: (customerFields(1000 + run, customer.province, customer.city) + ["False"],)),
+        ("deleteCustomer", lambda dni: Connection.deleteCustomer(dni),
+         lambda run: (customerFields(1000 + run)[0].text(),)),
+        ("saveSettings", lambda run: Connection.saveSettings([("bench_run", str(run))]), lambda run: (run,)),
+        ("addProduct", lambda name: Connection.addProduct([Field(value) for value in (name, 10, "Foods", 1.5, "€")]),
+         lambda run: (f"Bench new product {run}",)),
+        ("setProductData", lambda name: Connection.setProductData(
+            [Field(value) for value in (name, 9, "Foods", 1.75, "€")]), lambda run: (f"Bench new product {run}",)),
+        ("updateStockProductData", lambda code: Connection.updateStockProductData([code, 100]),
+         lambda run: (product.code,)),
+        ("reserveStock", lambda code: Connection.reserveStock([(code, 1)]), lambda run: (product.code,)),
+        ("deleteProduct", lambda name: Connection.deleteProduct(name), lambda run: (f"Bench new product {run}",)),
+        ("addInvoice", lambda: Connection.addInvoice([customer.dni_nie, "01/01/2026"]), None),
+        ("saveSales(2 lines)", lambda id_factura: Connection.saveSales(id_factura, [line, line]), newInvoice),
+        ("addSale", lambda id_factura: Connection.addSale([id_factura] + line), newInvoice),
+        ("deleteSale", lambda id_factura: Connection.deleteSale(id_factura), invoiceWithSales),
+        ("deleteInvoice", lambda id_factura: Connection.deleteInvoice(id_factura), newInvoice),
+        ("deleteInvoiceAndSale", lambda id_factura: Connection.deleteInvoiceAndSale(id_factura), invoiceWithSales),
+        ("checkpoint", Connection.checkpoint, None),
+        ("rebuildSearchIndex", Connection.rebuildSearchIndex, None),
+        ("rebuildSalesCubes", Connection.rebuildSalesCubes, None),
+    ]
+
+
+def tables():
+    def coldProducts():
+        ProductCatalog.invalidate()
+        Products.setTableData()
+
+    return [
+        ("Customers.setTableData(historical=True)", lambda: Customers.setTableData(True)),
+        ("Customers.setTableData(historical=False)", lambda: Customers.setTableData(False)),
+        ("Products.setTableData(cold)", coldProducts),
+        ("Products.setTableData(cached)", Products.setTableData),
+        ("Invoice.setTableFacturaData", Invoice.setTableFacturaData),
+    ]
+
+
+def fixtures():
+    """A customer, a product and an invoice of the dataset, picked deterministically."""
+    customer = Connection.getCustomersPage(True, None, 1)[0][0]
+    products = Connection.getProducts()
+    invoice = Connection.getInvoicesPage(None, 1)[0][0]
+    return {"customer": customer, "product": products[len(products) // 2], "invoice": invoice}
+
+
+def runScale(scale, repeat):
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "bbdd.sqlite")
+        shutil.copy(generateData.dataset(scale), path)
+        Connection.DB_PATH = path
+        if not Connection.db_connection():
+            raise RuntimeError(f"could not open the {scale} dataset")
+        QueryStats.configure(-1)
+        CustomerCache.configure(0)
+
+        query = QtSql.QSqlQuery()
+        counts = {}
+        for table in ("customers", "products", "invoices", "sales"):
+            query.exec(f"SELECT count(*) FROM {table};")
+            query.next()
+            counts[table] = int(query.value(0))
+        query.finish()
+
+        data = fixtures()
+        results = {"rows": counts, "readers": {}, "writers": {}, "tables": {}}
+        for label, action in readers(data):
+            results["readers"][f"Connection.{label}"] = measure(action, repeat)
+        for label, action, setup in writers(data):
+            results["writers"][f"Connection.{label}"] = measure(action, repeat, setup)
+        for label, action in tables():
+            results["tables"][label] = measure(action, repeat)
+
+        Connection.db_close()
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def environment():
+    """The versions the timings depend on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    db = QtSql.QSqlDatabase.addDatabase("QSQLITE", "environment")
+    db.setDatabaseName(":memory:")
+    db.open()
+    query = QtSql.QSqlQuery(db)
+    query.exec("SELECT sqlite_version();")
+    sqlite_version = query.value(0) if query.next() else None
+    del query
+    db.close()
+    del db
+    QtSql.QSqlDatabase.removeDatabase("environment")
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "qt": QtCore.QT_VERSION_STR,
+        "sqlite": sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def printResults(scale, results):
+    rows = ", ".join(f"{table} {count}" for table, count in results["rows"].items())
+    print(f"\n== {scale} ({rows})")
+    print(f"{'operation':<52}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+    for group in ("readers", "writers", "tables"):
+        for label, timing in results[group].items():
+            print(f"{label:<52}{timing['min_ms']:>10.2f}{timing['median_ms']:>12.2f}{timing['max_ms']:>10.2f}")
+
+
+def main():
+    options = dict(argument[2:].partition("=")[::2] for argument in sys.argv[1:] if argument.startswith("--"))
+    scales = [argument for argument in sys.argv[1:] if not argument.startswith("--")] or list(generateData.SCALES)
+    repeat = int(options.get("repeat", DEFAULT_REPEAT))
+
+    app = QtWidgets.QApplication(sys.argv)
+    window = QtWidgets.QMainWindow()
+    globals.ui = Ui_window()
+    globals.ui.setupUi(window)
+    Repository.backend = Connection
+
+    report = {"environment": environment(), "repeat": repeat, "scales": {}}
+    for scale in scales:
+        report["scales"][scale] = runScale(scale, repeat)
+        printResults(scale, report["scales"][scale])
+
+    if options.get("json"):
+        with open(options["json"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {options['json']}")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
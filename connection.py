@@ -1,32 +1,60 @@
 import os
+import re
 import sqlite3
 
 import globals
 
 from PyQt6 import QtSql, QtWidgets
+from migrations import Migrations
+from rows import CustomerRow, InvoiceSummaryRow, RevenueRow, SaleRow, SearchResult, columnList, fetchRows
+from statementCache import StatementCache
+from sqliteProfile import SqliteProfile
+from referenceData import ReferenceData
+from productCatalog import ProductCatalog
+from customerCache import CustomerCache
+from queryStats import QueryStats
 
 class Connection:
     """
         Handles all database interactions for the SQLite backend, including CRUD operations
         for customers, products, invoices, and sales.
+
+        Readers that accept a ``db`` argument can also run on a QueryExecutor thread
+        with that thread's own connection.
     """
+    DB_PATH = './data/bbdd.sqlite'
+    DEFAULT_CONNECTION = 'qt_sql_default_connection'
+
+    # Invoices with their materialized totals (migration 5), one InvoiceSummaryRow per row
+    INVOICE_SUMMARY = ("SELECT i.idFac, i.dni_nie, i.date, coalesce(t.lines, 0), coalesce(t.subtotal, 0), "
+                       "coalesce(t.vat, 0), coalesce(t.total, 0) "
+                       "FROM invoices i LEFT JOIN invoice_totals t ON t.idFac = i.idFac ")
+
     @staticmethod
     def db_connection():
         """
         Initializes the connection to the SQLite database.
 
         Checks if the database file exists and attempts to open it using QtSql.
+        The connection profile (PRAGMAs) stored in settings is applied and pending
+        schema migrations are run once the database is validated.
 
         :return: True if the connection is successful and the database is valid, False otherwise.
         :rtype: bool
         """
-        ruta_db = './data/bbdd.sqlite'
+        ruta_db = Connection.DB_PATH
 
         if not os.path.isfile(ruta_db):
             QtWidgets.QMessageBox.critical(None, 'Error', 'El archivo de la base de datos no existe.',
                                            QtWidgets.QMessageBox.StandardButton.Cancel)
             return False
 
+        # Prepared statements and cached data belong to the previous connection (e.g. before a backup restore)
+        StatementCache.invalidate(Connection.DEFAULT_CONNECTION)
+        ReferenceData.invalidate()
+        ProductCatalog.invalidate()
+        CustomerCache.invalidate()
+
         db = QtSql.QSqlDatabase.addDatabase('QSQLITE')
         db.setDatabaseName(ruta_db)
 
@@ -42,98 +70,225 @@ class Connection:
             QtWidgets.QMessageBox.critical(None, 'Error', 'Base de datos vacía o no válida.',
                                            QtWidgets.QMessageBox.StandardButton.Cancel)
             return False
+        query.finish()
+
+        SqliteProfile.apply(db)
+        CustomerCache.configure(Connection.getSetting(CustomerCache.SETTING_KEY, CustomerCache.DEFAULT_CAPACITY))
+        QueryStats.configure(Connection.getSetting(QueryStats.SETTING_KEY, QueryStats.DEFAULT_THRESHOLD_MS))
+
+        if not Migrations.migrate(db):
+            QtWidgets.QMessageBox.critical(None, 'Error', 'No se pudo actualizar el esquema de la base de datos.',
+                                           QtWidgets.QMessageBox.StandardButton.Cancel)
+            return False
 
         #QtWidgets.QMessageBox.information(None, 'Aviso', 'Conexión Base de Datos realizada',
         #                                  QtWidgets.QMessageBox.StandardButton.Ok)
         return True
 
     @staticmethod
-    def getProvinces():
+    def db_close():
         """
-        Retrieves all province names from the database.
+        Checkpoints the write-ahead log into the database file and closes the connection.
 
-        :return: A list of all province names.
-        :rtype: list
+        Must be called before the database file is copied or replaced on disk.
+
+        :return: True if the checkpoint succeeded, False otherwise.
+        :rtype: bool
         """
-        all_provinces = []
-        query = QtSql.QSqlQuery()
-        query.prepare("SELECT * FROM provincias")
-        if query.exec():
-            while query.next():
-                all_provinces.append(query.value(1))
+        StatementCache.invalidate(Connection.DEFAULT_CONNECTION)
+        db = QtSql.QSqlDatabase.database()
+        if not db.isOpen():
+            return True
+
+        checkpoint = Connection.checkpoint()
+        db.close()
+        return checkpoint
+
+    @staticmethod
+    def checkpoint():
+        """
+        Copies every page of the write-ahead log into the database file so the file
+        alone is a consistent copy of the database.
 
-        return all_provinces
+        :return: True if the log was completely checkpointed, False otherwise.
+        :rtype: bool
+        """
+        try:
+            query = QtSql.QSqlQuery()
+            if query.exec("PRAGMA wal_checkpoint(TRUNCATE);") and query.next():
+                busy = int(query.value(0))
+                query.finish()
+                return busy == 0
+            return False
+        except Exception as error:
+            print("Error checkpoint: ", error)
+            return False
+
+    @staticmethod
+    def copyTo(path):
+        """
+        Writes a consistent copy of the database, including the commits still in the
+        write-ahead log, to a new file with VACUUM INTO. Unlike a checkpoint it is not
+        blocked by the readers of other connections.
+
+        :param path: The file to create; it must not exist.
+        :type path: str
+        :return: True if the copy was written, False otherwise.
+        :rtype: bool
+        """
+        try:
+            query = QtSql.QSqlQuery()
+            query.prepare("VACUUM INTO :path;")
+            query.bindValue(":path", str(path))
+            if not query.exec():
+                print("Error copyTo: ", query.lastError().text())
+                return False
+            return True
+        except Exception as error:
+            print("Error copyTo: ", error)
+            return False
+
+    @staticmethod
+    def getProvinces():
+        """
+        Retrieves all province names, served from the in-memory reference data.
+
+        :return: A tuple of all province names.
+        :rtype: tuple
+        """
+        return ReferenceData.getProvinces()
 
     @staticmethod
     def getCities(province):
         """
-        Retrieves all city names belonging to a specific province.
+        Retrieves all city names belonging to a specific province, served from the
+        in-memory reference data.
 
         :param province: The name of the province to filter by.
         :type province: str
-        :return: A list of city names.
-        :rtype: list
+        :return: A tuple of city names.
+        :rtype: tuple
         """
-        all_cities = []
-        query = QtSql.QSqlQuery()
-
-        query.prepare("select * from municipios where idprov = ( select idprov from provincias where provincia = :province);")
-        query.bindValue(":province", province)
-
-        if query.exec():
-            while query.next():
-                all_cities.append(query.value(1))
-        return all_cities
+        return ReferenceData.getCities(province)
 
     @staticmethod
-    def getCustomers(historical=True):
+    def getCustomers(historical=True, db=None):
         """
         Retrieves customers from the database.
 
         :param historical: If True, returns only active customers. If False, returns all.
         :type historical: bool
-        :return: A list of lists containing customer data rows.
+        :param db: The database connection, the default one if None.
+        :type db: QSqlDatabase
+        :return: A list of CustomerRow.
         :rtype: list
         """
         if historical:
-            historical_query = "SELECT * FROM customers where historical = 'True' order by surname;"
+            historical_query = f"SELECT {columnList(CustomerRow)} FROM customers where historical = 'True' order by surname, dni_nie;"
         else:
-            historical_query = "SELECT * FROM customers order by surname;"
+            historical_query = f"SELECT {columnList(CustomerRow)} FROM customers order by surname, dni_nie;"
 
         all_customers = []
-        query = QtSql.QSqlQuery()
-        query.prepare(historical_query)
+        query = StatementCache.prepare(historical_query, db)
         if query.exec():
-            while query.next():
-                row = [query.value(i) for i in range(query.record().count())]
-                all_customers.append(row)
+            all_customers = fetchRows(query, CustomerRow)
         return all_customers
 
+    @staticmethod
+    def getCustomersPage(historical=True, after=None, limit=500):
+        """
+        Retrieves one page of customers ordered by (surname, dni_nie) using keyset pagination.
+
+        The cursor is the (surname, dni_nie) of the last row of the previous page, so every
+        page is an index range scan no matter how deep it is. Customers without surname
+        are only returned on the first page.
+
+        :param historical: If True, returns only active customers. If False, returns all.
+        :type historical: bool
+        :param after: The cursor returned with the previous page, None for the first page.
+        :type after: tuple
+        :param limit: The maximum number of rows of the page.
+        :type limit: int
+        :return: A tuple (list of CustomerRow, next cursor or None when there are no more pages).
+        :rtype: tuple
+        """
+        try:
+            conditions = []
+            if historical:
+                conditions.append("historical = 'True'")
+            if after is not None:
+                conditions.append("(surname, dni_nie) > (:surname, :dni)")
+            where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+            query = StatementCache.prepare(f"SELECT {columnList(CustomerRow)} FROM customers {where}"
+                                           "ORDER BY surname, dni_nie LIMIT :limit;")
+            if after is not None:
+                query.bindValue(":surname", after[0])
+                query.bindValue(":dni", after[1])
+            query.bindValue(":limit", int(limit))
+
+            all_customers = []
+            if query.exec():
+                all_customers = fetchRows(query, CustomerRow)
+
+            next_cursor = None
+            if len(all_customers) == limit:
+                next_cursor = (all_customers[-1].surname, all_customers[-1].dni_nie)
+            return all_customers, next_cursor
+        except Exception as error:
+            print("Error getCustomersPage: ", error)
+            return [], None
+
+    @staticmethod
+    def iterCustomers(historical=True, page_size=500):
+        """
+        Streams customers page by page (see getCustomersPage).
+
+        :param historical: If True, returns only active customers. If False, returns all.
+        :type historical: bool
+        :param page_size: The number of rows read per query.
+        :type page_size: int
+        :return: A generator of CustomerRow.
+        :rtype: generator
+        """
+        cursor = None
+        while True:
+            page, cursor = Connection.getCustomersPage(historical, cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
     @staticmethod
     def getCustomerData(data, type_search):
         """
         Fetches detailed information for a single customer based on DNI or phone number.
+        Recently used customers are served from the CustomerCache.
 
         :param data: The search term (DNI string or Phone string).
         :type data: str
         :param type_search: The category of search ("dni" or "phone").
         :type type_search: str
-        :return: A list containing all fields for the found customer.
-        :rtype: list
+        :return: The CustomerRow of the found customer, an empty list if not found.
+        :rtype: CustomerRow|list
         """
         try:
+            all_customer_data = CustomerCache.get(data, type_search)
+            if all_customer_data is not None:
+                return all_customer_data
+
             all_customer_data = []
-            query = QtSql.QSqlQuery()
             if type_search == "phone":
-                query.prepare("SELECT * FROM customers WHERE mobile = :mobile;")
-                query.bindValue(":mobile", str(data).strip())
+                query = StatementCache.prepare(f"SELECT {columnList(CustomerRow)} FROM customers WHERE mobile = :value LIMIT 1;")
             elif type_search == "dni":
-                query.prepare("SELECT * FROM customers WHERE dni_nie = :dni;")
-                query.bindValue(":dni", str(data).strip())
+                query = StatementCache.prepare(f"SELECT {columnList(CustomerRow)} FROM customers WHERE dni_nie = :value;")
+            else:
+                return all_customer_data
+            query.bindValue(":value", str(data).strip())
             if query.exec():
-                while query.next():
-                    for i in range(query.record().count()):
-                        all_customer_data.append(query.value(i))
+                found = fetchRows(query, CustomerRow)
+                if found:
+                    all_customer_data = found[0]
+                    CustomerCache.put(all_customer_data)
 
             return all_customer_data
         except Exception as error:
@@ -149,12 +304,12 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("UPDATE customers set historical = :value WHERE dni_nie = :dni;")
+            query = StatementCache.prepare("UPDATE customers set historical = :value WHERE dni_nie = :dni;")
             query.bindValue(":value", str(False))
             query.bindValue(":dni", dni)
             if not query.exec():
                 return False
+            CustomerCache.invalidate(dni=dni)
             return True
         except Exception as error:
             print("Error deleteCustomer: ", error)
@@ -171,8 +326,7 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("INSERT INTO customers (dni_nie, adddata, surname, name, mail, mobile,"
+            query = StatementCache.prepare("INSERT INTO customers (dni_nie, adddata, surname, name, mail, mobile,"
                           "address, province, city, invoicetype, historical) VALUES (:dni_nie, :adddata, :surname, :name, :mail, :mobile,"
                           ":address, :province, :city, :invoicetype, :historical)")
 
@@ -195,6 +349,7 @@ class Connection:
             if not query.exec():
                 return False
 
+            CustomerCache.invalidate(dni=query.boundValue(":dni_nie"), mobile=query.boundValue(":mobile"))
             return True
 
 
@@ -213,8 +368,7 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("UPDATE customers set"
+            query = StatementCache.prepare("UPDATE customers set"
                           " adddata = :adddata, surname = :surname, name = :name, mail = :mail, mobile = :mobile,"
                           "address = :address, province = :province, city = :city, invoicetype = :invoicetype,"
                           " historical = :historical"
@@ -239,26 +393,28 @@ class Connection:
             if not query.exec():
                 return False
 
+            CustomerCache.invalidate(dni=query.boundValue(":dni_nie"), mobile=query.boundValue(":mobile"))
             return True
 
         except Exception as error:
             print("Error setCustomerData: ", error)
 
     @staticmethod
-    def saveSettings(data):
+    def saveSettings(data, db=None):
         """
             Saves or replaces application settings in the database.
 
             :param data: A list of tuples containing (setting_id, value).
             :type data: list
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
             :return: True if all settings were saved successfully, False otherwise.
             :rtype: bool
         """
         try:
             for key, value in data:
                 print(key, value)
-                query = QtSql.QSqlQuery()
-                query.prepare("INSERT OR REPLACE INTO settings (id, value) VALUES (:id, :value);")
+                query = StatementCache.prepare("INSERT OR REPLACE INTO settings (id, value) VALUES (:id, :value);", db)
                 query.bindValue(":id", str(key))
                 query.bindValue(":value", str(value))
 
@@ -271,17 +427,43 @@ class Connection:
             print("Error saveSettings: ", error)
 
     @staticmethod
-    def getSettings():
+    def getSetting(key, default=None, db=None):
+        """
+            Retrieves a single configuration value.
+
+            :param key: The setting id.
+            :type key: str
+            :param default: The value returned when the setting does not exist.
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: The stored value or the default.
+            :rtype: str
+        """
+        try:
+            query = StatementCache.prepare("SELECT value FROM settings WHERE id = :id;", db)
+            query.bindValue(":id", str(key))
+            if query.exec() and query.next():
+                value = query.value(0)
+                query.finish()
+                return value
+            return default
+        except Exception as error:
+            print("Error getSetting: ", error)
+            return default
+
+    @staticmethod
+    def getSettings(db=None):
         """
             Retrieves all application configuration settings from the database.
 
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
             :return: A list of tuples containing (id, value).
             :rtype: list
         """
         try:
             all_settings = []
-            query = QtSql.QSqlQuery()
-            query.prepare("SELECT * FROM settings")
+            query = StatementCache.prepare("SELECT * FROM settings", db)
             if query.exec():
                 while query.next():
                     all_settings.append((query.value(0), query.value(1)))
@@ -296,22 +478,12 @@ class Connection:
     @staticmethod
     def getProducts():
         """
-        Retrieves all product records from the products table.
+        Retrieves all product records, served from the product catalog cache.
 
-        :return: A list of lists containing product data.
+        :return: A list of ProductRow ordered by code.
         :rtype: list
         """
-        historical_query = "SELECT * FROM products;"
-
-
-        all_products = []
-        query = QtSql.QSqlQuery()
-        query.prepare(historical_query)
-        if query.exec():
-            while query.next():
-                row = [query.value(i) for i in range(query.record().count())]
-                all_products.append(row)
-        return all_products
+        return ProductCatalog.getAll()
 
     @staticmethod
     def addProduct(data):
@@ -324,8 +496,7 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("INSERT INTO products (name, stock, family, unit_price, currency) VALUES (:name, :stock, :family, :unit_price, :currency)")
+            query = StatementCache.prepare("INSERT INTO products (name, stock, family, unit_price, currency) VALUES (:name, :stock, :family, :unit_price, :currency)")
 
             order_values = [":name", ":stock", ":family", ":unit_price", ":currency"]
 
@@ -339,6 +510,7 @@ class Connection:
             if not query.exec():
                 return False
 
+            ProductCatalog.refresh(code=query.lastInsertId())
             return True
 
         except Exception as error:
@@ -347,32 +519,24 @@ class Connection:
     @staticmethod
     def getProductData(product, search_type ="name"):
         """
-        Retrieves specific product data by name or ID code.
+        Retrieves specific product data by name or ID code from the product catalog cache.
 
         :param product: The identifier (Name string or Code integer).
         :type product: str|int
         :param search_type: The type of search ("name" or "id").
         :type search_type: str
-        :return: A list containing the product record fields.
-        :rtype: list
+        :return: The ProductRow of the found product, an empty list if not found.
+        :rtype: ProductRow|list
         """
         try:
-            all_product_data = []
-            query = QtSql.QSqlQuery()
+            all_product_data = None
 
             if search_type == "name":
-                query.prepare("SELECT * FROM products WHERE name = :name")
-                query.bindValue(":name", product)
+                all_product_data = ProductCatalog.getByName(product)
             elif search_type == "id":
-                query.prepare("SELECT * FROM products WHERE code = :id")
-                query.bindValue(":id", product)
-
-            if query.exec():
-                while query.next():
-                    for i in range(query.record().count()):
-                        all_product_data.append((query.value(i)))
+                all_product_data = ProductCatalog.getByCode(product)
 
-            return all_product_data
+            return all_product_data or []
         except Exception as error:
             print("Error getProductData: ", error)
 
@@ -387,13 +551,13 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("DELETE FROM products WHERE name = :name")
+            query = StatementCache.prepare("DELETE FROM products WHERE name = :name")
             query.bindValue(":name", str(product_name))
 
             if not query.exec():
                 return False
 
+            ProductCatalog.remove(str(product_name))
             return True
         except Exception as error:
             print("Error deleteProduct: ", error)
@@ -409,8 +573,7 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("UPDATE products SET "
+            query = StatementCache.prepare("UPDATE products SET "
                       "name = :name, stock = :stock, family = :family, unit_price = :unit_price, currency = :currency "
                       "WHERE name = :name;")
 
@@ -426,6 +589,7 @@ class Connection:
             if not query.exec():
                 return False
 
+            ProductCatalog.refresh(name=query.boundValue(":name"))
             return True
         except Exception as error:
             print("Error setCustomerData: ", error)
@@ -433,8 +597,7 @@ class Connection:
     @staticmethod
     def updateStockProductData(data):
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("UPDATE products SET"
+            query = StatementCache.prepare("UPDATE products SET"
                           " stock = :stock "
                           " WHERE code = :code "
                           )
@@ -446,25 +609,239 @@ class Connection:
 
             if not query.exec():
                 return False
+
+            ProductCatalog.refresh(code=data[0])
             return True
         except Exception as error:
             print("Error updateProduct: ", error)
 
+    @staticmethod
+    def _beginImmediate(db):
+        """
+        Starts a transaction that takes the write lock straight away.
+
+        A deferred BEGIN only asks for the lock at the first write and fails with
+        SQLITE_BUSY, without waiting, when another till committed in between. BEGIN
+        IMMEDIATE waits for the lock under busy_timeout instead.
+
+        :return: True if the transaction was started, False otherwise.
+        :rtype: bool
+        """
+        query = QtSql.QSqlQuery(db)
+        if not query.exec("BEGIN IMMEDIATE;"):
+            print("Error _beginImmediate: ", query.lastError().text())
+            return False
+        return True
+
+    @staticmethod
+    def _stockDemand(items):
+        """
+        Adds up the units requested per product, so a product on several lines is
+        checked against its stock once for all of them.
+
+        :param items: (product_id, amount) pairs.
+        :type items: list
+        :return: {code: units}, in code order, without the zero amounts.
+        :rtype: dict
+        """
+        demand = {}
+        for code, amount in items:
+            demand[int(code)] = demand.get(int(code), 0) + int(amount)
+        return {code: demand[code] for code in sorted(demand) if demand[code]}
+
+    @staticmethod
+    def _reserveStock(demand, reason, ref=None):
+        """
+        Decrements the stock of every product of ``demand`` inside the open transaction.
+
+        Every product is decremented with ``stock = stock - ? WHERE stock >= ?``, so the
+        check and the write are one statement and two tills can neither lose an update
+        nor sell below zero. Products are updated in code order. The movement is written
+        with its reason just before the update, which the stock trigger of migration 8
+        then does not log again; sync ships stock as these ledger deltas, so the ledger
+        is always kept.
+
+        :param demand: {code: units} as returned by _stockDemand.
+        :type demand: dict
+        :raises RuntimeError: When a product does not exist or has not enough stock; the
+                              caller rolls the transaction back.
+        """
+        query = StatementCache.prepare("UPDATE products SET stock = stock - ? WHERE code = ? AND stock >= ?")
+        ledger = StatementCache.prepare("INSERT INTO stock_movements (code, delta, stock, reason, ref) "
+                                        "SELECT code, ?, stock - ?, ?, ? FROM products WHERE code = ? AND stock >= ?")
+        for code, units in demand.items():
+            for position, value in enumerate((-units, units, str(reason), None if ref is None else int(ref),
+                                              code, units)):
+                ledger.bindValue(position, value)
+            if not ledger.exec():
+                raise RuntimeError(ledger.lastError().text())
+            query.bindValue(0, units)
+            query.bindValue(1, code)
+            query.bindValue(2, units)
+            if not query.exec():
+                raise RuntimeError(query.lastError().text())
+            if query.numRowsAffected() != 1:
+                raise RuntimeError(f"not enough stock of product {code} for {units} units")
+        query.finish()
+        ledger.finish()
+
+    @staticmethod
+    def reserveStock(items, reason="reservation", ref=None):
+        """
+        Takes units out of stock in one transaction, all of them or none.
+
+        :param items: (product_id, amount) pairs; a negative amount puts units back.
+        :type items: list
+        :param reason: Written to the stock movements ledger, e.g. "sale".
+        :type reason: str
+        :param ref: Written to the ledger, e.g. the invoice ID.
+        :type ref: int|None
+        :return: True if every product had enough stock and the change was committed, False otherwise.
+        :rtype: bool
+        """
+        demand = Connection._stockDemand(items)
+        if not demand:
+            return True
+
+        db = QtSql.QSqlDatabase.database()
+        if not Connection._beginImmediate(db):
+            return False
+        try:
+            Connection._reserveStock(demand, reason, ref)
+            if not db.commit():
+                raise RuntimeError(db.lastError().text())
+            return True
+        except Exception as error:
+            print("Error reserveStock: ", error)
+            db.rollback()
+            return False
+        finally:
+            for code in demand:
+                ProductCatalog.refresh(code=code)
+
+    @staticmethod
+    def getStockShortages(items):
+        """
+        Lists the products that have not enough stock for the requested units.
+
+        Used to tell the user why saveSales or reserveStock refused a sale; the stock can
+        change again before the next attempt.
+
+        :param items: (product_id, amount) pairs.
+        :type items: list
+        :return: (code, name, stock, requested) of every product short of stock.
+        :rtype: list
+        """
+        try:
+            shortages = []
+            query = StatementCache.prepare("SELECT name, stock FROM products WHERE code = ?")
+            for code, units in Connection._stockDemand(items).items():
+                query.bindValue(0, code)
+                if not query.exec():
+                    continue
+                if not query.next():
+                    shortages.append((code, "", 0, units))
+                elif int(query.value(1)) < units:
+                    shortages.append((code, str(query.value(0)), int(query.value(1)), units))
+                query.finish()
+            return shortages
+        except Exception as error:
+            print("Error getStockShortages: ", error)
+            return []
+
     @staticmethod
     def getProductFamilies():
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("SELECT DISTINCT family FROM products")
-            families = []
-            if query.exec():
+            return ProductCatalog.getFamilies()
+        except Exception as error:
+            print("Error getProductFamilies: ", error)
+            return []
+
+
+    # Search section
+    @staticmethod
+    def _matchExpression(text):
+        """
+        Builds an FTS5 MATCH expression in which every word of the text is a prefix term.
+
+        :param text: The text typed by the user.
+        :type text: str
+        :return: The MATCH expression, an empty string if the text has no words.
+        :rtype: str
+        """
+        words = re.findall(r"\w+", str(text))
+        return " ".join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def search(text, scope=None, limit=20):
+        """
+        Full-text search over customers (surname, name, mail, address, city) and products
+        (name, family) with prefix matching, ranked by bm25.
+
+        :param text: The words to search for; every word must match the start of a term.
+        :type text: str
+        :param scope: "customers", "products" or None for both.
+        :type scope: str
+        :param limit: The maximum number of results.
+        :type limit: int
+        :return: A list of SearchResult, best match first.
+        :rtype: list
+        """
+        try:
+            match = Connection._matchExpression(text)
+            if not match:
+                return []
+
+            statements = []
+            if scope in (None, "customers"):
+                statements.append(("customer",
+                                   "SELECT c.dni_nie, c.surname || ', ' || c.name, customers_fts.rank "
+                                   "FROM customers_fts JOIN customers c ON c.rowid = customers_fts.rowid "
+                                   "WHERE customers_fts MATCH :match ORDER BY customers_fts.rank LIMIT :limit;"))
+            if scope in (None, "products"):
+                statements.append(("product",
+                                   "SELECT p.code, p.name, products_fts.rank "
+                                   "FROM products_fts JOIN products p ON p.code = products_fts.rowid "
+                                   "WHERE products_fts MATCH :match ORDER BY products_fts.rank LIMIT :limit;"))
+
+            results = []
+            for kind, sql in statements:
+                query = StatementCache.prepare(sql)
+                query.bindValue(":match", match)
+                query.bindValue(":limit", int(limit))
+                if not query.exec():
+                    print("Error search: ", query.lastError().text())
+                    continue
                 while query.next():
-                    families.append(query.value(0))
+                    results.append(SearchResult(kind, query.value(0), query.value(1), query.value(2)))
 
-            return families
+            results.sort(key=lambda result: result.rank)
+            return results[:limit]
         except Exception as error:
-            print("Error getProductFamilies: ", error)
+            print("Error search: ", error)
             return []
 
+    @staticmethod
+    def rebuildSearchIndex():
+        """
+        Rebuilds the full-text indexes from the customers and products tables.
+
+        Needed after a VACUUM, which may renumber the rowids of the customers table.
+
+        :return: True if both indexes were rebuilt, False otherwise.
+        :rtype: bool
+        """
+        try:
+            query = QtSql.QSqlQuery()
+            for table in ("customers_fts", "products_fts"):
+                if not query.exec(f"INSERT INTO {table} ({table}) VALUES ('rebuild');"):
+                    print("Error rebuildSearchIndex: ", query.lastError().text())
+                    return False
+            return True
+        except Exception as error:
+            print("Error rebuildSearchIndex: ", error)
+            return False
+
 
     # Invoice section
     @staticmethod
@@ -474,13 +851,12 @@ class Connection:
 
         :param data: A list containing [dni, date_string].
         :type data: list
-        :return: True if the invoice was created, False otherwise.
-        :rtype: bool
+        :return: The idFac of the new invoice, False if it was not created.
+        :rtype: int|bool
         """
         # ! DATA FORMAT IS ["String", "String"...] NOT [globals.ui...]
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("INSERT INTO invoices (dni_nie, date) VALUES (:dni, :date)")
+            query = StatementCache.prepare("INSERT INTO invoices (dni_nie, date) VALUES (:dni, :date)")
 
             order_values = [":dni", ":date"]
 
@@ -490,28 +866,27 @@ class Connection:
             if not query.exec():
                 return False
 
-            return True
+            return int(query.lastInsertId())
 
         except Exception as error:
             print("Error addInvoice: ", error)
 
     @staticmethod
-    def getAllInvoices():
+    def getAllInvoices(db=None):
         """
-        Retrieves all invoices sorted by ID in descending order.
+        Retrieves all invoices with their totals sorted by ID in descending order.
 
-        :return: A list of lists containing invoice records.
+        :param db: The database connection, the default one if None.
+        :type db: QSqlDatabase
+        :return: A list of InvoiceSummaryRow.
         :rtype: list
         """
         try:
             all_data_invoices = []
-            query = QtSql.QSqlQuery()
-            query.prepare("SELECT * FROM invoices order by idFac desc;")
+            query = StatementCache.prepare(f"{Connection.INVOICE_SUMMARY}ORDER BY i.idFac DESC;", db)
 
             if query.exec():
-                while query.next():
-                    row = [query.value(i) for i in range(query.record().count())]
-                    all_data_invoices.append(row)
+                all_data_invoices = fetchRows(query, InvoiceSummaryRow)
 
             return all_data_invoices
 
@@ -520,6 +895,76 @@ class Connection:
 
 
 
+    @staticmethod
+    def getInvoicesPage(before=None, limit=500):
+        """
+        Retrieves one page of invoices ordered by idFac descending using keyset pagination.
+
+        :param before: The cursor (idFac of the last row) returned with the previous page,
+                       None for the first page.
+        :type before: int
+        :param limit: The maximum number of rows of the page.
+        :type limit: int
+        :return: A tuple (list of InvoiceSummaryRow, next cursor or None when there are no more pages).
+        :rtype: tuple
+        """
+        try:
+            where = "WHERE i.idFac < :before " if before is not None else ""
+            query = StatementCache.prepare(f"{Connection.INVOICE_SUMMARY}{where}"
+                                           "ORDER BY i.idFac DESC LIMIT :limit;")
+            if before is not None:
+                query.bindValue(":before", int(before))
+            query.bindValue(":limit", int(limit))
+
+            all_data_invoices = []
+            if query.exec():
+                all_data_invoices = fetchRows(query, InvoiceSummaryRow)
+
+            next_cursor = all_data_invoices[-1].idFac if len(all_data_invoices) == limit else None
+            return all_data_invoices, next_cursor
+        except Exception as error:
+            print("Error getInvoicesPage: ", error)
+            return [], None
+
+    @staticmethod
+    def iterInvoices(page_size=500):
+        """
+        Streams invoices page by page, newest first (see getInvoicesPage).
+
+        :param page_size: The number of rows read per query.
+        :type page_size: int
+        :return: A generator of InvoiceSummaryRow.
+        :rtype: generator
+        """
+        cursor = None
+        while True:
+            page, cursor = Connection.getInvoicesPage(cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    @staticmethod
+    def getInvoiceTotals(id_factura):
+        """
+        Retrieves the materialized totals of one invoice.
+
+        :param id_factura: The ID of the invoice.
+        :type id_factura: int|str
+        :return: The InvoiceSummaryRow of the invoice, None if it does not exist.
+        :rtype: InvoiceSummaryRow
+        """
+        try:
+            query = StatementCache.prepare(f"{Connection.INVOICE_SUMMARY}WHERE i.idFac = :idFac;")
+            query.bindValue(":idFac", int(id_factura))
+
+            if query.exec():
+                all_data_invoices = fetchRows(query, InvoiceSummaryRow)
+                return all_data_invoices[0] if all_data_invoices else None
+            return None
+        except Exception as error:
+            print("Error getInvoiceTotals: ", error)
+            return None
+
     @staticmethod
     def addSale(data):
         """
@@ -531,8 +976,7 @@ class Connection:
         :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total)"
+            query = StatementCache.prepare("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total)"
                           "values (:idFactura, :idProduct, :amount, :product, :unitprice, :total)"
                           )
 
@@ -549,6 +993,62 @@ class Connection:
         except Exception as error:
             print("Error addSale: ", error)
 
+    @staticmethod
+    def saveSales(id_factura, sales):
+        """
+        Saves all line items of an invoice and decrements the stock of the sold products
+        in a single transaction.
+
+        Sale lines are inserted with one batched prepared statement and the stock is
+        reserved with _reserveStock, which refuses to sell more units than there are in
+        stock. The transaction takes the write lock at BEGIN, so several tills sharing the
+        database wait for each other under busy_timeout. Any failure, including a product
+        short of stock (see getStockShortages), rolls back every line and every stock change.
+
+        :param id_factura: The ID of the parent invoice.
+        :type id_factura: int|str
+        :param sales: A list of lines: [product_id, amount, name, unit_price, total].
+        :type sales: list
+        :return: True if everything was committed, False otherwise.
+        :rtype: bool
+        """
+        if not sales:
+            return False
+
+        db = QtSql.QSqlDatabase.database()
+        if not Connection._beginImmediate(db):
+            return False
+
+        product_ids = []
+        try:
+            product_ids = [int(line[0]) for line in sales]
+            amounts = [int(line[1]) for line in sales]
+
+            query = StatementCache.prepare("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total) "
+                          "VALUES (?, ?, ?, ?, ?, ?)")
+            query.bindValue(0, [int(id_factura)] * len(sales))
+            query.bindValue(1, product_ids)
+            query.bindValue(2, amounts)
+            query.bindValue(3, [str(line[2]) for line in sales])
+            query.bindValue(4, [float(line[3]) for line in sales])
+            query.bindValue(5, [float(line[4]) for line in sales])
+            if not query.execBatch():
+                raise RuntimeError(query.lastError().text())
+            query.finish()
+
+            Connection._reserveStock(Connection._stockDemand(zip(product_ids, amounts)), "sale", id_factura)
+
+            if not db.commit():
+                raise RuntimeError(db.lastError().text())
+            return True
+
+        except Exception as error:
+            print("Error saveSales: ", error)
+            db.rollback()
+            return False
+        finally:
+            for code in set(product_ids):
+                ProductCatalog.refresh(code=code)
 
     @staticmethod
     def getSale(id_factura):
@@ -557,22 +1057,18 @@ class Connection:
 
         :param id_factura: The ID of the parent invoice.
         :type id_factura: int|str
-        :return: A list of sale records.
+        :return: A list of SaleRow.
         :rtype: list
         """
         try:
             all_data_sales = []
-            query = QtSql.QSqlQuery()
-            query.prepare("SELECT * FROM sales where idFactura = :idFactura;")
+            query = StatementCache.prepare(f"SELECT {columnList(SaleRow)} FROM sales where idFactura = :idFactura;")
 
             query.bindValue(":idFactura", int(id_factura))
 
             if query.exec():
-                while query.next():
-                    row = [query.value(i) for i in range(query.record().count())]
-                    all_data_sales.append(row)
+                all_data_sales = fetchRows(query, SaleRow)
 
-            print(all_data_sales)
             return all_data_sales
 
         except Exception as error:
@@ -589,8 +1085,7 @@ class Connection:
             :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("DELETE FROM invoices WHERE idFac = :idFac")
+            query = StatementCache.prepare("DELETE FROM invoices WHERE idFac = :idFac")
             query.bindValue(":idFac", str(id_factura))
 
             if not query.exec():
@@ -611,8 +1106,7 @@ class Connection:
             :rtype: bool
         """
         try:
-            query = QtSql.QSqlQuery()
-            query.prepare("DELETE FROM sales WHERE idFactura = :idFac")
+            query = StatementCache.prepare("DELETE FROM sales WHERE idFactura = :idFac")
             query.bindValue(":idFac", str(id_factura))
 
             if not query.exec():
@@ -638,4 +1132,171 @@ class Connection:
         if not Connection.deleteInvoice(id_factura):
             return False
 
-        return True
\ No newline at end of file
+        return True
+
+
+    # Sales reports section
+    @staticmethod
+    def _isoDay(value):
+        """
+        :param value: A date, a datetime or an ISO yyyy-mm-dd string.
+        :return: The ISO day.
+        :rtype: str
+        """
+        if hasattr(value, "isoformat"):
+            return value.isoformat()[:10]
+        return str(value)
+
+    @staticmethod
+    def _revenue(sql, start, end, limit=None, **values):
+        query = StatementCache.prepare(sql)
+        query.bindValue(":start", Connection._isoDay(start))
+        query.bindValue(":end", Connection._isoDay(end))
+        if limit is not None:
+            query.bindValue(":limit", int(limit))
+        for name, value in values.items():
+            query.bindValue(f":{name}", value)
+
+        if not query.exec():
+            print("Error revenue report: ", query.lastError().text())
+            return []
+        return fetchRows(query, RevenueRow)
+
+    @staticmethod
+    def getRevenueByFamily(start, end):
+        """
+        Revenue per product family between two days, read from the daily aggregates.
+
+        :param start: The first day, included.
+        :type start: date|str
+        :param end: The last day, included.
+        :type end: date|str
+        :return: A list of RevenueRow (key and label are the family), highest revenue first.
+        :rtype: list
+        """
+        try:
+            return Connection._revenue("SELECT family, family, sum(lines), sum(units), round(sum(revenue), 2) "
+                                       "FROM sales_daily_family_customer WHERE day BETWEEN :start AND :end "
+                                       "GROUP BY family ORDER BY 5 DESC;", start, end)
+        except Exception as error:
+            print("Error getRevenueByFamily: ", error)
+            return []
+
+    @staticmethod
+    def getRevenueByDay(start, end):
+        """
+        Revenue per day between two days, read from the daily aggregates.
+
+        :param start: The first day, included.
+        :type start: date|str
+        :param end: The last day, included.
+        :type end: date|str
+        :return: A list of RevenueRow (key is the ISO day, label the dd/mm/yyyy day), oldest first.
+        :rtype: list
+        """
+        try:
+            return Connection._revenue("SELECT day, substr(day, 9, 2) || '/' || substr(day, 6, 2) || '/' || substr(day, 1, 4), "
+                                       "sum(lines), sum(units), round(sum(revenue), 2) "
+                                       "FROM sales_daily_product WHERE day BETWEEN :start AND :end "
+                                       "GROUP BY day ORDER BY day;", start, end)
+        except Exception as error:
+            print("Error getRevenueByDay: ", error)
+            return []
+
+    @staticmethod
+    def getTopProducts(start, end, limit=10):
+        """
+        Best selling products between two days, read from the daily aggregates.
+
+        :param start: The first day, included.
+        :type start: date|str
+        :param end: The last day, included.
+        :type end: date|str
+        :param limit: The maximum number of products.
+        :type limit: int
+        :return: A list of RevenueRow (key is the product code, label its name), highest revenue first.
+        :rtype: list
+        """
+        try:
+            return Connection._revenue("SELECT a.code, coalesce(p.name, ''), a.lines, a.units, a.revenue FROM ("
+                                       "SELECT code, sum(lines) AS lines, sum(units) AS units, "
+                                       "round(sum(revenue), 2) AS revenue FROM sales_daily_product "
+                                       "WHERE day BETWEEN :start AND :end GROUP BY code ORDER BY revenue DESC LIMIT :limit"
+                                       ") a LEFT JOIN products p ON p.code = a.code ORDER BY a.revenue DESC;",
+                                       start, end, limit)
+        except Exception as error:
+            print("Error getTopProducts: ", error)
+            return []
+
+    @staticmethod
+    def getTopCustomers(start, end, limit=10, family=None):
+        """
+        Customers with the highest revenue between two days, read from the daily aggregates.
+
+        :param start: The first day, included.
+        :type start: date|str
+        :param end: The last day, included.
+        :type end: date|str
+        :param limit: The maximum number of customers.
+        :type limit: int
+        :param family: Only count the products of this family, every family if None.
+        :type family: str
+        :return: A list of RevenueRow (key is the DNI/NIE, label "surname, name"), highest revenue first.
+        :rtype: list
+        """
+        try:
+            where = "AND family = :family " if family is not None else ""
+            values = {"family": str(family)} if family is not None else {}
+            return Connection._revenue("SELECT a.dni_nie, coalesce(c.surname || ', ' || c.name, ''), a.lines, a.units, a.revenue FROM ("
+                                       "SELECT dni_nie, sum(lines) AS lines, sum(units) AS units, "
+                                       "round(sum(revenue), 2) AS revenue FROM sales_daily_family_customer "
+                                       f"WHERE day BETWEEN :start AND :end {where}"
+                                       "GROUP BY dni_nie ORDER BY revenue DESC LIMIT :limit"
+                                       ") a LEFT JOIN customers c ON c.dni_nie = a.dni_nie ORDER BY a.revenue DESC;",
+                                       start, end, limit, **values)
+        except Exception as error:
+            print("Error getTopCustomers: ", error)
+            return []
+
+    @staticmethod
+    def rebuildSalesCubes():
+        """
+        Recomputes the daily sales aggregates from the sale lines in one transaction.
+
+        Needed after products are moved to another family, since the aggregates keep the
+        family the product had when each line was written.
+
+        :return: True if the aggregates were rebuilt, False otherwise.
+        :rtype: bool
+        """
+        iso_day = "substr(i.date, 7, 4) || '-' || substr(i.date, 4, 2) || '-' || substr(i.date, 1, 2)"
+        statements = [
+            "DELETE FROM sales_daily_product;",
+            "DELETE FROM sales_daily_family_customer;",
+            "INSERT INTO sales_daily_product (day, code, lines, units, revenue) "
+            f"SELECT {iso_day}, s.idProducto, count(*), total(s.amount), total(s.total) "
+            "FROM sales s JOIN invoices i ON i.idFac = s.idFactura GROUP BY 1, 2;",
+            "INSERT INTO sales_daily_family_customer (day, family, dni_nie, lines, units, revenue) "
+            f"SELECT {iso_day}, coalesce(p.family, ''), coalesce(i.dni_nie, ''), count(*), total(s.amount), total(s.total) "
+            "FROM sales s JOIN invoices i ON i.idFac = s.idFactura LEFT JOIN products p ON p.code = s.idProducto "
+            "GROUP BY 1, 2, 3;",
+        ]
+        db = QtSql.QSqlDatabase.database()
+        if not db.transaction():
+            print("Error rebuildSalesCubes: ", db.lastError().text())
+            return False
+        try:
+            query = QtSql.QSqlQuery()
+            for statement in statements:
+                if not query.exec(statement):
+                    raise RuntimeError(query.lastError().text())
+            query.finish()
+            if not db.commit():
+                raise RuntimeError(db.lastError().text())
+            return True
+        except Exception as error:
+            print("Error rebuildSalesCubes: ", error)
+            db.rollback()
+            return False
+
+QueryStats.instrument(Connection)
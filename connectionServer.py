@@ -1,118 +1,1037 @@
-import mysql.connector
-from mysql.connector import Error
-import os
-from PyQt6 import QtSql, QtWidgets
-
-class ConnectionServer():
-    def crear_conexion(self):
-        try:
-            conexion = mysql.connector.connect(
-            host='192.168.10.66', # Cambia esto a la IP de tu servidor user='dam', # Usuario creado
-            #host='192.168.1.49',
-            user='dam',
-            password='dam2425',
-            database='bbdd',
-            charset="utf8mb4",
-            collation="utf8mb4_general_ci"  # Asegúrate de que aquí esté configurado
-            # Contraseña del usuario database='bbdd' # Nombre de la base de datos
+import itertools
+import re
+
+try:
+    import mysql.connector
+    from mysql.connector import Error, pooling
+except ImportError:
+    mysql = None
+    Error = Exception
+
+from connection import Connection
+from rows import CustomerRow, ProductRow, InvoiceSummaryRow, RevenueRow, SaleRow, SearchResult, columnList
+
+
+class ConnectionServer:
+    """
+        MySQL/MariaDB backend with the same method surface as Connection (see Repository).
+
+        Connections come from a mysql.connector pool created once by configure(), so a call
+        only borrows an already open connection instead of opening a new one. The server
+        settings are read from the local settings table (``mysql.host``, ``mysql.port``,
+        ``mysql.user``, ``mysql.password``, ``mysql.database``, ``mysql.pool_size``).
+        createSchema() creates the tables, so any local MySQL or MariaDB can stand in for
+        the head office server.
+    """
+    SETTING_PREFIX = "mysql."
+    DEFAULTS = {
+        "host": "127.0.0.1",
+        "port": "3306",
+        "user": "dam",
+        "password": "",
+        "database": "bbdd",
+        "pool_size": "5",
+    }
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS provincias ("
+        "idprov INT NOT NULL PRIMARY KEY, provincia VARCHAR(100) NOT NULL, "
+        "KEY idx_provincias_provincia (provincia));",
+        "CREATE TABLE IF NOT EXISTS municipios ("
+        "idmuni INT NOT NULL PRIMARY KEY, idprov INT NOT NULL, municipio VARCHAR(100) NOT NULL, "
+        "KEY idx_municipios_idprov (idprov));",
+        "CREATE TABLE IF NOT EXISTS customers ("
+        "dni_nie VARCHAR(9) NOT NULL PRIMARY KEY, adddata VARCHAR(10), surname VARCHAR(100), name VARCHAR(100), "
+        "mail VARCHAR(150), mobile BIGINT, address VARCHAR(200), province VARCHAR(100), city VARCHAR(100), "
+        "invoicetype VARCHAR(20), historical VARCHAR(5) NOT NULL DEFAULT 'True', "
+        "KEY idx_customers_mobile (mobile), "
+        "KEY idx_customers_historical_surname_dni (historical, surname, dni_nie), "
+        "KEY idx_customers_surname_dni (surname, dni_nie));",
+        "CREATE TABLE IF NOT EXISTS products ("
+        "code INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(150) NOT NULL UNIQUE, stock INT NOT NULL, "
+        "family VARCHAR(50) NOT NULL, unit_price DOUBLE NOT NULL, currency VARCHAR(5) NOT NULL DEFAULT '€');",
+        "CREATE TABLE IF NOT EXISTS invoices ("
+        "idFac INT NOT NULL AUTO_INCREMENT PRIMARY KEY, dni_nie VARCHAR(9), date VARCHAR(10), "
+        "till_id VARCHAR(32), till_idFac INT, UNIQUE KEY uq_invoices_till (till_id, till_idFac));",
+        "CREATE TABLE IF NOT EXISTS sales ("
+        "id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, idFactura INT NOT NULL, idProducto INT NOT NULL, "
+        "amount INT NOT NULL, product VARCHAR(150) NOT NULL, unitprice DOUBLE NOT NULL, total DOUBLE NOT NULL, "
+        "till_id VARCHAR(32), till_sale_id INT, "
+        "KEY idx_sales_idfactura (idFactura), UNIQUE KEY uq_sales_till (till_id, till_sale_id));",
+        "CREATE TABLE IF NOT EXISTS stock_movements ("
+        "id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY, code INT NOT NULL, delta INT NOT NULL, stock INT NOT NULL, "
+        "reason VARCHAR(20) NOT NULL, ref INT, created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "till_id VARCHAR(32), till_movement_id INT, "
+        "KEY idx_stock_movements_code (code, id), UNIQUE KEY uq_stock_movements_till (till_id, till_movement_id));",
+        "CREATE TABLE IF NOT EXISTS till_products ("
+        "till_id VARCHAR(32) NOT NULL, till_code INT NOT NULL, code INT NOT NULL, "
+        "PRIMARY KEY (till_id, till_code), KEY idx_till_products_code (code));",
+    ]
+
+    # Columns added to the tables of servers created before the tills were told apart
+    TILL_COLUMNS = {
+        "invoices": "ALTER TABLE invoices ADD COLUMN till_id VARCHAR(32), ADD COLUMN till_idFac INT, "
+                    "ADD UNIQUE KEY uq_invoices_till (till_id, till_idFac)",
+        "sales": "ALTER TABLE sales ADD COLUMN till_id VARCHAR(32), ADD COLUMN till_sale_id INT, "
+                 "ADD UNIQUE KEY uq_sales_till (till_id, till_sale_id)",
+        "stock_movements": "ALTER TABLE stock_movements ADD COLUMN till_id VARCHAR(32), ADD COLUMN till_movement_id INT, "
+                           "ADD UNIQUE KEY uq_stock_movements_till (till_id, till_movement_id)",
+    }
+
+    # The server has no invoice_totals table, the totals are summed from the sale lines
+    INVOICE_SUMMARY = ("SELECT i.idFac, i.dni_nie, i.date, count(s.id), round(coalesce(sum(s.total), 0), 2), "
+                       "round(coalesce(sum(s.total), 0) * 0.21, 2), round(coalesce(sum(s.total), 0) * 1.21, 2) "
+                       "FROM invoices i LEFT JOIN sales s ON s.idFactura = i.idFac {where}"
+                       "GROUP BY i.idFac, i.dni_nie, i.date ")
+
+    # The server keeps no daily aggregates, the sales reports group the sale lines
+    SALES_BY_DAY = ("FROM sales s JOIN invoices i ON i.idFac = s.idFactura "
+                    "LEFT JOIN products p ON p.code = s.idProducto LEFT JOIN customers c ON c.dni_nie = i.dni_nie "
+                    "WHERE CONCAT(SUBSTR(i.date, 7, 4), '-', SUBSTR(i.date, 4, 2), '-', SUBSTR(i.date, 1, 2)) "
+                    "BETWEEN %s AND %s ")
+
+    _pool = None
+    _pool_ids = itertools.count(1)
+    _settings = None
+    _provinces = None
+    _cities = {}
+
+    @staticmethod
+    def configure(config=None, db=None):
+        """
+            Creates the connection pool, or keeps the current one if the settings did not
+            change since it was created.
+
+            :param config: Values overriding the ``mysql.*`` settings (host, port, user,
+                           password, database, pool_size).
+            :type config: dict
+            :param db: The local connection the settings are read from, the default one if None.
+            :type db: QSqlDatabase
+            :return: True if the pool is ready, False otherwise.
+            :rtype: bool
+        """
+        if mysql is None:
+            print("Error ConnectionServer.configure: mysql-connector-python is not installed")
+            return False
+
+        settings = dict(ConnectionServer.DEFAULTS)
+        for key, value in Connection.getSettings(db) or []:
+            if str(key).startswith(ConnectionServer.SETTING_PREFIX):
+                settings[str(key)[len(ConnectionServer.SETTING_PREFIX):]] = value
+        settings.update(config or {})
+        settings = {key: str(value) for key, value in settings.items()}
+
+        # The open pool is kept while the settings do not change
+        if ConnectionServer._pool is not None and settings == ConnectionServer._settings:
+            return True
+
+        try:
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"bbdd{next(ConnectionServer._pool_ids)}",
+                pool_size=int(settings["pool_size"]),
+                host=settings["host"],
+                port=int(settings["port"]),
+                user=settings["user"],
+                password=settings["password"],
+                database=settings["database"],
+                charset="utf8mb4",
+                collation="utf8mb4_general_ci",
+                autocommit=False,
             )
+        except (Error, ValueError) as error:
+            print(f"Error al conectar a la base de datos: {error}")
+            ConnectionServer.close()
+            return False
 
-            if conexion.is_connected():
-                pass
-                #print("Conexión exitosa a la base de datos")
-            else:
-                print("error conexion")
-            return conexion
-        except Error as e:
-            print(f"Error al conectar a la base de datos: {e}")
-            return None
-        return None
+        ConnectionServer.close()
+        ConnectionServer._pool, ConnectionServer._settings = pool, settings
+        ConnectionServer._provinces = None
+        ConnectionServer._cities = {}
+        return True
 
     @staticmethod
-    def listaProv(self=None):
-        listaprov = []
-        conexion = ConexionServer().crear_conexion()
-        if conexion:
+    def close():
+        """
+            Closes the idle connections of the pool and forgets it; the next call
+            creates a new one.
+        """
+        pool, ConnectionServer._pool, ConnectionServer._settings = ConnectionServer._pool, None, None
+        if pool is not None:
             try:
-                cursor = conexion.cursor()
-                cursor.execute("SELECT * FROM provincias")
-                resultados = cursor.fetchall()
-                for fila in resultados:
-                    listaprov.append(fila[1])  # Asumiendo que el nombre de la provincia está en la segunda columna
-                cursor.close()
-                conexion.close()
-            except Error as e:
-                print(f"Error al ejecutar la consulta: {e}")
-        return listaprov
+                pool._remove_connections()
+            except Error as error:
+                print("Error ConnectionServer.close: ", error)
 
     @staticmethod
-    def listaMuniProv(provincia):
+    def _connect():
+        if ConnectionServer._pool is None and not ConnectionServer.configure():
+            raise RuntimeError("MySQL backend is not configured")
+        return ConnectionServer._pool.get_connection()
+
+    @staticmethod
+    def _fetch(sql, params=(), row_type=None):
+        """
+            Runs a SELECT on a pooled connection.
+
+            :return: The rows as tuples, or as ``row_type`` instances.
+            :rtype: list
+        """
+        conexion = ConnectionServer._connect()
         try:
-            conexion = ConexionServer().crear_conexion()
-            listamunicipios = []
             cursor = conexion.cursor()
-            cursor.execute(
-                "SELECT * FROM municipios WHERE idprov = (SELECT idprov FROM provincias WHERE provincia = %s)",
-                (provincia,)
-            )
-            resultados = cursor.fetchall()
-            for fila in resultados:
-                listamunicipios.append(fila[1])  # Asumiendo que el nombre de la provincia está en la segunda columna
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            conexion.commit()
+            if row_type is None:
+                return rows
+            return [row_type._make(row) for row in rows]
+        finally:
+            # Devuelve la conexion al pool
+            conexion.close()
+
+    @staticmethod
+    def _write(statements):
+        """
+            Runs several writes in one transaction on a pooled connection.
+
+            :param statements: (sql, params) pairs; a list of parameter tuples is sent as
+                               one batch with executemany.
+            :type statements: list
+            :return: The (rowcount, lastrowid) of the last statement.
+            :rtype: tuple
+        """
+        conexion = ConnectionServer._connect()
+        try:
+            cursor = conexion.cursor()
+            for sql, params in statements:
+                if isinstance(params, list):
+                    cursor.executemany(sql, params)
+                else:
+                    cursor.execute(sql, params)
+            result = (cursor.rowcount, cursor.lastrowid)
             cursor.close()
+            conexion.commit()
+            return result
+        except Exception:
+            conexion.rollback()
+            raise
+        finally:
             conexion.close()
-            return listamunicipios
+
+    @staticmethod
+    def _text(value):
+        """
+            Reads the value of a form field the same way Connection does.
+        """
+        if value in ("electronic", "paper"):
+            return value
+        try:
+            return str(value.text())
+        except AttributeError:
+            try:
+                return str(value.currentText())
+            except AttributeError:
+                return str(value)
+
+    @staticmethod
+    def createSchema():
+        """
+            Creates the tables and indexes on the server if they do not exist.
+
+            :return: True if successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([(statement, ()) for statement in ConnectionServer.SCHEMA])
+            upgrades = [(statement, ()) for table, statement in ConnectionServer.TILL_COLUMNS.items()
+                        if not ConnectionServer._fetch("SELECT 1 FROM information_schema.columns WHERE table_schema = "
+                                                       "DATABASE() AND table_name = %s AND column_name = 'till_id'",
+                                                       (table,))]
+            if upgrades:
+                ConnectionServer._write(upgrades)
+            return True
         except Exception as error:
-            print("error lista muni", error)
+            print("Error createSchema: ", error)
+            return False
+
+    @staticmethod
+    def copyReferenceData():
+        """
+            Copies provincias and municipios from the local SQLite database to the server.
 
-    def listadoClientes(self):
+            :return: True if successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            from PyQt6 import QtSql
+            query = QtSql.QSqlQuery()
+            query.exec("SELECT idprov, provincia FROM provincias;")
+            provinces = []
+            while query.next():
+                provinces.append((query.value(0), query.value(1)))
+            query.exec("SELECT idmuni, idprov, municipio FROM municipios;")
+            cities = []
+            while query.next():
+                cities.append((query.value(0), query.value(1), query.value(2)))
+            query.finish()
+
+            ConnectionServer._write([
+                ("INSERT INTO provincias (idprov, provincia) VALUES (%s, %s) "
+                 "ON DUPLICATE KEY UPDATE provincia = VALUES(provincia)", provinces),
+                ("INSERT INTO municipios (idmuni, idprov, municipio) VALUES (%s, %s, %s) "
+                 "ON DUPLICATE KEY UPDATE idprov = VALUES(idprov), municipio = VALUES(municipio)", cities),
+            ])
+            ConnectionServer._provinces = None
+            ConnectionServer._cities = {}
+            return True
+        except Exception as error:
+            print("Error copyReferenceData: ", error)
+            return False
+
+    @staticmethod
+    def applyChanges(till_id, upserts, deletes):
+        """
+            Applies a batch of changes synced from one till in one transaction (see SyncEngine).
+
+            Several tills sync into the same server, so their local keys are never used as
+            server keys: invoices, sales and stock movements get server keys and keep the
+            local one next to ``till_id`` (unique per till), and every till product is mapped
+            to the product of the same name in till_products. Customers keep their DNI/NIE.
+            Stock is never copied: every new stock movement of the till adds its delta to
+            the server stock. Applying the same batch twice leaves the same data.
+
+            :param till_id: The identifier of the till (SyncEngine.tillId).
+            :type till_id: str
+            :param upserts: (table, row_type, rows) triples, in SyncEngine.TABLES order.
+            :type upserts: list
+            :param deletes: (table, key column, keys) triples.
+            :type deletes: list
+        """
+        conexion = ConnectionServer._connect()
         try:
-            conexion = ConexionServer().crear_conexion()
-            listadoclientes = []
             cursor = conexion.cursor()
-            cursor.execute("SELECT * FROM clientes ORDER BY apelcli, nomecli ASC")
-            resultados = cursor.fetchall()
-            for fila in resultados:      # Procesar cada fila de los resultados y crea una lista con valores de la fila
-                listadoclientes.append(list(fila))  # Convierte la tupla en una lista y la añade a listadoclientes
-            cursor.close()    # Cerrar el cursor y la conexión si no los necesitas más
+            for table, row_type, rows in upserts:
+                if table == "customers":
+                    updates = ", ".join(f"{field} = VALUES({field})" for field in row_type._fields)
+                    cursor.executemany(f"INSERT INTO customers ({columnList(row_type)}) "
+                                       f"VALUES ({', '.join(['%s'] * len(row_type._fields))}) "
+                                       f"ON DUPLICATE KEY UPDATE {updates}", [tuple(row) for row in rows])
+                elif table == "products":
+                    for row in rows:
+                        ConnectionServer._applyProduct(cursor, till_id, row)
+                elif table == "invoices":
+                    cursor.executemany("INSERT INTO invoices (till_id, till_idFac, dni_nie, date) VALUES (%s, %s, %s, %s) "
+                                       "ON DUPLICATE KEY UPDATE dni_nie = VALUES(dni_nie), date = VALUES(date)",
+                                       [(till_id, row.idFac, row.dni_nie, row.date) for row in rows])
+                elif table == "sales":
+                    # The invoice and the product are looked up by their till keys
+                    for row in rows:
+                        cursor.execute("INSERT INTO sales (till_id, till_sale_id, idFactura, idProducto, amount, product, "
+                                       "unitprice, total) SELECT %s, %s, i.idFac, coalesce(tp.code, 0), %s, %s, %s, %s "
+                                       "FROM invoices i LEFT JOIN till_products tp ON tp.till_id = %s AND tp.till_code = %s "
+                                       "WHERE i.till_id = %s AND i.till_idFac = %s "
+                                       "ON DUPLICATE KEY UPDATE idFactura = VALUES(idFactura), idProducto = VALUES(idProducto), "
+                                       "amount = VALUES(amount), product = VALUES(product), unitprice = VALUES(unitprice), "
+                                       "total = VALUES(total)",
+                                       (till_id, row.id, row.amount, row.product, row.unitprice, row.total,
+                                        till_id, row.idProducto, till_id, row.idFactura))
+                elif table == "stock_movements":
+                    for row in rows:
+                        ConnectionServer._applyStockMovement(cursor, till_id, row)
+
+            deleted = {
+                "customers": "DELETE FROM customers WHERE dni_nie = %s",
+                # The product stays in the catalog; its stock left with the 'delete' movement
+                "products": "DELETE FROM till_products WHERE till_id = %s AND till_code = %s",
+                "invoices": "DELETE FROM invoices WHERE till_id = %s AND till_idFac = %s",
+                "sales": "DELETE FROM sales WHERE till_id = %s AND till_sale_id = %s",
+            }
+            for table, key, keys in deletes:
+                if table == "customers":
+                    cursor.executemany(deleted[table], [(pk,) for pk in keys])
+                elif table in deleted:
+                    cursor.executemany(deleted[table], [(till_id, pk) for pk in keys])
+            cursor.close()
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+        finally:
             conexion.close()
-            return listadoclientes
-        except Exception as e:
-            print("error listado en conexion", e)
-
-    def altaCliente(cliente):
-        try:
-            conexion = ConexionServer().crear_conexion()
-            if conexion:
-                cursor = conexion.cursor()
-                # Definir la consulta de inserción
-                query = """
-                INSERT INTO clientes (dnicli, altacli, apelcli, nomecli, dircli, emailcli, movilcli, provcli, municli)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(query, cliente)          # Ejecutar la consulta pasando la lista directamente
-                conexion.commit()  # Confirmar la transacción
-                cursor.close()   # Cerrar el cursor y la conexión
+
+    @staticmethod
+    def _applyProduct(cursor, till_id, row):
+        """
+            Writes a till product to the server catalog, without its stock: the product
+            already mapped to the till code is updated (and renamed), otherwise the product
+            of the same name is taken, or created with no stock, and mapped.
+        """
+        cursor.execute("SELECT code FROM till_products WHERE till_id = %s AND till_code = %s", (till_id, row.code))
+        mapped = cursor.fetchone()
+        if mapped is not None:
+            cursor.execute("UPDATE products SET name = %s, family = %s, unit_price = %s, currency = %s WHERE code = %s",
+                           (row.name, row.family, row.unit_price, row.currency, mapped[0]))
+            return
+        # LAST_INSERT_ID(code) makes lastrowid the code of the existing product as well
+        cursor.execute("INSERT INTO products (name, stock, family, unit_price, currency) VALUES (%s, 0, %s, %s, %s) "
+                       "ON DUPLICATE KEY UPDATE family = VALUES(family), unit_price = VALUES(unit_price), "
+                       "currency = VALUES(currency), code = LAST_INSERT_ID(code)",
+                       (row.name, row.family, row.unit_price, row.currency))
+        cursor.execute("INSERT INTO till_products (till_id, till_code, code) VALUES (%s, %s, %s)",
+                       (till_id, row.code, cursor.lastrowid))
+
+    @staticmethod
+    def _applyStockMovement(cursor, till_id, row):
+        """
+            Records a stock movement of a till and adds its delta to the server stock,
+            only the first time the movement is received.
+        """
+        cursor.execute("INSERT INTO stock_movements (till_id, till_movement_id, code, delta, stock, reason, ref, created) "
+                       "SELECT %s, %s, p.code, %s, p.stock + %s, %s, %s, %s FROM till_products tp "
+                       "JOIN products p ON p.code = tp.code WHERE tp.till_id = %s AND tp.till_code = %s "
+                       "ON DUPLICATE KEY UPDATE id = id",
+                       (till_id, row.id, row.delta, row.delta, row.reason, row.ref if row.ref != "" else None,
+                        row.created, till_id, row.code))
+        if cursor.rowcount == 1:
+            cursor.execute("UPDATE products SET stock = stock + %s "
+                           "WHERE code = (SELECT code FROM till_products WHERE till_id = %s AND till_code = %s)",
+                           (row.delta, till_id, row.code))
+
+    # reference data section
+    @staticmethod
+    def getProvinces():
+        """
+            :return: A tuple of province names, cached after the first call.
+            :rtype: tuple
+        """
+        try:
+            if ConnectionServer._provinces is None:
+                rows = ConnectionServer._fetch("SELECT provincia FROM provincias ORDER BY idprov")
+                ConnectionServer._provinces = tuple(row[0] for row in rows)
+            return ConnectionServer._provinces
+        except Exception as error:
+            print("Error getProvinces: ", error)
+            return ()
+
+    @staticmethod
+    def getCities(province):
+        """
+            :param province: The name of the province.
+            :type province: str
+            :return: A tuple of city names, cached per province.
+            :rtype: tuple
+        """
+        try:
+            cities = ConnectionServer._cities.get(province)
+            if cities is None:
+                rows = ConnectionServer._fetch(
+                    "SELECT m.municipio FROM municipios m JOIN provincias p ON p.idprov = m.idprov "
+                    "WHERE p.provincia = %s ORDER BY m.idmuni", (province,))
+                cities = ConnectionServer._cities[province] = tuple(row[0] for row in rows)
+            return cities
+        except Exception as error:
+            print("error lista muni", error)
+            return ()
+
+    # customers section
+    @staticmethod
+    def getCustomers(historical=True, db=None):
+        """
+            :param historical: If True, returns only active customers. If False, returns all.
+            :type historical: bool
+            :param db: Ignored; the server readers are submitted to the QueryExecutor with
+                       ``local=False``, so no local connection is opened for them.
+            :return: A list of CustomerRow ordered by surname.
+            :rtype: list
+        """
+        try:
+            where = "WHERE historical = 'True' " if historical else ""
+            return ConnectionServer._fetch(f"SELECT {columnList(CustomerRow)} FROM customers {where}"
+                                           "ORDER BY surname, dni_nie", (), CustomerRow)
+        except Exception as error:
+            print("error listado en conexion", error)
+            return []
+
+    @staticmethod
+    def getCustomersPage(historical=True, after=None, limit=500):
+        """
+            Retrieves one page of customers ordered by (surname, dni_nie), see Connection.getCustomersPage.
+
+            :return: A tuple (list of CustomerRow, next cursor or None).
+            :rtype: tuple
+        """
+        try:
+            conditions = []
+            params = []
+            if historical:
+                conditions.append("historical = 'True'")
+            if after is not None:
+                conditions.append("(surname, dni_nie) > (%s, %s)")
+                params.extend(after)
+            where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+            params.append(int(limit))
+
+            all_customers = ConnectionServer._fetch(f"SELECT {columnList(CustomerRow)} FROM customers {where}"
+                                                    "ORDER BY surname, dni_nie LIMIT %s", tuple(params), CustomerRow)
+            next_cursor = None
+            if len(all_customers) == limit:
+                next_cursor = (all_customers[-1].surname, all_customers[-1].dni_nie)
+            return all_customers, next_cursor
+        except Exception as error:
+            print("Error getCustomersPage: ", error)
+            return [], None
+
+    @staticmethod
+    def iterCustomers(historical=True, page_size=500):
+        """
+            :return: A generator of CustomerRow, read page by page.
+            :rtype: generator
+        """
+        cursor = None
+        while True:
+            page, cursor = ConnectionServer.getCustomersPage(historical, cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    @staticmethod
+    def getCustomerData(data, type_search):
+        """
+            :param data: The DNI/NIE or the mobile.
+            :type data: str
+            :param type_search: "dni" or "phone".
+            :type type_search: str
+            :return: The CustomerRow of the found customer, an empty list if not found.
+            :rtype: CustomerRow|list
+        """
+        try:
+            if type_search == "phone":
+                sql = f"SELECT {columnList(CustomerRow)} FROM customers WHERE mobile = %s LIMIT 1"
+            elif type_search == "dni":
+                sql = f"SELECT {columnList(CustomerRow)} FROM customers WHERE dni_nie = %s"
+            else:
+                return []
+            found = ConnectionServer._fetch(sql, (str(data).strip(),), CustomerRow)
+            return found[0] if found else []
+        except Exception as error:
+            print("Error al obtener datos de un cliente:", error)
+            return []
+
+    @staticmethod
+    def deleteCustomer(dni):
+        """
+            Marks a customer as inactive (historical = 'False').
+
+            :return: True if the update was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("UPDATE customers SET historical = %s WHERE dni_nie = %s", (str(False), dni))])
+            return True
+        except Exception as error:
+            print("Error deleteCustomer: ", error)
+            return False
+
+    @staticmethod
+    def addCustomer(data):
+        """
+            :param data: The form fields in CustomerRow order, without historical.
+            :type data: list
+            :return: True if insertion was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            values = [ConnectionServer._text(value) for value in data[:10]] + [str(True)]
+            ConnectionServer._write([(f"INSERT INTO customers ({columnList(CustomerRow)}) "
+                                      f"VALUES ({', '.join(['%s'] * len(values))})", tuple(values))])
+            return True
+        except Exception as error:
+            print(f"Error al insertar el cliente: {error}")
+            return False
+
+    @staticmethod
+    def setCustomerData(data):
+        """
+            :param data: The form fields in CustomerRow order, historical last.
+            :type data: list
+            :return: True if the update was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            values = [ConnectionServer._text(value) for value in data[1:10]] + [str(data[10]),
+                                                                               ConnectionServer._text(data[0])]
+            ConnectionServer._write([("UPDATE customers SET adddata = %s, surname = %s, name = %s, mail = %s, "
+                                      "mobile = %s, address = %s, province = %s, city = %s, invoicetype = %s, "
+                                      "historical = %s WHERE dni_nie = %s", tuple(values))])
+            return True
+        except Exception as error:
+            print("Error setCustomerData: ", error)
+            return False
+
+    # products section
+    @staticmethod
+    def getProducts(db=None):
+        """
+            :param db: Ignored; the server readers are submitted to the QueryExecutor with
+                       ``local=False``, so no local connection is opened for them.
+            :return: A list of ProductRow ordered by code.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch(f"SELECT {columnList(ProductRow)} FROM products ORDER BY code",
+                                           (), ProductRow)
+        except Exception as error:
+            print("Error getProducts: ", error)
+            return []
+
+    @staticmethod
+    def addProduct(data):
+        """
+            :param data: The form fields [name, stock, family, price, currency].
+            :type data: list
+            :return: True if the product was added, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("INSERT INTO products (name, stock, family, unit_price, currency) "
+                                      "VALUES (%s, %s, %s, %s, %s)",
+                                      tuple(ConnectionServer._text(value) for value in data[:5]))])
+            return True
+        except Exception as error:
+            print("Error addProduct: ", error)
+            return False
+
+    @staticmethod
+    def getProductData(product, search_type="name"):
+        """
+            :param product: The product name or code.
+            :param search_type: "name" or "id".
+            :type search_type: str
+            :return: The ProductRow of the found product, an empty list if not found.
+            :rtype: ProductRow|list
+        """
+        try:
+            if search_type == "name":
+                sql = f"SELECT {columnList(ProductRow)} FROM products WHERE name = %s"
+            elif search_type == "id":
+                sql = f"SELECT {columnList(ProductRow)} FROM products WHERE code = %s"
+            else:
+                return []
+            found = ConnectionServer._fetch(sql, (product,), ProductRow)
+            return found[0] if found else []
+        except Exception as error:
+            print("Error getProductData: ", error)
+            return []
+
+    @staticmethod
+    def deleteProduct(product_name):
+        """
+            :return: True if deletion was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("DELETE FROM products WHERE name = %s", (str(product_name),))])
+            return True
+        except Exception as error:
+            print("Error deleteProduct: ", error)
+            return False
+
+    @staticmethod
+    def setProductData(data):
+        """
+            :param data: The form fields [name, stock, family, price, currency].
+            :type data: list
+            :return: True if the update was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            name, stock, family, unit_price, currency = (ConnectionServer._text(value) for value in data[:5])
+            ConnectionServer._write([("UPDATE products SET stock = %s, family = %s, unit_price = %s, currency = %s "
+                                      "WHERE name = %s", (stock, family, unit_price, currency, name))])
+            return True
+        except Exception as error:
+            print("Error setProductData: ", error)
+            return False
+
+    @staticmethod
+    def updateStockProductData(data):
+        """
+            :param data: [code, stock].
+            :type data: list
+            :return: True if the update was successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("UPDATE products SET stock = %s WHERE code = %s", (int(data[1]), int(data[0])))])
+            return True
+        except Exception as error:
+            print("Error updateProduct: ", error)
+            return False
+
+    @staticmethod
+    def _reserveStock(cursor, demand, reason, ref=None):
+        """
+            Decrements the stock of every product of ``demand`` in the open transaction of
+            ``cursor``; InnoDB locks each product row until the commit. Every decrement
+            is written to the stock movements ledger.
+
+            :param demand: {code: units} as returned by Connection._stockDemand.
+            :type demand: dict
+            :raises RuntimeError: When a product does not exist or has not enough stock.
+        """
+        for code, units in demand.items():
+            cursor.execute("UPDATE products SET stock = stock - %s WHERE code = %s AND stock >= %s",
+                           (units, code, units))
+            if cursor.rowcount != 1:
+                raise RuntimeError(f"not enough stock of product {code} for {units} units")
+        cursor.executemany("INSERT INTO stock_movements (code, delta, stock, reason, ref) "
+                           "SELECT code, %s, stock, %s, %s FROM products WHERE code = %s",
+                           [(-units, str(reason), None if ref is None else int(ref), code)
+                            for code, units in demand.items()])
+
+    @staticmethod
+    def reserveStock(items, reason="reservation", ref=None):
+        """
+            :param items: (product_id, amount) pairs.
+            :type items: list
+            :return: True if every product had enough stock and the change was committed.
+            :rtype: bool
+        """
+        demand = Connection._stockDemand(items)
+        if not demand:
+            return True
+        conexion = None
+        try:
+            conexion = ConnectionServer._connect()
+            cursor = conexion.cursor()
+            ConnectionServer._reserveStock(cursor, demand, reason, ref)
+            cursor.close()
+            conexion.commit()
+            return True
+        except Exception as error:
+            print("Error reserveStock: ", error)
+            if conexion is not None:
+                conexion.rollback()
+            return False
+        finally:
+            if conexion is not None:
                 conexion.close()
-                return True
-        except Error as e:
-            print(f"Error al insertar el cliente: {e}")
-
-    def datosOneCliente(dni):
-        print(dni)
-        registro = []  # Inicializa la lista para almacenar los datos del cliente
-        try:
-            conexion = ConexionServer().crear_conexion()
-            if conexion:
-                cursor = conexion.cursor()
-                # Definir la consulta de selección
-                query = '''SELECT * FROM clientes WHERE dnicli = %s'''  # Usa %s para el placeholder
-                cursor.execute(query, (dni,))  # Pasar 'dni' como una tupla
-                # Recuperar los datos de la consulta
-                for row in cursor.fetchall():
-                    registro.extend([str(col) for col in row])
-            print(registro)
-            return registro
-
-        except Exception as e:
-            print("Error al obtener datos de un cliente:", e)
-            return None  # Devolver None en caso de error
\ No newline at end of file
+
+    @staticmethod
+    def getStockShortages(items):
+        """
+            :param items: (product_id, amount) pairs.
+            :type items: list
+            :return: (code, name, stock, requested) of every product short of stock.
+            :rtype: list
+        """
+        try:
+            demand = Connection._stockDemand(items)
+            if not demand:
+                return []
+            placeholders = ", ".join(["%s"] * len(demand))
+            found = {int(code): (name, int(stock)) for code, name, stock in ConnectionServer._fetch(
+                f"SELECT code, name, stock FROM products WHERE code IN ({placeholders})", tuple(demand))}
+            return [(code, found.get(code, ("", 0))[0], found.get(code, ("", 0))[1], units)
+                    for code, units in demand.items() if found.get(code, ("", 0))[1] < units]
+        except Exception as error:
+            print("Error getStockShortages: ", error)
+            return []
+
+    @staticmethod
+    def getProductFamilies():
+        """
+            :return: The distinct product families.
+            :rtype: list
+        """
+        try:
+            return [row[0] for row in ConnectionServer._fetch("SELECT DISTINCT family FROM products ORDER BY family")]
+        except Exception as error:
+            print("Error getProductFamilies: ", error)
+            return []
+
+    # search section
+    @staticmethod
+    def search(text, scope=None, limit=20):
+        """
+            Prefix search over customers (surname, name) and products (name, family):
+            every word must match the start of one of the columns.
+
+            :return: A list of SearchResult.
+            :rtype: list
+        """
+        try:
+            words = re.findall(r"\w+", str(text))
+            if not words:
+                return []
+
+            targets = []
+            if scope in (None, "customers"):
+                targets.append(("customer", "SELECT dni_nie, CONCAT(surname, ', ', name) FROM customers",
+                                ("surname", "name")))
+            if scope in (None, "products"):
+                targets.append(("product", "SELECT code, name FROM products", ("name", "family")))
+
+            results = []
+            for kind, select, columns in targets:
+                condition = "(" + " OR ".join(f"{column} LIKE %s" for column in columns) + ")"
+                params = [f"{word}%" for word in words for _ in columns] + [int(limit)]
+                rows = ConnectionServer._fetch(f"{select} WHERE {' AND '.join([condition] * len(words))} LIMIT %s",
+                                               tuple(params))
+                results.extend(SearchResult(kind, row[0], row[1], 0.0) for row in rows)
+            return results[:limit]
+        except Exception as error:
+            print("Error search: ", error)
+            return []
+
+    # invoice section
+    @staticmethod
+    def addInvoice(data):
+        """
+            :param data: [dni, date_string].
+            :type data: list
+            :return: The idFac of the new invoice, False if it was not created.
+            :rtype: int|bool
+        """
+        try:
+            _, id_factura = ConnectionServer._write([("INSERT INTO invoices (dni_nie, date) VALUES (%s, %s)",
+                                                      (str(data[0]), str(data[1])))])
+            return int(id_factura)
+        except Exception as error:
+            print("Error addInvoice: ", error)
+            return False
+
+    @staticmethod
+    def getAllInvoices(db=None):
+        """
+            :param db: Ignored; the server readers are submitted to the QueryExecutor with
+                       ``local=False``, so no local connection is opened for them.
+            :return: A list of InvoiceSummaryRow, newest first.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch(ConnectionServer.INVOICE_SUMMARY.format(where="") + "ORDER BY i.idFac DESC",
+                                           (), InvoiceSummaryRow)
+        except Exception as error:
+            print("Error getAllInvoices: ", error)
+            return []
+
+    @staticmethod
+    def getInvoicesPage(before=None, limit=500):
+        """
+            :return: A tuple (list of InvoiceSummaryRow, next cursor or None).
+            :rtype: tuple
+        """
+        try:
+            where = "WHERE i.idFac < %s " if before is not None else ""
+            params = (int(before), int(limit)) if before is not None else (int(limit),)
+            all_data_invoices = ConnectionServer._fetch(ConnectionServer.INVOICE_SUMMARY.format(where=where)
+                                                        + "ORDER BY i.idFac DESC LIMIT %s", params, InvoiceSummaryRow)
+            next_cursor = all_data_invoices[-1].idFac if len(all_data_invoices) == limit else None
+            return all_data_invoices, next_cursor
+        except Exception as error:
+            print("Error getInvoicesPage: ", error)
+            return [], None
+
+    @staticmethod
+    def iterInvoices(page_size=500):
+        """
+            :return: A generator of InvoiceSummaryRow, newest first.
+            :rtype: generator
+        """
+        cursor = None
+        while True:
+            page, cursor = ConnectionServer.getInvoicesPage(cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    @staticmethod
+    def getInvoiceTotals(id_factura):
+        """
+            :return: The InvoiceSummaryRow of the invoice, None if it does not exist.
+            :rtype: InvoiceSummaryRow
+        """
+        try:
+            rows = ConnectionServer._fetch(ConnectionServer.INVOICE_SUMMARY.format(where="WHERE i.idFac = %s "),
+                                           (int(id_factura),), InvoiceSummaryRow)
+            return rows[0] if rows else None
+        except Exception as error:
+            print("Error getInvoiceTotals: ", error)
+            return None
+
+    @staticmethod
+    def addSale(data):
+        """
+            :param data: [invoice_id, product_id, amount, name, unit_price, total].
+            :type data: list
+            :return: True if successful, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total) "
+                                      "VALUES (%s, %s, %s, %s, %s, %s)", tuple(str(value) for value in data[:6]))])
+            return True
+        except Exception as error:
+            print("Error addSale: ", error)
+            return False
+
+    @staticmethod
+    def saveSales(id_factura, sales):
+        """
+            Saves every line of an invoice and decrements the stock in one transaction,
+            with one batched INSERT and one batched UPDATE.
+
+            :param sales: A list of lines: [product_id, amount, name, unit_price, total].
+            :type sales: list
+            :return: True if everything was committed, False otherwise.
+            :rtype: bool
+        """
+        if not sales:
+            return False
+        conexion = None
+        try:
+            lines = [(int(id_factura), int(line[0]), int(line[1]), str(line[2]), float(line[3]), float(line[4]))
+                     for line in sales]
+            conexion = ConnectionServer._connect()
+            cursor = conexion.cursor()
+            cursor.executemany("INSERT INTO sales (idFactura, idProducto, amount, product, unitprice, total) "
+                               "VALUES (%s, %s, %s, %s, %s, %s)", lines)
+            ConnectionServer._reserveStock(cursor, Connection._stockDemand((line[1], line[2]) for line in lines),
+                                           "sale", id_factura)
+            cursor.close()
+            conexion.commit()
+            return True
+        except Exception as error:
+            print("Error saveSales: ", error)
+            if conexion is not None:
+                conexion.rollback()
+            return False
+        finally:
+            if conexion is not None:
+                conexion.close()
+
+    @staticmethod
+    def getSale(id_factura):
+        """
+            :return: A list of SaleRow of the invoice.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch(f"SELECT {columnList(SaleRow)} FROM sales WHERE idFactura = %s",
+                                           (int(id_factura),), SaleRow)
+        except Exception as error:
+            print("Error getSale: ", error)
+            return []
+
+    @staticmethod
+    def deleteInvoice(id_factura):
+        """
+            :return: True if successful.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("DELETE FROM invoices WHERE idFac = %s", (int(id_factura),))])
+            return True
+        except Exception as error:
+            print("Error deleteInvoice: ", error)
+            return False
+
+    @staticmethod
+    def deleteSale(id_factura):
+        """
+            :return: True if successful.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("DELETE FROM sales WHERE idFactura = %s", (int(id_factura),))])
+            return True
+        except Exception as error:
+            print("Error deleteSale: ", error)
+            return False
+
+    @staticmethod
+    def deleteInvoiceAndSale(id_factura):
+        """
+            Deletes an invoice and its sale lines in one transaction.
+
+            :return: True if both deletes were committed, False otherwise.
+            :rtype: bool
+        """
+        try:
+            ConnectionServer._write([("DELETE FROM sales WHERE idFactura = %s", (int(id_factura),)),
+                                     ("DELETE FROM invoices WHERE idFac = %s", (int(id_factura),))])
+            return True
+        except Exception as error:
+            print("Error deleteInvoiceAndSale: ", error)
+            return False
+
+    # sales reports section
+    @staticmethod
+    def getRevenueByFamily(start, end):
+        """
+            :return: A list of RevenueRow per family, highest revenue first.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch("SELECT COALESCE(p.family, ''), COALESCE(p.family, ''), COUNT(*), "
+                                           "SUM(s.amount), ROUND(SUM(s.total), 2) "
+                                           f"{ConnectionServer.SALES_BY_DAY}GROUP BY p.family ORDER BY 5 DESC",
+                                           (Connection._isoDay(start), Connection._isoDay(end)), RevenueRow)
+        except Exception as error:
+            print("Error getRevenueByFamily: ", error)
+            return []
+
+    @staticmethod
+    def getRevenueByDay(start, end):
+        """
+            :return: A list of RevenueRow per ISO day, oldest first.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch("SELECT CONCAT(SUBSTR(i.date, 7, 4), '-', SUBSTR(i.date, 4, 2), '-', "
+                                           "SUBSTR(i.date, 1, 2)) AS day, MIN(i.date), COUNT(*), SUM(s.amount), "
+                                           f"ROUND(SUM(s.total), 2) {ConnectionServer.SALES_BY_DAY}"
+                                           "GROUP BY day ORDER BY day",
+                                           (Connection._isoDay(start), Connection._isoDay(end)), RevenueRow)
+        except Exception as error:
+            print("Error getRevenueByDay: ", error)
+            return []
+
+    @staticmethod
+    def getTopProducts(start, end, limit=10):
+        """
+            :return: A list of RevenueRow per product, highest revenue first.
+            :rtype: list
+        """
+        try:
+            return ConnectionServer._fetch("SELECT s.idProducto, COALESCE(MAX(p.name), ''), COUNT(*), SUM(s.amount), "
+                                           f"ROUND(SUM(s.total), 2) AS revenue {ConnectionServer.SALES_BY_DAY}"
+                                           "GROUP BY s.idProducto ORDER BY revenue DESC LIMIT %s",
+                                           (Connection._isoDay(start), Connection._isoDay(end), int(limit)),
+                                           RevenueRow)
+        except Exception as error:
+            print("Error getTopProducts: ", error)
+            return []
+
+    @staticmethod
+    def getTopCustomers(start, end, limit=10, family=None):
+        """
+            :return: A list of RevenueRow per customer, highest revenue first.
+            :rtype: list
+        """
+        try:
+            where = "AND p.family = %s " if family is not None else ""
+            params = [Connection._isoDay(start), Connection._isoDay(end)]
+            if family is not None:
+                params.append(str(family))
+            params.append(int(limit))
+            return ConnectionServer._fetch("SELECT i.dni_nie, COALESCE(MAX(CONCAT(c.surname, ', ', c.name)), ''), COUNT(*), "
+                                           "SUM(s.amount), ROUND(SUM(s.total), 2) AS revenue "
+                                           f"{ConnectionServer.SALES_BY_DAY}{where}"
+                                           "GROUP BY i.dni_nie ORDER BY revenue DESC LIMIT %s",
+                                           tuple(params), RevenueRow)
+        except Exception as error:
+            print("Error getTopCustomers: ", error)
+            return []
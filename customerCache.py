@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+
+class CustomerCache:
+    """
+        Bounded LRU cache of customer rows, indexed by DNI/NIE and by mobile.
+
+        Rows are stored once, keyed by DNI; the mobile index only maps a mobile to its DNI.
+        Connection invalidates entries from every customer write. The capacity can be set
+        with the ``customer_cache`` setting.
+    """
+    SETTING_KEY = "customer_cache"
+    DEFAULT_CAPACITY = 256
+
+    capacity = DEFAULT_CAPACITY
+    hits = 0
+    misses = 0
+    _by_dni = OrderedDict()
+    _dni_by_mobile = {}
+
+    @staticmethod
+    def configure(capacity):
+        """
+            Changes the maximum number of cached customers, evicting the oldest if needed.
+
+            :param capacity: The new capacity, values below 1 disable the cache.
+            :type capacity: int|str
+        """
+        try:
+            CustomerCache.capacity = max(0, int(capacity))
+        except (TypeError, ValueError):
+            CustomerCache.capacity = CustomerCache.DEFAULT_CAPACITY
+        CustomerCache._evict()
+
+    @staticmethod
+    def _evict():
+        while len(CustomerCache._by_dni) > CustomerCache.capacity:
+            _, customer = CustomerCache._by_dni.popitem(last=False)
+            CustomerCache._dropMobile(customer)
+
+    @staticmethod
+    def _dropMobile(customer):
+        mobile = str(customer.mobile).strip()
+        if CustomerCache._dni_by_mobile.get(mobile) == customer.dni_nie:
+            del CustomerCache._dni_by_mobile[mobile]
+
+    @staticmethod
+    def get(value, type_search):
+        """
+            Looks up a cached customer.
+
+            :param value: The DNI/NIE or the mobile.
+            :type value: str
+            :param type_search: "dni" or "phone".
+            :type type_search: str
+            :return: The cached CustomerRow, None on a miss.
+            :rtype: CustomerRow
+        """
+        key = str(value).strip()
+        if type_search == "phone":
+            key = CustomerCache._dni_by_mobile.get(key)
+
+        customer = CustomerCache._by_dni.get(key) if key is not None else None
+        if customer is None:
+            CustomerCache.misses += 1
+            return None
+
+        CustomerCache.hits += 1
+        CustomerCache._by_dni.move_to_end(key)
+        return customer
+
+    @staticmethod
+    def put(customer):
+        """
+            Stores a customer row read from the database.
+
+            :param customer: The row to cache.
+            :type customer: CustomerRow
+        """
+        if CustomerCache.capacity < 1:
+            return
+
+        previous = CustomerCache._by_dni.pop(customer.dni_nie, None)
+        if previous is not None:
+            CustomerCache._dropMobile(previous)
+
+        CustomerCache._by_dni[customer.dni_nie] = customer
+        CustomerCache._dni_by_mobile[str(customer.mobile).strip()] = customer.dni_nie
+        CustomerCache._evict()
+
+    @staticmethod
+    def invalidate(dni=None, mobile=None):
+        """
+            Drops cached entries after a write, or the whole cache when called without arguments.
+
+            :param dni: The DNI/NIE of the written customer.
+            :type dni: str
+            :param mobile: The mobile written, whose previous owner may be cached.
+            :type mobile: str
+        """
+        if dni is None and mobile is None:
+            CustomerCache._by_dni.clear()
+            CustomerCache._dni_by_mobile.clear()
+            return
+
+        if mobile is not None:
+            owner = CustomerCache._dni_by_mobile.pop(str(mobile).strip(), None)
+            if owner is not None:
+                CustomerCache._by_dni.pop(owner, None)
+
+        if dni is not None:
+            customer = CustomerCache._by_dni.pop(str(dni).strip(), None)
+            if customer is not None:
+                CustomerCache._dropMobile(customer)
+
+    @staticmethod
+    def stats():
+        """
+            :return: The hit/miss counters, the hit rate, the size and the capacity.
+            :rtype: dict
+        """
+        total = CustomerCache.hits + CustomerCache.misses
+        return {
+            "hits": CustomerCache.hits,
+            "misses": CustomerCache.misses,
+            "hit_rate": CustomerCache.hits / total if total else 0.0,
+            "size": len(CustomerCache._by_dni),
+            "capacity": CustomerCache.capacity,
+        }
@@ -0,0 +1,306 @@
+from bisect import insort
+from operator import itemgetter
+
+from PyQt6 import QtCore, QtGui
+
+from rows import CustomerRow
+
+
+class CustomerModel(QtCore.QAbstractTableModel):
+    """
+        Table model of the customer list, backed by one Python list per column.
+
+        setCustomers() copies the rows read by Repository.getCustomers into columns
+        and resets the model, so filling the view allocates no item per cell. The text
+        alignment and the Active/Inactive label are computed in data() for the visible
+        cells only.
+
+        Filtering and sorting never query the database: the view shows ``_rows``, the
+        positions of the loaded customers that pass the filters (active only, free text
+        over surname, name, mobile and city) taken in the order of a sort permutation,
+        which is computed once per column and reused. The selection follows its customers
+        through every filter and sort change. After a write, upsertCustomer() and
+        removeCustomer() insert, move, update or remove only the row concerned.
+    """
+    HEADERS = ("Surname", "Name", "Mobile", "Province", "City", "Invoice Type", "Status")
+    FIELDS = ("surname", "name", "mobile", "province", "city", "invoicetype", "historical")
+    LEFT_COLUMNS = (0, 1)
+    FILTER_COLUMNS = (0, 1, 2, 4)
+
+    _LEFT = QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignVCenter
+    _CENTER = QtCore.Qt.AlignmentFlag.AlignCenter
+    _POSITIONS = tuple(CustomerRow._fields.index(field) for field in ("dni_nie",) + FIELDS)
+
+    def __init__(self, parent=None):
+        super(CustomerModel, self).__init__(parent)
+        self._dni = []
+        self._columns = [[] for _ in CustomerModel.FIELDS]
+        # Positions shown by the view, in display order
+        self._rows = []
+        # column -> every position, sorted ascending by (value, dni_nie)
+        self._permutations = {}
+        # Lower-case "surname\tname\tmobile\tcity" of every position, built on the first text filter
+        self._search = None
+        self._active_only = False
+        self._text = ""
+        self._sort_column = 0
+        self._sort_order = QtCore.Qt.SortOrder.AscendingOrder
+        self._header_font = QtGui.QFont()
+        self._header_font.setBold(True)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(CustomerModel.FIELDS)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            value = self._columns[index.column()][self._rows[index.row()]]
+            if index.column() == 6:
+                return "Active" if value == "True" else "Inactive"
+            return str(value)
+        if role == QtCore.Qt.ItemDataRole.TextAlignmentRole:
+            return CustomerModel._LEFT if index.column() in CustomerModel.LEFT_COLUMNS else CustomerModel._CENTER
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if orientation != QtCore.Qt.Orientation.Horizontal:
+            return None
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return CustomerModel.HEADERS[section]
+        if role == QtCore.Qt.ItemDataRole.FontRole:
+            return self._header_font
+        return None
+
+    def setCustomers(self, customers):
+        """
+            Replaces every customer of the model and shows them with the current filters
+            and sort.
+
+            :param customers: The customers, in any order.
+            :type customers: list of CustomerRow
+        """
+        self.beginResetModel()
+        self._dni = list(map(itemgetter(CustomerModel._POSITIONS[0]), customers))
+        self._columns = [list(map(itemgetter(position), customers)) for position in CustomerModel._POSITIONS[1:]]
+        # The SQL order is not reused: the server collation may not sort like Python strings
+        self._permutations = {}
+        self._search = None
+        self._rows = self._visibleRows()
+        self.endResetModel()
+
+    def _sortKey(self, column):
+        values, dni = self._columns[column], self._dni
+        return lambda position: ("" if values[position] is None else str(values[position]), dni[position])
+
+    def _permutation(self, column):
+        permutation = self._permutations.get(column)
+        if permutation is None:
+            texts = ["" if value is None else str(value) for value in self._columns[column]]
+            # Two stable sorts with C-level keys: by dni_nie, then by the column value
+            permutation = sorted(range(len(self._dni)), key=self._dni.__getitem__)
+            permutation.sort(key=texts.__getitem__)
+            self._permutations[column] = permutation
+        return permutation
+
+    def _searchText(self, position):
+        return "\t".join("" if self._columns[column][position] is None else str(self._columns[column][position])
+                         for column in CustomerModel.FILTER_COLUMNS).lower()
+
+    def _accepts(self, position):
+        if self._active_only and self._columns[6][position] != "True":
+            return False
+        if not self._text:
+            return True
+        if self._search is None:
+            return self._text in self._searchText(position)
+        return self._text in self._search[position]
+
+    def _visibleRows(self):
+        """
+            :return: The positions that pass the filters, in the current sort order.
+            :rtype: list
+        """
+        rows = self._permutation(self._sort_column)
+        if self._sort_order == QtCore.Qt.SortOrder.DescendingOrder:
+            rows = rows[::-1]
+        if self._active_only:
+            historical = self._columns[6]
+            rows = [position for position in rows if historical[position] == "True"]
+        if self._text:
+            if self._search is None:
+                columns = [["" if value is None else str(value) for value in self._columns[column]]
+                           for column in CustomerModel.FILTER_COLUMNS]
+                self._search = ["\t".join(values).lower() for values in zip(*columns)]
+            search, text = self._search, self._text
+            rows = [position for position in rows if text in search[position]]
+        # Never share the list with the permutation cache
+        return list(rows) if rows is self._permutations[self._sort_column] else rows
+
+    def _relayout(self):
+        """
+            Recomputes the shown rows. Persistent indexes (selection, current row) move to
+            the new row of their customer, or become invalid if it is filtered out.
+        """
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        positions = [self._rows[index.row()] for index in persistent]
+        self._rows = self._visibleRows()
+        if persistent:
+            rows = {position: row for row, position in enumerate(self._rows)}
+            self.changePersistentIndexList(persistent, [
+                self.index(rows[position], index.column()) if position in rows else QtCore.QModelIndex()
+                for index, position in zip(persistent, positions)])
+        self.layoutChanged.emit()
+
+    def setActiveOnly(self, active_only):
+        """
+            :param active_only: True to show only the active customers, False to show all.
+            :type active_only: bool
+        """
+        if bool(active_only) != self._active_only:
+            self._active_only = bool(active_only)
+            self._relayout()
+
+    def setFilterText(self, text):
+        """
+            :param text: Shows only the customers whose surname, name, mobile or city
+                         contains it, ignoring case; empty to show every customer.
+            :type text: str
+        """
+        text = (text or "").strip().lower()
+        if text != self._text:
+            self._text = text
+            self._relayout()
+
+    def sort(self, column, order=QtCore.Qt.SortOrder.AscendingOrder):
+        if not 0 <= column < len(CustomerModel.FIELDS):
+            return
+        if (column, order) != (self._sort_column, self._sort_order):
+            self._sort_column, self._sort_order = column, order
+            self._relayout()
+
+    def dniAt(self, row):
+        """
+            :param row: A row of the model.
+            :type row: int
+            :return: The DNI/NIE of the customer shown in that row, None if out of range.
+            :rtype: str
+        """
+        if 0 <= row < len(self._rows):
+            return self._dni[self._rows[row]]
+        return None
+
+    def rowOf(self, dni):
+        """
+            :param dni: The DNI/NIE of a customer.
+            :type dni: str
+            :return: The row of the customer, -1 if it is not shown.
+            :rtype: int
+        """
+        try:
+            return self._rows.index(self._dni.index(dni))
+        except ValueError:
+            return -1
+
+    def _row(self, position):
+        """
+            Binary search of the row where ``position`` goes among the shown rows, in the
+            current sort order.
+
+            :return: The row, counted in the shown rows without ``position``.
+            :rtype: int
+        """
+        key = self._sortKey(self._sort_column)
+        target = key(position)
+        descending = self._sort_order == QtCore.Qt.SortOrder.DescendingOrder
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            current = key(self._rows[middle])
+            if current > target if descending else current < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def upsertCustomer(self, customer):
+        """
+            Stores the new values of one customer and shows them: its row is updated in
+            place, moved if its sort value changed, inserted if it now passes the filters
+            or removed if it no longer does.
+
+            :param customer: The values read back after the write.
+            :type customer: CustomerRow
+        """
+        permutation = self._permutation(self._sort_column)
+        # Only the permutation of the sort column is patched, the others are rebuilt on demand
+        self._permutations = {self._sort_column: permutation}
+        try:
+            position = self._dni.index(customer.dni_nie)
+        except ValueError:
+            position, row = len(self._dni), -1
+            self._dni.append(customer.dni_nie)
+            for values in self._columns:
+                values.append(None)
+            if self._search is not None:
+                self._search.append("")
+        else:
+            row = self._rows.index(position) if position in self._rows else -1
+            permutation.remove(position)
+
+        for column, field_position in enumerate(CustomerModel._POSITIONS[1:]):
+            self._columns[column][position] = customer[field_position]
+        if self._search is not None:
+            self._search[position] = self._searchText(position)
+        insort(permutation, position, key=self._sortKey(self._sort_column))
+
+        if row >= 0 and not self._accepts(position):
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            del self._rows[row]
+            self.endRemoveRows()
+        elif row >= 0:
+            del self._rows[row]
+            new_row = self._row(position)
+            self._rows.insert(row, position)
+            if new_row != row:
+                # beginMoveRows takes the destination in the rows before the move
+                self.beginMoveRows(QtCore.QModelIndex(), row, row, QtCore.QModelIndex(),
+                                   new_row + 1 if new_row > row else new_row)
+                self._rows.insert(new_row, self._rows.pop(row))
+                self.endMoveRows()
+            self.dataChanged.emit(self.index(new_row, 0), self.index(new_row, len(CustomerModel.FIELDS) - 1),
+                                  [QtCore.Qt.ItemDataRole.DisplayRole])
+        elif self._accepts(position):
+            new_row = self._row(position)
+            self.beginInsertRows(QtCore.QModelIndex(), new_row, new_row)
+            self._rows.insert(new_row, position)
+            self.endInsertRows()
+
+    def removeCustomer(self, dni):
+        """
+            Drops one customer from the model and removes its row, if it is shown.
+
+            :param dni: The DNI/NIE of the customer.
+            :type dni: str
+            :return: True if the customer was loaded, False otherwise.
+            :rtype: bool
+        """
+        try:
+            position = self._dni.index(dni)
+        except ValueError:
+            return False
+
+        row = self._rows.index(position) if position in self._rows else -1
+        if row >= 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        for values in [self._dni] + self._columns + ([self._search] if self._search is not None else []):
+            del values[position]
+        # Every position after the removed one moves down by one
+        self._rows = [shown - (shown > position) for shown in self._rows if shown != position]
+        self._permutations = {column: [item - (item > position) for item in permutation if item != position]
+                              for column, permutation in self._permutations.items() if column == self._sort_column}
+        if row >= 0:
+            self.endRemoveRows()
+        return True
@@ -4,9 +4,28 @@ from PyQt6 import QtCore, QtWidgets
 from utils.utils import Utils
 
 import globals
-from connection import Connection
+from customerModel import CustomerModel
+from repository import Repository
 from events import Events
 class Customers:
+    @staticmethod
+    def tableModel():
+        """
+        Returns the model of the customer table, attaching a new one to the view the first time.
+
+        Clicking a header sorts the loaded customers by that column (CustomerModel.sort);
+        the table starts sorted by surname, the order of the database query.
+
+        :return: The customer table model.
+        :rtype: CustomerModel
+        """
+        view = globals.ui.table_customer
+        if not isinstance(view.model(), CustomerModel):
+            view.setModel(CustomerModel(view))
+            view.horizontalHeader().setSortIndicator(0, QtCore.Qt.SortOrder.AscendingOrder)
+            view.setSortingEnabled(True)
+        return view.model()
+
     @staticmethod
     def checkDni():
         """
@@ -99,44 +118,78 @@ class Customers:
         """
         Populates the main customer table with data from the database.
 
+        Every customer is read, active or not, on the background query executor when it
+        is running, and the table is filled once they arrive; a newer call supersedes a
+        pending one. The "Historical" filter is applied in memory by the table model.
+
         :param historical: Filter to show only active customers (True) or all (False).
         :type historical: bool
         :return: None
         """
         try:
-            all_customers = Connection.getCustomers(historical)
-
-            def display_historical(input_historical):
-                if input_historical == "True":
-                    return "Active"
-
-                return "Inactive"
-
-            index = 0
-            ui_table = globals.ui.table_customer
-            for customer in all_customers:
-                ui_table.setRowCount(index + 1)
-                ui_table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(customer[2])))
-                ui_table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(customer[3])))
-                ui_table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(customer[5])))
-                ui_table.setItem(index, 3, QtWidgets.QTableWidgetItem(str(customer[7])))
-                ui_table.setItem(index, 4, QtWidgets.QTableWidgetItem(str(customer[8])))
-                ui_table.setItem(index, 5, QtWidgets.QTableWidgetItem(str(customer[9])))
-                ui_table.setItem(index, 6, QtWidgets.QTableWidgetItem(display_historical(customer[10])))
-
-
-                ui_table.item(index, 0).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignLeft.AlignVCenter)
-                ui_table.item(index, 1).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignLeft.AlignVCenter)
-                ui_table.item(index, 2).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 3).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 4).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 5).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 6).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                index += 1
+            Customers.tableModel().setActiveOnly(historical)
+            if globals.executor is not None:
+                globals.executor.submit("customers", Repository.getCustomers, False,
+                                        on_finished=Customers.populateTable, local=Repository.isLocal())
+            else:
+                Customers.populateTable(Repository.getCustomers(False))
+        except Exception as error:
+            print("error en cargar setTableData ", error)
 
+    @staticmethod
+    def populateTable(all_customers):
+        """
+        Shows already read customers in the main customer table.
+
+        :param all_customers: The customers to show.
+        :type all_customers: list
+        :return: None
+        """
+        try:
+            Customers.tableModel().setCustomers(all_customers)
         except Exception as error:
             print("error en cargar setTableData ", error)
 
+    @staticmethod
+    def refreshRow(dni):
+        """
+        Re-reads one customer after a write and updates only its row of the customer table.
+
+        The row is inserted, moved, updated or removed according to the new values, the
+        sort and the filters of the table; the rest of the table, the selection and the
+        scroll position are left alone.
+
+        :param dni: The DNI/NIE of the written customer.
+        :type dni: str
+        :return: None
+        """
+        try:
+            dni = str(dni).upper().strip()
+            customer = Repository.getCustomerData(dni, "dni")
+            model = Customers.tableModel()
+            if not customer:
+                model.removeCustomer(dni)
+            else:
+                model.upsertCustomer(customer)
+        except Exception as error:
+            print("error en refreshRow ", error)
+
+    @staticmethod
+    def filterTable(text):
+        """
+        Shows only the customers whose surname, name, mobile or city contains the text.
+
+        The loaded customers are filtered in memory, the database is not queried.
+
+        :param text: The text typed in the filter box; empty to show every customer.
+        :type text: str
+        :return: None
+        """
+        try:
+            Customers.tableModel().setFilterText(text)
+        except Exception as error:
+            print("error en filterTable ", error)
+
     @staticmethod
     def selectCustomer():
         """
@@ -150,9 +203,11 @@ class Customers:
             #globals.ui.le_dni.setEnabled(False)
             Utils.clearStyles()
             Utils.disableLineEdit(globals.ui.le_dni)
-            row_selected = globals.ui.table_customer.selectedItems()
-            mobile_customer_selected = row_selected[2].text()
-            all_customer_data = Connection.getCustomerData(str(mobile_customer_selected), "phone")
+            row_selected = globals.ui.table_customer.currentIndex().row()
+            dni_selected = Customers.tableModel().dniAt(row_selected)
+            if dni_selected is None:
+                return
+            all_customer_data = Repository.getCustomerData(str(dni_selected), "dni")
 
             all_data_boxes = [globals.ui.le_dni, globals.ui.le_date, globals.ui.le_surname, globals.ui.le_name,
                             globals.ui.le_email, globals.ui.le_phone, globals.ui.le_address]
@@ -160,15 +215,15 @@ class Customers:
             for i in range(len(all_data_boxes)):
                 all_data_boxes[i].setText(str(all_customer_data[i]))
 
-            globals.ui.cb_province.setCurrentText(str(all_customer_data[7]))
-            globals.ui.cb_city.setCurrentText(str(all_customer_data[8]))
+            globals.ui.cb_province.setCurrentText(str(all_customer_data.province))
+            globals.ui.cb_city.setCurrentText(str(all_customer_data.city))
 
-            if str(all_customer_data[9]) == "paper":
+            if str(all_customer_data.invoicetype) == "paper":
                 globals.ui.rb_paper.setChecked(True)
             else:
                 globals.ui.rb_electronic.setChecked(True)
 
-            globals.status = all_customer_data[10]
+            globals.status = all_customer_data.historical
 
             if globals.status == "True":
                 globals.ui.lbl_status.setText("Active customer")
@@ -200,13 +255,13 @@ class Customers:
             dni = globals.ui.le_dni.text()
             print("dni: ", dni)
 
-            if Connection.deleteCustomer(dni):
+            if Repository.deleteCustomer(dni):
                 mbox_success = QtWidgets.QMessageBox()
                 mbox_success.setWindowTitle("Information")
                 mbox_success.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox_success.setText("Success deleting the customer")
                 mbox_success.exec()
-                Customers.setTableData()
+                Customers.refreshRow(dni)
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -219,13 +274,14 @@ class Customers:
     @staticmethod
     def getCustomersByHistorical():
         """
-        Triggers a table refresh based on the state of the "Historical" checkbox.
+        Shows only the active customers, or all of them, from the state of the "Historical"
+        checkbox, filtering the loaded customers in memory.
 
         :return: None
         """
         try:
             historical_checked = globals.ui.chkb_hystorical.isChecked()
-            Customers.setTableData(historical_checked)
+            Customers.tableModel().setActiveOnly(historical_checked)
         except Exception as error:
             print("error en historicalCli ", error)
 
@@ -248,7 +304,7 @@ class Customers:
 
             all_data_boxes.append(invoice_type)
 
-            if Connection.addCustomer(all_data_boxes):
+            if Repository.addCustomer(all_data_boxes):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Information")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
@@ -256,6 +312,7 @@ class Customers:
                 mbox.exec()
 
                 Utils.clearStyles()
+                Customers.refreshRow(globals.ui.le_dni.text())
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -263,7 +320,6 @@ class Customers:
             mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
             mbox.setText("An error has occurred while saving the customer")
             mbox.exec()
-            Customers.setTableData(True)
         except Exception as error:
             print("error en saveCustomer ", error)
 
@@ -333,14 +389,14 @@ class Customers:
 
             all_data_boxes.append(globals.status)
 
-            if Connection.setCustomerData(all_data_boxes):
+            if Repository.setCustomerData(all_data_boxes):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Information")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox.setText("Success modifying the customer's data")
                 mbox.exec()
                 Utils.enableAllLineEdit()
-                Customers.setTableData()
+                Customers.refreshRow(globals.ui.le_dni.text())
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -357,6 +413,9 @@ class Customers:
         """
         Searches for a specific customer using the DNI currently entered in the line edit.
 
+        If no customer has that DNI, the text is used as a full-text search (surname, name,
+        mail, address or city prefixes) and the best match is loaded.
+
         :return: None
         """
         try:
@@ -364,7 +423,12 @@ class Customers:
             Utils.disableLineEdit(globals.ui.le_dni)
             dni = globals.ui.le_dni.text()
 
-            all_customer_data = Connection.getCustomerData(str(dni), "dni")
+            all_customer_data = Repository.getCustomerData(str(dni), "dni")
+            if not all_customer_data:
+                best_match = Repository.search(dni, "customers", 1)
+                if best_match:
+                    all_customer_data = Repository.getCustomerData(best_match[0].key, "dni")
+
             if not all_customer_data:
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Error")
@@ -380,15 +444,15 @@ class Customers:
             for i in range(len(all_data_boxes)):
                 all_data_boxes[i].setText(str(all_customer_data[i]))
 
-            globals.ui.cb_province.setCurrentText(str(all_customer_data[7]))
-            globals.ui.cb_city.setCurrentText(str(all_customer_data[8]))
+            globals.ui.cb_province.setCurrentText(str(all_customer_data.province))
+            globals.ui.cb_city.setCurrentText(str(all_customer_data.city))
 
-            if str(all_customer_data[9]) == "paper":
+            if str(all_customer_data.invoicetype) == "paper":
                 globals.ui.rb_paper.setChecked(True)
             else:
                 globals.ui.rb_electronic.setChecked(True)
 
-            globals.status = all_customer_data[10]
+            globals.status = all_customer_data.historical
 
             if globals.status == "True":
                 globals.ui.lbl_status.setText("Active customer")
@@ -0,0 +1,85 @@
+# Form implementation generated from reading ui file '.\templates\dlgQueryStats.ui'
+#
+# Created by: PyQt6 UI code generator 6.10.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_dlgQueryStats(object):
+    def setupUi(self, dlgQueryStats):
+        dlgQueryStats.setObjectName("dlgQueryStats")
+        dlgQueryStats.resize(820, 480)
+        icon = QtGui.QIcon()
+        icon.addPixmap(QtGui.QPixmap(".\\templates\\../img/gabrielgsd.jpg"), QtGui.QIcon.Mode.Normal, QtGui.QIcon.State.On)
+        dlgQueryStats.setWindowIcon(icon)
+        self.verticalLayout = QtWidgets.QVBoxLayout(dlgQueryStats)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.lbl_query_stats_summary = QtWidgets.QLabel(parent=dlgQueryStats)
+        self.lbl_query_stats_summary.setText("")
+        self.lbl_query_stats_summary.setWordWrap(True)
+        self.lbl_query_stats_summary.setObjectName("lbl_query_stats_summary")
+        self.verticalLayout.addWidget(self.lbl_query_stats_summary)
+        self.table_query_stats = QtWidgets.QTableWidget(parent=dlgQueryStats)
+        self.table_query_stats.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table_query_stats.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_query_stats.setObjectName("table_query_stats")
+        self.table_query_stats.setColumnCount(7)
+        self.table_query_stats.setRowCount(0)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(0, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(1, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(2, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(3, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(4, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(5, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.table_query_stats.setHorizontalHeaderItem(6, item)
+        self.table_query_stats.verticalHeader().setVisible(False)
+        self.verticalLayout.addWidget(self.table_query_stats)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.btn_refresh_query_stats = QtWidgets.QPushButton(parent=dlgQueryStats)
+        self.btn_refresh_query_stats.setObjectName("btn_refresh_query_stats")
+        self.horizontalLayout.addWidget(self.btn_refresh_query_stats)
+        self.btn_reset_query_stats = QtWidgets.QPushButton(parent=dlgQueryStats)
+        self.btn_reset_query_stats.setObjectName("btn_reset_query_stats")
+        self.horizontalLayout.addWidget(self.btn_reset_query_stats)
+        self.btn_close_query_stats = QtWidgets.QPushButton(parent=dlgQueryStats)
+        self.btn_close_query_stats.setObjectName("btn_close_query_stats")
+        self.horizontalLayout.addWidget(self.btn_close_query_stats)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.retranslateUi(dlgQueryStats)
+        QtCore.QMetaObject.connectSlotsByName(dlgQueryStats)
+
+    def retranslateUi(self, dlgQueryStats):
+        _translate = QtCore.QCoreApplication.translate
+        dlgQueryStats.setWindowTitle(_translate("dlgQueryStats", "Query Statistics"))
+        item = self.table_query_stats.horizontalHeaderItem(0)
+        item.setText(_translate("dlgQueryStats", "Method"))
+        item = self.table_query_stats.horizontalHeaderItem(1)
+        item.setText(_translate("dlgQueryStats", "Calls"))
+        item = self.table_query_stats.horizontalHeaderItem(2)
+        item.setText(_translate("dlgQueryStats", "Total (ms)"))
+        item = self.table_query_stats.horizontalHeaderItem(3)
+        item.setText(_translate("dlgQueryStats", "p50 (ms)"))
+        item = self.table_query_stats.horizontalHeaderItem(4)
+        item.setText(_translate("dlgQueryStats", "p95 (ms)"))
+        item = self.table_query_stats.horizontalHeaderItem(5)
+        item.setText(_translate("dlgQueryStats", "Max (ms)"))
+        item = self.table_query_stats.horizontalHeaderItem(6)
+        item.setText(_translate("dlgQueryStats", "Rows"))
+        self.btn_refresh_query_stats.setText(_translate("dlgQueryStats", "Refresh"))
+        self.btn_reset_query_stats.setText(_translate("dlgQueryStats", "Reset"))
+        self.btn_close_query_stats.setText(_translate("dlgQueryStats", "Close"))
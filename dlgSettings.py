@@ -33,6 +33,24 @@ class Ui_settings(object):
         self.cb_themes.setObjectName("cb_themes")
         self.horizontalLayout.addWidget(self.cb_themes)
         self.verticalLayout.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.lbl_db_profile = QtWidgets.QLabel(parent=settings)
+        font = QtGui.QFont()
+        font.setPointSize(12)
+        self.lbl_db_profile.setFont(font)
+        self.lbl_db_profile.setObjectName("lbl_db_profile")
+        self.horizontalLayout_2.addWidget(self.lbl_db_profile)
+        self.cb_db_profile = QtWidgets.QComboBox(parent=settings)
+        self.cb_db_profile.setMinimumSize(QtCore.QSize(0, 28))
+        self.cb_db_profile.setObjectName("cb_db_profile")
+        self.horizontalLayout_2.addWidget(self.cb_db_profile)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.lbl_db_profile_status = QtWidgets.QLabel(parent=settings)
+        self.lbl_db_profile_status.setText("")
+        self.lbl_db_profile_status.setWordWrap(True)
+        self.lbl_db_profile_status.setObjectName("lbl_db_profile_status")
+        self.verticalLayout.addWidget(self.lbl_db_profile_status)
         self.gridLayout.addLayout(self.verticalLayout, 0, 0, 1, 1)
         self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
         self.horizontalLayout_3.setObjectName("horizontalLayout_3")
@@ -51,5 +69,6 @@ class Ui_settings(object):
         _translate = QtCore.QCoreApplication.translate
         settings.setWindowTitle(_translate("settings", "Settings"))
         self.lbl_themes.setText(_translate("settings", "Themes: "))
+        self.lbl_db_profile.setText(_translate("settings", "Database: "))
         self.btn_cancel_settings.setText(_translate("settings", "Cancel"))
         self.btn_save_settings.setText(_translate("settings", "Save"))
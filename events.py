@@ -3,14 +3,18 @@ import datetime
 import os.path
 import shutil
 import sys
+import tempfile
 import time
 import zipfile
 
 from connection import *
 
-from PyQt6 import  QtWidgets, QtCore, QtGui
+from PyQt6 import  QtWidgets, QtCore, QtGui, QtSql
 
 import connection
+from repository import Repository
+from sqliteProfile import SqliteProfile
+from statementCache import StatementCache
 import  globals
 import customers
 import styles
@@ -79,10 +83,14 @@ class Events:
             Loads the list of provinces into the corresponding combo box.
         """
         try:
+            # Filling the list must not load the cities of its first province
+            globals.ui.cb_province.blockSignals(True)
             globals.ui.cb_province.clear()
-            globals.ui.cb_province.addItems(Connection.getProvinces())
+            globals.ui.cb_province.addItems(Repository.getProvinces())
         except Exception as e:
             print("Error loading provinces: ", e)
+        finally:
+            globals.ui.cb_province.blockSignals(False)
 
     @staticmethod
     def loadCities():
@@ -92,7 +100,7 @@ class Events:
         try:
             globals.ui.cb_city.clear()
             province = globals.ui.cb_province.currentText()
-            globals.ui.cb_city.addItems(Connection.getCities(province))
+            globals.ui.cb_city.addItems(Repository.getCities(province))
         except Exception as e:
             print("Error loading cities: ", e)
 
@@ -139,17 +147,13 @@ class Events:
             Configures header behavior and resizing for the Customer table.
         """
         try:
+            # The bold header font comes from CustomerModel.headerData
             header = globals.ui.table_customer.horizontalHeader()
             for i in range(header.count()):
                 if i == 3:
                     header.setSectionResizeMode(i, QtWidgets.QHeaderView.ResizeMode.ResizeToContents)
                 else:
                     header.setSectionResizeMode(i, QtWidgets.QHeaderView.ResizeMode.Stretch)
-                header_items = globals.ui.table_customer.horizontalHeaderItem(i)
-                # negrita cabecera
-                font = header_items.font()
-                font.setBold(True)
-                header_items.setFont(font)
         except Exception as e:
             print("Error resize customer table: ", e)
 
@@ -229,17 +233,21 @@ class Events:
             file_path, _ = globals.dialog_open.getSaveFileName(None, "Save Backup file", filename, 'zip')
 
             if globals.dialog_open.accept and file_path:
-                with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as filezip:
-                    filezip.write('./data/bbdd.sqlite', os.path.basename('bbdd.sqlite'))
-
-                mbox = QtWidgets.QMessageBox()
-                mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
-                mbox.setWindowIcon(QtGui.QIcon("img/gabrielgsd.jpg"))
-                mbox.setWindowTitle('Save Backup')
-                mbox.setText('Done saving backup')
-                mbox.setDefaultButton(QtWidgets.QMessageBox.StandardButton.Ok)
-                mbox.exec()
-                return
+                # Under WAL recent commits may still live in bbdd.sqlite-wal, so the open file is not zipped as is
+                with tempfile.TemporaryDirectory() as folder:
+                    copy_path = os.path.join(folder, 'bbdd.sqlite')
+                    if Connection.copyTo(copy_path):
+                        with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as filezip:
+                            filezip.write(copy_path, os.path.basename('bbdd.sqlite'))
+
+                        mbox = QtWidgets.QMessageBox()
+                        mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
+                        mbox.setWindowIcon(QtGui.QIcon("img/gabrielgsd.jpg"))
+                        mbox.setWindowTitle('Save Backup')
+                        mbox.setText('Done saving backup')
+                        mbox.setDefaultButton(QtWidgets.QMessageBox.StandardButton.Ok)
+                        mbox.exec()
+                        return
 
             mbox = QtWidgets.QMessageBox()
             mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
@@ -258,10 +266,17 @@ class Events:
             filename = globals.dialog_open.getOpenFileName(None, "Restore Backup file", '', '*.zip;;All Files (*)')
             file = filename[0]
             if file:
+                # A write-ahead log left over from the old file must not be replayed on the restored one
+                if globals.executor is not None:
+                    globals.executor.reset()
+                Connection.db_close()
                 with zipfile.ZipFile(file, 'r', zipfile.ZIP_DEFLATED) as bbdd:
                     bbdd.extractall(path='./data')
 
                 bbdd.close()
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists('./data/bbdd.sqlite' + suffix):
+                        os.remove('./data/bbdd.sqlite' + suffix)
 
                 mbox = QtWidgets.QMessageBox()
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
@@ -272,6 +287,7 @@ class Events:
                 mbox.exec()
 
                 connection.Connection.db_connection()
+                Repository.select()
                 Events.loadProvinces()
                 Events.loadCities()
                 customers.Customers.setTableData()
@@ -283,6 +299,58 @@ class Events:
         except Exception as e:
             print("Error en restoreBackup: ", e)
 
+    @staticmethod
+    def showQueryStats():
+        """
+            Opens the query statistics dialog.
+        """
+        try:
+            globals.query_stats.loadStats()
+            globals.query_stats.show()
+        except Exception as e:
+            print("Error en showQueryStats: ", e)
+
+    @staticmethod
+    def syncServer():
+        """
+            Ships the local changes logged since the last sync to the server database.
+
+            The connection to the server and the sync run on the background query executor,
+            so a long backlog or a slow server never freezes the window; the result is shown
+            by syncFinished(). A click while a sync is running is ignored.
+        """
+        try:
+            from syncEngine import SyncEngine
+
+            if globals.executor is None:
+                Events.syncFinished(SyncEngine.serverSync())
+            elif not globals.executor.isBusy("sync"):
+                globals.executor.submit("sync", SyncEngine.serverSync, on_finished=Events.syncFinished)
+        except Exception as e:
+            print("Error en syncServer: ", e)
+
+    @staticmethod
+    def syncFinished(report):
+        """
+            Shows the result of a sync.
+
+            :param report: The report returned by SyncEngine.serverSync().
+            :type report: dict
+        """
+        try:
+            mbox = QtWidgets.QMessageBox()
+            mbox.setWindowIcon(QtGui.QIcon("img/gabrielgsd.jpg"))
+            mbox.setWindowTitle('Sync with Server')
+            if report["error"]:
+                mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
+                mbox.setText(f'Sync stopped after {report["changes"]} changes: {report["error"]}')
+            else:
+                mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
+                mbox.setText(f'{report["upserted"]} rows sent, {report["deleted"]} rows deleted')
+            mbox.exec()
+        except Exception as e:
+            print("Error en syncFinished: ", e)
+
     @staticmethod
     def exportCustomersToCsv():
         """
@@ -294,7 +362,7 @@ class Events:
             file_path, _ = globals.dialog_open.getSaveFileName(None, "Export customers data", filename, 'CSV Files (*.csv)')
 
             if file_path:
-                all_customers_data = Connection.getCustomers(historical=False)
+                all_customers_data = Repository.iterCustomers(historical=False)
                 with open(file_path, 'w', newline='', encoding='utf-8') as csvFile:
                     writer = csv.writer(csvFile)
 
@@ -355,6 +423,10 @@ class Events:
             new_theme = globals.settings_ui.cb_themes.currentText()
             all_settings_data.append(("theme", new_theme))
 
+            # Database connection profile
+            new_db_profile = globals.settings_ui.cb_db_profile.currentText()
+            all_settings_data.append((SqliteProfile.SETTING_KEY, new_db_profile))
+
             if not Connection.saveSettings(all_settings_data):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
@@ -374,6 +446,13 @@ class Events:
             globals.settings.hide()
             globals.theme_manager.change_theme(new_theme)
 
+            if SqliteProfile.applied.get("profile") != new_db_profile:
+                # Only the GUI connection is touched here; the executor threads reopen theirs with the new profile
+                StatementCache.invalidate(Connection.DEFAULT_CONNECTION)
+                SqliteProfile.apply(QtSql.QSqlDatabase.database(), new_db_profile)
+                if globals.executor is not None:
+                    globals.executor.reset()
+
 
 
         except Exception as e:
@@ -6,4 +6,6 @@ dialog_open = None
 settings = None
 settings_ui = None
 theme_manager = None
+executor = None
+query_stats = None
 disabled_line_edits = []
\ No newline at end of file
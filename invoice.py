@@ -1,9 +1,10 @@
 from PyQt6 import QtCore, QtWidgets
 
-from connection import Connection
+from repository import Repository
 import globals
 from datetime import datetime
 
+from invoiceModel import InvoiceModel
 from products import Products
 from reports import Reports
 
@@ -19,22 +20,22 @@ class InvoiceFormatter:
         Returns a formatted string 'Surname Name'.
 
         :param data: Database record for a customer.
-        :type data: list
+        :type data: CustomerRow
         :return: Formatted name.
         :rtype: str
         """
-        return f"{data[3]} {data[2]}"
+        return f"{data.name} {data.surname}"
 
     @staticmethod
     def fullAddress(data):
         """
             Formats the full address from the data tuple.
 
-            :param data: A list or tuple containing customer data.
-                             Expected indices: [6] Address, [7] City, [8] Zip Code.
+            :param data: The customer record.
+            :type data: CustomerRow
             :return: A string representing the formatted address.
         """
-        return f"{data[6]} {data[8]} {data[7]}"
+        return f"{data.address} {data.city} {data.province}"
 
 
 
@@ -65,13 +66,13 @@ class Invoice:
             return "Inactive"
 
         Invoice._mapping = {
-            globals.ui.le_dni_invoice: lambda d: d[0],
-            globals.ui.lbl_date_factura: lambda d: d[1],
+            globals.ui.le_dni_invoice: lambda d: d.dni_nie,
+            globals.ui.lbl_date_factura: lambda d: d.adddata,
             globals.ui.lbl_name_invoice: lambda d: InvoiceFormatter.fullName(d),
             globals.ui.lbl_address_invoice: lambda d: InvoiceFormatter.fullAddress(d),
-            globals.ui.lbl_phone_invoice: lambda d: d[5],
-            globals.ui.lbl_invoicetype_invoice: lambda d: d[9],
-            globals.ui.lbl_status_invoice: lambda d: display_historical(d[10])
+            globals.ui.lbl_phone_invoice: lambda d: d.mobile,
+            globals.ui.lbl_invoicetype_invoice: lambda d: d.invoicetype,
+            globals.ui.lbl_status_invoice: lambda d: display_historical(d.historical)
         }
 
     @staticmethod
@@ -85,10 +86,10 @@ class Invoice:
         """
         try:
             dni = globals.ui.le_dni_invoice.text().upper().strip()
-            customer_data = Connection.getCustomerData(dni, "dni")
+            customer_data = Repository.getCustomerData(dni, "dni")
 
             if not customer_data:
-                customer_data = Connection.getCustomerData(Invoice._dummy_customer, "dni")
+                customer_data = Repository.getCustomerData(Invoice._dummy_customer, "dni")
 
             globals.ui.le_dni_invoice.setText(dni)
 
@@ -125,13 +126,20 @@ class Invoice:
 
             data = [dni, today_date]
 
-            if Connection.addInvoice(data):
+            id_factura = Repository.addInvoice(data)
+            if id_factura:
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Information")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox.setText("Success saving the invoice")
                 mbox.exec()
-                Invoice.setTableFacturaData(True)
+
+                invoice = Repository.getInvoiceTotals(id_factura)
+                if invoice is not None:
+                    Invoice.tableModel().upsertInvoice(invoice)
+                    globals.ui.lbl_num_factura.setText(str(invoice.idFac))
+                    globals.ui.lbl_date_factura.setText(str(invoice.date))
+                Invoice.searchInvoiceCustomer()
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -139,7 +147,6 @@ class Invoice:
             mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
             mbox.setText("An error has occurred while saving the invoice")
             mbox.exec()
-            Invoice.setTableFacturaData(False)
 
         except Exception as e:
             print(f"Error en saveInvoice: {e}")
@@ -245,7 +252,7 @@ class Invoice:
             try:
                 if current_col == 0:
                     try:
-                        product_row_data = Connection.getProductData(text_value, "id")
+                        product_row_data = Repository.getProductData(text_value, "id")
                         if not product_row_data:
                             mbox = QtWidgets.QMessageBox()
                             mbox.setWindowTitle("Warning")
@@ -329,41 +336,59 @@ class Invoice:
         except Exception as e:
             print(f"Error en calculateTotals: {e}")
 
+    @staticmethod
+    def tableModel():
+        """
+            Returns the model of the Invoice Table, attaching a new one to the view the first time.
+
+            :return: The invoice table model.
+            :rtype: InvoiceModel
+        """
+        view = globals.ui.table_invoice
+        if not isinstance(view.model(), InvoiceModel):
+            view.setModel(InvoiceModel(view))
+        return view.model()
+
     @staticmethod
     def setTableFacturaData(show_data_when_tab = False):
         """
-            Retrieves all invoices from the database and populates the Invoice Table.
+            Reloads the Invoice Table from its first page.
+
+            Only the first page of invoices is read; the following pages are read by the
+            model as the user scrolls (see InvoiceModel).
 
-            :param show_data_when_tab: If True, automatically selects and displays data
-                                        for the most recent invoice (index 0).
+            :param show_data_when_tab: If True, displays the number and date of the most
+                                        recent invoice, read with a single-row lookup.
         """
         try:
-            all_data_invoices = Connection.getAllInvoices()
-
-            table = globals.ui.table_invoice
-            index = 0
-            for invoice in all_data_invoices:
-                if show_data_when_tab and invoice == all_data_invoices[0]:
-                    globals.ui.lbl_num_factura.setText(str(invoice[0]))
-                    globals.ui.lbl_date_factura.setText(str(invoice[2]))
-
-                table.setRowCount(index + 1)
-                table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(invoice[0])))
-                table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(invoice[1])))
-                table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(invoice[2])))
-
-                table.item(index, 0).setTextAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignHCenter | QtCore.Qt.AlignmentFlag.AlignVCenter)
-                table.item(index, 1).setTextAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignCenter.AlignCenter)
-                table.item(index, 2).setTextAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignVCenter)
-                index += 1
+            Invoice.tableModel().reload()
+
+            if show_data_when_tab:
+                newest, _ = Repository.getInvoicesPage(None, 1)
+                if newest:
+                    globals.ui.lbl_num_factura.setText(str(newest[0].idFac))
+                    globals.ui.lbl_date_factura.setText(str(newest[0].date))
 
             Invoice.searchInvoiceCustomer()
         except Exception as e:
             print(f"Error en setTableFacturaData: {e}")
 
+    @staticmethod
+    def refreshInvoiceTotals(id_factura):
+        """
+            Re-reads the totals of one invoice and updates its row of the Invoice Table.
+
+            :param id_factura: The ID of the invoice.
+            :type id_factura: int|str
+        """
+        try:
+            invoice = Repository.getInvoiceTotals(id_factura)
+            if invoice is None:
+                return
+            Invoice.tableModel().upsertInvoice(invoice)
+        except Exception as e:
+            print(f"Error en refreshInvoiceTotals: {e}")
+
     @staticmethod
     def selectInvoice():
         """
@@ -374,8 +399,10 @@ class Invoice:
             Loads the associated sales items.
         """
         try:
-            row = globals.ui.table_invoice.selectedItems()
-            data = [dato.text() for dato in row]
+            invoice = Invoice.tableModel().invoiceAt(globals.ui.table_invoice.currentIndex().row())
+            if invoice is None:
+                return
+            data = [str(invoice.idFac), str(invoice.dni_nie), str(invoice.date)]
 
             globals.ui.lbl_num_factura.setText(data[0])
             globals.ui.le_dni_invoice.setText(data[1])
@@ -386,7 +413,7 @@ class Invoice:
             button_save_invoice = globals.ui.btn_save_invoice
             btn_delete_invoice = globals.ui.btn_delete_invoice
             button_delete_sale_row = globals.ui.btn_delete_sale_row
-            if not Connection.getSale(data[0]):
+            if not Repository.getSale(data[0]):
                 globals.ui.table_sales.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.AllEditTriggers)
                 button_save_sale.setEnabled(True)
                 button_save_invoice.setEnabled(True)
@@ -408,19 +435,20 @@ class Invoice:
     @staticmethod
     def productRawDataToMap(data):
         """
-            Converts raw database product tuples into a structured dictionary.
+            Converts a product row into a structured dictionary.
 
-            :param data: Tuple containing product details.
+            :param data: The product record.
+            :type data: ProductRow
             :return: Dictionary with keys: id, name, quantity, type, price, currency.
         """
         try:
             return {
-                "id": data[0],
-                "name": data[1],
-                "quantity": data[2],
-                "type": data[3],
-                "price": data[4],
-                "currency": data[5],
+                "id": data.code,
+                "name": data.name,
+                "quantity": data.stock,
+                "type": data.family,
+                "price": data.unit_price,
+                "currency": data.currency,
             }
         except Exception as e:
             print(f"Error en productRawDataToMap: {e}")
@@ -430,15 +458,17 @@ class Invoice:
     @staticmethod
     def saveSales():
         """
-            Iterates through the sales table and saves each line item to the database.
+            Collects every line item of the sales table and saves them to the database.
 
-            Validates that all required fields are present.
+            Validates that all required fields are present. All lines and the
+            related stock changes are committed in a single transaction.
             If successful, prompts the user to print a ticket/report.
             Finally, clears the UI data.
         """
         try:
             table = globals.ui.table_sales
             id_factura = globals.ui.lbl_num_factura.text().strip()
+            all_sales = []
 
             for r in range(table.rowCount()):
                 id_product = table.item(r, 0).text().strip()
@@ -460,24 +490,33 @@ class Invoice:
                 if not product_name or not unit_price or not amount or not total_item:
                     continue
 
-                if not Connection.addSale([id_factura, id_product, amount, product_name, unit_price, total_item]):
-                    mbox = QtWidgets.QMessageBox()
-                    mbox.setWindowTitle("Error")
-                    mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
-                    mbox.setText("Error saving the sales")
-                    mbox.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Ok)
-                    mbox.exec()
-                    return
+                all_sales.append([id_product, amount, product_name, unit_price, total_item])
 
-                if not Invoice.reduceStock(id_product, amount):
-                    mbox = QtWidgets.QMessageBox()
-                    mbox.setWindowTitle("Error")
-                    mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
-                    mbox.setText("Error updating the stock when saving sales")
-                    mbox.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Ok)
-                    mbox.exec()
-                    return
+            if not all_sales:
+                mbox = QtWidgets.QMessageBox()
+                mbox.setWindowTitle("Warning")
+                mbox.setIcon(QtWidgets.QMessageBox.Icon.Warning)
+                mbox.setText("Add at least one product before saving the sales")
+                mbox.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Ok)
+                mbox.exec()
+                return
 
+            if not Repository.saveSales(id_factura, all_sales):
+                # Another till may have sold the last units since the lines were added
+                shortages = Repository.getStockShortages([(line[0], line[1]) for line in all_sales])
+                mbox = QtWidgets.QMessageBox()
+                mbox.setWindowTitle("Error")
+                mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
+                if shortages:
+                    mbox.setText("Not enough stock:\n" + "\n".join(
+                        f"{name or code}: {requested} requested, {stock} in stock"
+                        for code, name, stock, requested in shortages))
+                    Products.setTableData()
+                else:
+                    mbox.setText("Error saving the sales")
+                mbox.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Ok)
+                mbox.exec()
+                return
 
             mbox = QtWidgets.QMessageBox()
             mbox.setWindowTitle("Success")
@@ -492,6 +531,7 @@ class Invoice:
 
 
             # Reload data and disable buttons
+            Invoice.refreshInvoiceTotals(id_factura)
             Invoice.setTableSalesData(id_factura)
             Invoice.selectInvoice()
 
@@ -500,23 +540,6 @@ class Invoice:
         except Exception as e:
             print(f"Error en saveSales: {e}")
 
-
-    @staticmethod
-    def reduceStock(id_product, amount):
-        try:
-            product_data = Connection.getProductData(id_product, "id")
-            current_stock = product_data[2]
-
-            updated_stock = int(current_stock) - int(amount)
-
-            if not Connection.updateStockProductData([id_product, updated_stock]):
-                return False
-
-            return True
-
-        except Exception as e:
-            print(f"Error en reduceStock: {e}")
-
     @staticmethod
     def setTableSalesData(id_factura):
         """
@@ -533,7 +556,7 @@ class Invoice:
             ui_table.clearContents()
             ui_table.setRowCount(0)
 
-            all_sales = Connection.getSale(id_factura)
+            all_sales = Repository.getSale(id_factura)
 
             if not all_sales:
                 Invoice.activeSales(create_new_row=False)
@@ -545,15 +568,15 @@ class Invoice:
             for index, sale in enumerate(all_sales):
 
                 # ID Producto
-                ui_table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(sale[2])))
+                ui_table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(sale.idProducto)))
                 # Nombre Producto
-                ui_table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(sale[4])))
+                ui_table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(sale.product)))
                 # Precio Unitario
-                ui_table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(sale[5])))
+                ui_table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(sale.unitprice)))
                 # Cantidad
-                ui_table.setItem(index, 3, QtWidgets.QTableWidgetItem(str(sale[3])))
+                ui_table.setItem(index, 3, QtWidgets.QTableWidgetItem(str(sale.amount)))
                 # Total Línea
-                ui_table.setItem(index, 4, QtWidgets.QTableWidgetItem(str(sale[6])))
+                ui_table.setItem(index, 4, QtWidgets.QTableWidgetItem(str(sale.total)))
 
                 item_align_center = QtCore.Qt.AlignmentFlag.AlignCenter | QtCore.Qt.AlignmentFlag.AlignVCenter
                 item_align_left = QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignVCenter
@@ -605,7 +628,7 @@ class Invoice:
                 mbox.exec()
                 return
 
-            if Connection.getSale(id_factura):
+            if Repository.getSale(id_factura):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Error")
                 mbox.setText("This invoice has sales!")
@@ -614,7 +637,7 @@ class Invoice:
                 mbox.exec()
                 return
 
-            if not Connection.deleteInvoiceAndSale(id_factura):
+            if not Repository.deleteInvoiceAndSale(id_factura):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Error")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Critical)
@@ -631,7 +654,7 @@ class Invoice:
             mbox.exec()
 
             globals.ui.le_dni_invoice.setText("00000000T")
-            Invoice.setTableFacturaData()
+            Invoice.tableModel().removeInvoice(id_factura)
             Invoice.searchInvoiceCustomer()
             Invoice.activeSales()
         except Exception as e:
@@ -0,0 +1,160 @@
+from bisect import bisect_left
+
+from PyQt6 import QtCore
+
+from repository import Repository
+
+
+class InvoiceModel(QtCore.QAbstractTableModel):
+    """
+        Table model of the invoice list, newest first, read lazily in keyset pages.
+
+        The model starts empty and implements canFetchMore()/fetchMore(): the view asks
+        for the next page (Repository.getInvoicesPage, ordered by idFac descending) only
+        when the user scrolls near the last loaded row, so opening the list costs one
+        page however many invoices there are. After a write, upsertInvoice() and
+        removeInvoice() change only the row concerned.
+    """
+    HEADERS = ("Nº Factura", "DNI", "Date", "Lines", "Total")
+    PAGE_SIZE = 200
+
+    _ALIGNMENTS = (
+        QtCore.Qt.AlignmentFlag.AlignHCenter | QtCore.Qt.AlignmentFlag.AlignVCenter,
+        QtCore.Qt.AlignmentFlag.AlignCenter,
+        QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignVCenter,
+        QtCore.Qt.AlignmentFlag.AlignHCenter | QtCore.Qt.AlignmentFlag.AlignVCenter,
+        QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter,
+    )
+
+    def __init__(self, parent=None):
+        super(InvoiceModel, self).__init__(parent)
+        self._invoices = []
+        # -idFac of every loaded row, ascending, for bisect lookups
+        self._keys = []
+        self._cursor = None
+        self._exhausted = False
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._invoices)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(InvoiceModel.HEADERS)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            invoice = self._invoices[index.row()]
+            column = index.column()
+            if column == 0:
+                return str(invoice.idFac)
+            if column == 1:
+                return str(invoice.dni_nie)
+            if column == 2:
+                return str(invoice.date)
+            if column == 3:
+                return str(invoice.lines)
+            return "{:.2f}".format(invoice.total)
+        if role == QtCore.Qt.ItemDataRole.TextAlignmentRole:
+            return InvoiceModel._ALIGNMENTS[index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return InvoiceModel.HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        invoices, self._cursor = Repository.getInvoicesPage(self._cursor, InvoiceModel.PAGE_SIZE)
+        self._exhausted = self._cursor is None
+        if not invoices:
+            return
+        first = len(self._invoices)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(invoices) - 1)
+        self._invoices.extend(invoices)
+        self._keys.extend(-invoice.idFac for invoice in invoices)
+        self.endInsertRows()
+
+    def reload(self):
+        """
+            Drops every loaded row and reads the first page again.
+        """
+        self.beginResetModel()
+        self._invoices = []
+        self._keys = []
+        self._cursor = None
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def invoiceAt(self, row):
+        """
+            :param row: A row of the model.
+            :type row: int
+            :return: The invoice shown in that row, None if out of range.
+            :rtype: InvoiceSummaryRow
+        """
+        if 0 <= row < len(self._invoices):
+            return self._invoices[row]
+        return None
+
+    def rowOf(self, id_factura):
+        """
+            :param id_factura: The ID of an invoice.
+            :type id_factura: int|str
+            :return: The row of the invoice, -1 if it is not loaded.
+            :rtype: int
+        """
+        key = -int(id_factura)
+        row = bisect_left(self._keys, key)
+        if row < len(self._keys) and self._keys[row] == key:
+            return row
+        return -1
+
+    def upsertInvoice(self, invoice):
+        """
+            Replaces one loaded invoice, e.g. after its totals changed, or inserts a new one
+            at its place in the idFac order. An invoice older than the loaded pages is left
+            for fetchMore().
+
+            :param invoice: The new values, matched by idFac.
+            :type invoice: InvoiceSummaryRow
+            :return: True if a row was updated or inserted, False otherwise.
+            :rtype: bool
+        """
+        key = -int(invoice.idFac)
+        row = bisect_left(self._keys, key)
+        if row == len(self._keys) and not self._exhausted:
+            return False
+        if row == len(self._keys) or self._keys[row] != key:
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._invoices.insert(row, invoice)
+            self._keys.insert(row, key)
+            self.endInsertRows()
+            return True
+
+        self._invoices[row] = invoice
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(InvoiceModel.HEADERS) - 1),
+                              [QtCore.Qt.ItemDataRole.DisplayRole])
+        return True
+
+    def removeInvoice(self, id_factura):
+        """
+            Removes the row of one invoice, if it is loaded.
+
+            :param id_factura: The ID of the invoice.
+            :type id_factura: int|str
+            :return: True if a row was removed, False otherwise.
+            :rtype: bool
+        """
+        row = self.rowOf(id_factura)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._invoices[row]
+        del self._keys[row]
+        self.endRemoveRows()
+        return True
@@ -3,7 +3,9 @@ from connection import *
 
 from events import Events
 import globals
-from venAux import Calendar, About, FileDialog, Settings
+from queryExecutor import QueryExecutor
+from repository import Repository
+from venAux import Calendar, About, FileDialog, Settings, QueryStatsDialog
 from window import *
 from customers import Customers
 from products import Products
@@ -12,21 +14,27 @@ import styles
 import  sys
 from ThemeManager import ThemeManager
 from reports import *
+from tabLoader import TabLoader
 
 class Main(QtWidgets.QMainWindow):
     def __init__(self):
         super(Main, self).__init__()
+        TabLoader.begin()
         globals.ui = Ui_window()
         globals.ui.setupUi(self)
 
         # Iniciar DB antes de istanciar
         Connection.db_connection()
+        Repository.select()
+        globals.executor = QueryExecutor(Connection.DB_PATH, parent=self)
+        TabLoader.mark("database")
 
         #instance
         globals.vencal = Calendar()
         globals.about = About()
         globals.dialog_open = FileDialog()
         globals.settings = Settings()
+        globals.query_stats = QueryStatsDialog()
         globals.theme = ThemeManager()
 
 
@@ -38,17 +46,27 @@ class Main(QtWidgets.QMainWindow):
         globals.theme_manager.register(globals.settings)
         globals.theme_manager.register(globals.about)
         globals.theme_manager.register(globals.vencal)
+        globals.theme_manager.register(globals.query_stats)
 
         Invoice.initDataBoxes()
 
+        # Tab data is loaded after the first paint, the visible tab first (see TabLoader)
+        TabLoader.register(globals.ui.tab_customer, "customers tab",
+                           Customers.setTableData, Events.resizeCustomerTable, Events.loadProvinces,
+                           reads=("customers",))
+        TabLoader.register(globals.ui.tab_sales, "products tab",
+                           Products.setTableData, Events.resizeProductTable, Events.loadProductFamily,
+                           Events.loadCurrency, reads=("products",))
+        TabLoader.register(globals.ui.tab_invoicing, "invoices tab",
+                           Invoice.setTableFacturaData, Events.resizeSalesTable, Invoice.activeSales)
+        TabLoader.start(globals.ui.pan_main, globals.executor)
+        TabLoader.mark("window")
+
+    def paintEvent(self, event):
+        super(Main, self).paintEvent(event)
+        TabLoader.firstPaint()
+
     def connect_signals_slot(self):
-        #conexion DB
-        Customers.setTableData()
-        Products.setTableData()
-        Invoice.setTableFacturaData()
-        Events.resizeCustomerTable()
-        Events.resizeProductTable()
-        Events.resizeSalesTable()
 
         #File
         globals.ui.actionExit.triggered.connect(Events.messageExit)
@@ -63,10 +81,14 @@ class Main(QtWidgets.QMainWindow):
         globals.ui.actionTicketReport.triggered.connect(Reports.ticket)
         globals.ui.actionProductLowStockReport.triggered.connect(lambda: Reports.reportProducts(True))
         globals.ui.actionProductbyfamilyReport.triggered.connect(self.showFamilyReportSelector)
+        globals.ui.actionInvoiceReport.triggered.connect(Reports.reportInvoices)
+        globals.ui.actionRevenueByFamilyReport.triggered.connect(lambda: Reports.reportRevenueByFamily())
 
         #Tools
         globals.ui.actionBackup.triggered.connect(Events.saveBackup)
         globals.ui.actionRestoreBackup.triggered.connect(Events.restoreBackup)
+        globals.ui.actionSyncServer.triggered.connect(Events.syncServer)
+        globals.ui.actionQueryStats.triggered.connect(Events.showQueryStats)
 
         #Customers
         globals.ui.le_dni.editingFinished.connect(Customers.checkDni)
@@ -105,8 +127,6 @@ class Main(QtWidgets.QMainWindow):
 
         #Other functions in Invoice
         globals.ui.le_dni_invoice.setText("00000000T")
-        Invoice.searchInvoiceCustomer()
-        Invoice.activeSales()
         globals.ui.table_sales.itemChanged.connect(Invoice.cellChangedSales)
 
         #Function of tables
@@ -115,14 +135,12 @@ class Main(QtWidgets.QMainWindow):
         globals.ui.table_invoice.clicked.connect(Invoice.selectInvoice)
 
         # Function combobox
-        Events.loadProvinces()
         globals.ui.cb_province.currentIndexChanged.connect(Events.loadCities)
-        Events.loadProductFamily()
-        Events.loadCurrency()
 
         # Functions of check Historical
         globals.ui.chkb_hystorical.setChecked(True)
         globals.ui.chkb_hystorical.stateChanged.connect(Customers.getCustomersByHistorical)
+        globals.ui.le_filter_customer.textChanged.connect(Customers.filterTable)
 
         #Show status bar
         Events.showStatusBar()
@@ -147,7 +165,7 @@ class Main(QtWidgets.QMainWindow):
 
     def showFamilyReportSelector(self):
         try:
-            families = Connection.getProductFamilies()
+            families = Repository.getProductFamilies()
 
             if not families:
                 QtWidgets.QMessageBox.warning(self,"Family Report", "No families selected")
@@ -0,0 +1,264 @@
+from PyQt6 import QtSql
+
+# invoices.date is dd/mm/yyyy text; the sales aggregates are keyed by ISO yyyy-mm-dd days
+_ISO_DAY = "substr(i.date, 7, 4) || '-' || substr(i.date, 4, 2) || '-' || substr(i.date, 1, 2)"
+
+
+def _salesCubeDelta(row, sign):
+    """
+        Trigger body adding (sign 1) or removing (sign -1) one sale line to the daily
+        aggregates. ``row`` is "new" or "old".
+    """
+    day = f"(SELECT {_ISO_DAY} FROM invoices i WHERE i.idFac = {row}.idFactura)"
+    delta = f"{sign}, {sign} * {row}.amount, {sign} * {row}.total"
+    statements = (
+        f"INSERT INTO sales_daily_product (day, code, lines, units, revenue) "
+        f"SELECT {_ISO_DAY}, {row}.idProducto, {delta} FROM invoices i WHERE i.idFac = {row}.idFactura "
+        f"ON CONFLICT (day, code) DO UPDATE SET lines = lines + excluded.lines, "
+        f"units = units + excluded.units, revenue = revenue + excluded.revenue; "
+        f"INSERT INTO sales_daily_family_customer (day, family, dni_nie, lines, units, revenue) "
+        f"SELECT {_ISO_DAY}, coalesce(p.family, ''), coalesce(i.dni_nie, ''), {delta} FROM invoices i "
+        f"LEFT JOIN products p ON p.code = {row}.idProducto WHERE i.idFac = {row}.idFactura "
+        f"ON CONFLICT (day, family, dni_nie) DO UPDATE SET lines = lines + excluded.lines, "
+        f"units = units + excluded.units, revenue = revenue + excluded.revenue; "
+    )
+    if sign < 0:
+        statements += (
+            f"DELETE FROM sales_daily_product WHERE day = {day} AND code = {row}.idProducto AND lines <= 0; "
+            f"DELETE FROM sales_daily_family_customer WHERE day = {day} "
+            f"AND family = coalesce((SELECT family FROM products WHERE code = {row}.idProducto), '') "
+            f"AND dni_nie = (SELECT coalesce(dni_nie, '') FROM invoices WHERE idFac = {row}.idFactura) "
+            f"AND lines <= 0; "
+        )
+    return statements
+
+
+class Migrations:
+    """
+        Versioned schema migrations for the SQLite database.
+
+        The current schema version is stored in ``PRAGMA user_version``. Every entry of
+        ``MIGRATIONS`` is a tuple (version, description, statements) and is applied once,
+        in order, inside its own transaction. New schema changes must be appended to the
+        list with the next version number; already released entries must never be edited.
+    """
+    MIGRATIONS = [
+        (1, "Secondary indexes for the hot lookups", [
+            "CREATE INDEX IF NOT EXISTS idx_sales_idfactura ON sales (idFactura);",
+            "CREATE INDEX IF NOT EXISTS idx_customers_mobile ON customers (mobile);",
+            "CREATE INDEX IF NOT EXISTS idx_customers_historical_surname ON customers (historical, surname);",
+            "CREATE INDEX IF NOT EXISTS idx_customers_surname ON customers (surname);",
+            "CREATE INDEX IF NOT EXISTS idx_provincias_provincia ON provincias (provincia);",
+            "CREATE INDEX IF NOT EXISTS idx_municipios_idprov ON municipios (idprov);",
+            "ANALYZE;",
+        ]),
+        (2, "Keyset pagination indexes for customers", [
+            "DROP INDEX IF EXISTS idx_customers_historical_surname;",
+            "DROP INDEX IF EXISTS idx_customers_surname;",
+            "CREATE INDEX IF NOT EXISTS idx_customers_historical_surname_dni ON customers (historical, surname, dni_nie);",
+            "CREATE INDEX IF NOT EXISTS idx_customers_surname_dni ON customers (surname, dni_nie);",
+            "ANALYZE;",
+        ]),
+        # External content FTS5 indexes. customers_fts is keyed by the implicit rowid of
+        # customers: after a VACUUM run Connection.rebuildSearchIndex().
+        (3, "Full-text search over customers and products", [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5("
+            "surname, name, mail, address, city, content='customers', content_rowid='rowid', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3');",
+            "CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN "
+            "INSERT INTO customers_fts (rowid, surname, name, mail, address, city) "
+            "VALUES (new.rowid, new.surname, new.name, new.mail, new.address, new.city); END;",
+            "CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN "
+            "INSERT INTO customers_fts (customers_fts, rowid, surname, name, mail, address, city) "
+            "VALUES ('delete', old.rowid, old.surname, old.name, old.mail, old.address, old.city); END;",
+            "CREATE TRIGGER IF NOT EXISTS customers_fts_au AFTER UPDATE OF surname, name, mail, address, city ON customers BEGIN "
+            "INSERT INTO customers_fts (customers_fts, rowid, surname, name, mail, address, city) "
+            "VALUES ('delete', old.rowid, old.surname, old.name, old.mail, old.address, old.city); "
+            "INSERT INTO customers_fts (rowid, surname, name, mail, address, city) "
+            "VALUES (new.rowid, new.surname, new.name, new.mail, new.address, new.city); END;",
+            "INSERT INTO customers_fts (customers_fts) VALUES ('rebuild');",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+            "name, family, content='products', content_rowid='code', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3');",
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+            "INSERT INTO products_fts (rowid, name, family) VALUES (new.code, new.name, new.family); END;",
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+            "INSERT INTO products_fts (products_fts, rowid, name, family) VALUES ('delete', old.code, old.name, old.family); END;",
+            "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, family ON products BEGIN "
+            "INSERT INTO products_fts (products_fts, rowid, name, family) VALUES ('delete', old.code, old.name, old.family); "
+            "INSERT INTO products_fts (rowid, name, family) VALUES (new.code, new.name, new.family); END;",
+            "INSERT INTO products_fts (products_fts) VALUES ('rebuild');",
+        ]),
+        # Change log read by SyncEngine. pk has no type so keys keep their native type;
+        # the rows already in the database are logged once so the first sync ships them.
+        (4, "Change log for the server sync", [
+            "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "tbl TEXT NOT NULL, pk NOT NULL, op TEXT NOT NULL);",
+        ] + [
+            statement
+            for table, key in (("customers", "dni_nie"), ("products", "code"), ("invoices", "idFac"), ("sales", "id"))
+            for statement in (
+                f"CREATE TRIGGER IF NOT EXISTS changes_{table}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO changes (tbl, pk, op) VALUES ('{table}', new.{key}, 'I'); END;",
+                f"CREATE TRIGGER IF NOT EXISTS changes_{table}_au AFTER UPDATE ON {table} BEGIN "
+                f"INSERT INTO changes (tbl, pk, op) SELECT '{table}', old.{key}, 'D' WHERE old.{key} IS NOT new.{key}; "
+                f"INSERT INTO changes (tbl, pk, op) VALUES ('{table}', new.{key}, 'U'); END;",
+                f"CREATE TRIGGER IF NOT EXISTS changes_{table}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO changes (tbl, pk, op) VALUES ('{table}', old.{key}, 'D'); END;",
+                f"INSERT INTO changes (tbl, pk, op) SELECT '{table}', {key}, 'I' FROM {table};",
+            )
+        ]),
+        # One row per invoice, recomputed from its sale lines (idx_sales_idfactura) by the
+        # triggers, so the totals never drift. VAT is 21%, as in Invoice.calculateTotals.
+        (5, "Materialized invoice totals", [
+            "CREATE TABLE IF NOT EXISTS invoice_totals (idFac INTEGER PRIMARY KEY, "
+            "lines INTEGER NOT NULL DEFAULT 0, subtotal REAL NOT NULL DEFAULT 0, "
+            "vat REAL NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0);",
+        ] + [
+            f"CREATE TRIGGER IF NOT EXISTS invoice_totals_sales_{name} AFTER {event} ON sales BEGIN "
+            + "".join(
+                f"INSERT OR REPLACE INTO invoice_totals (idFac, lines, subtotal, vat, total) "
+                f"SELECT {row}.idFactura, n, round(s, 2), round(s * 0.21, 2), round(s * 1.21, 2) "
+                f"FROM (SELECT count(*) AS n, total(total) AS s FROM sales WHERE idFactura = {row}.idFactura) "
+                f"WHERE EXISTS (SELECT 1 FROM invoices WHERE idFac = {row}.idFactura); "
+                for row in rows)
+            + "END;"
+            for name, event, rows in (("ai", "INSERT", ("new",)),
+                                      ("ad", "DELETE", ("old",)),
+                                      ("au", "UPDATE OF idFactura, total", ("old", "new")))
+        ] + [
+            "CREATE TRIGGER IF NOT EXISTS invoice_totals_invoices_ai AFTER INSERT ON invoices BEGIN "
+            "INSERT OR IGNORE INTO invoice_totals (idFac) VALUES (new.idFac); END;",
+            "CREATE TRIGGER IF NOT EXISTS invoice_totals_invoices_ad AFTER DELETE ON invoices BEGIN "
+            "DELETE FROM invoice_totals WHERE idFac = old.idFac; END;",
+            "INSERT OR REPLACE INTO invoice_totals (idFac, lines, subtotal, vat, total) "
+            "SELECT idFac, n, round(s, 2), round(s * 0.21, 2), round(s * 1.21, 2) FROM ("
+            "SELECT i.idFac, count(s.id) AS n, total(s.total) AS s "
+            "FROM invoices i LEFT JOIN sales s ON s.idFactura = i.idFac GROUP BY i.idFac);",
+        ]),
+        # Daily aggregates for the sales reports, updated by the triggers in the same
+        # transaction as the sale lines (Connection.saveSales). The family is the one of the
+        # product when the line is written; after reclassifying products run
+        # Connection.rebuildSalesCubes().
+        (6, "Daily sales aggregates", [
+            "CREATE TABLE IF NOT EXISTS sales_daily_product (day TEXT NOT NULL, code INTEGER NOT NULL, "
+            "lines INTEGER NOT NULL, units INTEGER NOT NULL, revenue REAL NOT NULL, "
+            "PRIMARY KEY (day, code)) WITHOUT ROWID;",
+            "CREATE TABLE IF NOT EXISTS sales_daily_family_customer (day TEXT NOT NULL, family TEXT NOT NULL, "
+            "dni_nie TEXT NOT NULL, lines INTEGER NOT NULL, units INTEGER NOT NULL, revenue REAL NOT NULL, "
+            "PRIMARY KEY (day, family, dni_nie)) WITHOUT ROWID;",
+            "CREATE TRIGGER IF NOT EXISTS sales_cubes_ai AFTER INSERT ON sales BEGIN "
+            + _salesCubeDelta("new", 1) + "END;",
+            "CREATE TRIGGER IF NOT EXISTS sales_cubes_ad AFTER DELETE ON sales BEGIN "
+            + _salesCubeDelta("old", -1) + "END;",
+            "CREATE TRIGGER IF NOT EXISTS sales_cubes_au AFTER UPDATE OF idFactura, idProducto, amount, total ON sales BEGIN "
+            + _salesCubeDelta("old", -1) + _salesCubeDelta("new", 1) + "END;",
+            "INSERT INTO sales_daily_product (day, code, lines, units, revenue) "
+            f"SELECT {_ISO_DAY}, s.idProducto, count(*), total(s.amount), total(s.total) "
+            "FROM sales s JOIN invoices i ON i.idFac = s.idFactura GROUP BY 1, 2;",
+            "INSERT INTO sales_daily_family_customer (day, family, dni_nie, lines, units, revenue) "
+            f"SELECT {_ISO_DAY}, coalesce(p.family, ''), coalesce(i.dni_nie, ''), count(*), total(s.amount), total(s.total) "
+            "FROM sales s JOIN invoices i ON i.idFac = s.idFactura LEFT JOIN products p ON p.code = s.idProducto "
+            "GROUP BY 1, 2, 3;",
+        ]),
+        # One row per stock movement, written by Connection.saveSales/reserveStock and, from
+        # migration 8 on, by the stock trigger; stock is the product stock after the movement.
+        (7, "Stock movements ledger", [
+            "CREATE TABLE IF NOT EXISTS stock_movements (id INTEGER PRIMARY KEY, code INTEGER NOT NULL, "
+            "delta INTEGER NOT NULL, stock INTEGER NOT NULL, reason TEXT NOT NULL, ref INTEGER, "
+            "created TEXT NOT NULL DEFAULT (datetime('now')));",
+            "CREATE INDEX IF NOT EXISTS idx_stock_movements_code ON stock_movements (code, id);",
+        ]),
+        # Every stock change gets a movement, so the server sync can ship stock as deltas
+        # (SyncEngine). Connection._reserveStock writes the movement of a sale before the
+        # update, which the update trigger then skips. The opening movements make the
+        # deltas of every product add up to its stock; all movements are logged once so
+        # the first sync ships them.
+        (8, "Stock movements for every stock change", [
+            "CREATE TRIGGER IF NOT EXISTS stock_movements_products_ai AFTER INSERT ON products "
+            "WHEN new.stock <> 0 BEGIN "
+            "INSERT INTO stock_movements (code, delta, stock, reason) VALUES (new.code, new.stock, new.stock, 'initial'); END;",
+            "CREATE TRIGGER IF NOT EXISTS stock_movements_products_au AFTER UPDATE OF stock ON products "
+            "WHEN new.stock <> old.stock AND coalesce((SELECT m.stock FROM stock_movements m WHERE m.code = new.code "
+            "ORDER BY m.id DESC LIMIT 1), old.stock) <> new.stock BEGIN "
+            "INSERT INTO stock_movements (code, delta, stock, reason) "
+            "VALUES (new.code, new.stock - old.stock, new.stock, 'adjustment'); END;",
+            "CREATE TRIGGER IF NOT EXISTS stock_movements_products_ad AFTER DELETE ON products "
+            "WHEN old.stock <> 0 BEGIN "
+            "INSERT INTO stock_movements (code, delta, stock, reason) VALUES (old.code, -old.stock, 0, 'delete'); END;",
+            "INSERT INTO stock_movements (code, delta, stock, reason) "
+            "SELECT code, stock - opening, stock, 'opening' FROM ("
+            "SELECT p.code, p.stock, CAST((SELECT total(m.delta) FROM stock_movements m WHERE m.code = p.code) AS INTEGER) "
+            "AS opening FROM products p) WHERE stock <> opening;",
+            "CREATE TRIGGER IF NOT EXISTS changes_stock_movements_ai AFTER INSERT ON stock_movements BEGIN "
+            "INSERT INTO changes (tbl, pk, op) VALUES ('stock_movements', new.id, 'I'); END;",
+            "INSERT INTO changes (tbl, pk, op) SELECT 'stock_movements', id, 'I' FROM stock_movements;",
+        ]),
+    ]
+
+    @staticmethod
+    def getVersion(db=None):
+        """
+            Reads the schema version stored in the database.
+
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: The current schema version.
+            :rtype: int
+        """
+        query = QtSql.QSqlQuery(db) if db is not None else QtSql.QSqlQuery()
+        if query.exec("PRAGMA user_version;") and query.next():
+            return int(query.value(0))
+        return 0
+
+    @staticmethod
+    def latestVersion():
+        """
+            :return: The highest schema version known by the application.
+            :rtype: int
+        """
+        return max(version for version, _, _ in Migrations.MIGRATIONS)
+
+    @staticmethod
+    def migrate(db=None):
+        """
+            Applies every pending migration in order.
+
+            Each migration runs in its own transaction together with the version bump,
+            so a failure leaves the database at the last fully applied version.
+
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: True if the database is at the latest version, False otherwise.
+            :rtype: bool
+        """
+        if db is None:
+            db = QtSql.QSqlDatabase.database()
+
+        current_version = Migrations.getVersion(db)
+
+        for version, description, statements in Migrations.MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            if not db.transaction():
+                print("Error migrate: could not start transaction", db.lastError().text())
+                return False
+
+            query = QtSql.QSqlQuery(db)
+            for statement in statements + [f"PRAGMA user_version = {int(version)};"]:
+                if not query.exec(statement):
+                    print(f"Error migrate v{version} ({description}): ", query.lastError().text())
+                    query.finish()
+                    db.rollback()
+                    return False
+            query.finish()
+
+            if not db.commit():
+                print(f"Error migrate v{version} ({description}): ", db.lastError().text())
+                db.rollback()
+                return False
+
+            current_version = version
+
+        return True
@@ -0,0 +1,193 @@
+from rows import ProductRow, columnList, fetchRows
+from statementCache import StatementCache
+
+
+class ProductCatalog:
+    """
+        Process-wide cache of the products table, indexed by code and by name.
+
+        The whole table is read once; afterwards every write done through Connection
+        refreshes or removes the affected row (write-through), so lookups never need a
+        SQL round trip. The cache is dropped when the database is reopened.
+
+        The table can also be read on a QueryExecutor thread with read() and handed over
+        with install(); ``generation`` changes on every write so a read that raced a
+        write is not installed.
+    """
+    _by_code = None
+    _by_name = {}
+    generation = 0
+
+    @staticmethod
+    def read(db=None):
+        """
+            Reads the whole products table without touching the cache.
+
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: Every product ordered by code, None on error.
+            :rtype: list
+        """
+        query = StatementCache.prepare(f"SELECT {columnList(ProductRow)} FROM products ORDER BY code;", db)
+        if not query.exec():
+            print("Error ProductCatalog.read: ", query.lastError().text())
+            return None
+        return fetchRows(query, ProductRow)
+
+    @staticmethod
+    def install(all_products, generation):
+        """
+            Fills the cache with rows returned by read().
+
+            :param all_products: The rows returned by read().
+            :type all_products: list
+            :param generation: The value of ``generation`` when the read was started.
+            :type generation: int
+            :return: True if the rows were installed, False if a write happened meanwhile.
+            :rtype: bool
+        """
+        if all_products is None or generation != ProductCatalog.generation:
+            return False
+        ProductCatalog._by_code = {product.code: product for product in all_products}
+        ProductCatalog._by_name = {product.name: product for product in all_products}
+        return True
+
+    @staticmethod
+    def isLoaded():
+        """
+            :return: True if the catalog is cached.
+            :rtype: bool
+        """
+        return ProductCatalog._by_code is not None
+
+    @staticmethod
+    def load():
+        """
+            Reads the whole products table.
+
+            :return: True if the catalog was loaded, False otherwise.
+            :rtype: bool
+        """
+        try:
+            return ProductCatalog.install(ProductCatalog.read(), ProductCatalog.generation)
+        except Exception as error:
+            print("Error ProductCatalog.load: ", error)
+            return False
+
+    @staticmethod
+    def _ensureLoaded():
+        return ProductCatalog._by_code is not None or ProductCatalog.load()
+
+    @staticmethod
+    def invalidate():
+        """
+            Drops the cached catalog; it is read again on the next access.
+        """
+        ProductCatalog.generation += 1
+        ProductCatalog._by_code = None
+        ProductCatalog._by_name = {}
+
+    @staticmethod
+    def getAll():
+        """
+            :return: Every product, ordered by code.
+            :rtype: list
+        """
+        if not ProductCatalog._ensureLoaded():
+            return []
+        return list(ProductCatalog._by_code.values())
+
+    @staticmethod
+    def getByCode(code):
+        """
+            :param code: The product code.
+            :type code: int|str
+            :return: The product, None if it does not exist.
+            :rtype: ProductRow
+        """
+        if not ProductCatalog._ensureLoaded():
+            return None
+        try:
+            return ProductCatalog._by_code.get(int(code))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def getByName(name):
+        """
+            :param name: The product name.
+            :type name: str
+            :return: The product, None if it does not exist.
+            :rtype: ProductRow
+        """
+        if not ProductCatalog._ensureLoaded():
+            return None
+        return ProductCatalog._by_name.get(name)
+
+    @staticmethod
+    def getFamilies():
+        """
+            :return: The distinct families of the cached products.
+            :rtype: list
+        """
+        if not ProductCatalog._ensureLoaded():
+            return []
+        return list(dict.fromkeys(product.family for product in ProductCatalog._by_code.values()))
+
+    @staticmethod
+    def refresh(code=None, name=None):
+        """
+            Re-reads a single product from the database after a write and updates the cache.
+
+            The row is read back instead of built from the written values so that the
+            cached types match SQLite's column affinity.
+
+            :param code: The product code.
+            :type code: int|str
+            :param name: The product name, used when the code is not known.
+            :type name: str
+        """
+        ProductCatalog.generation += 1
+        if ProductCatalog._by_code is None:
+            return
+
+        if code is not None:
+            query = StatementCache.prepare(f"SELECT {columnList(ProductRow)} FROM products WHERE code = :value;")
+            query.bindValue(":value", int(code))
+        else:
+            query = StatementCache.prepare(f"SELECT {columnList(ProductRow)} FROM products WHERE name = :value;")
+            query.bindValue(":value", str(name))
+
+        if not query.exec():
+            print("Error ProductCatalog.refresh: ", query.lastError().text())
+            ProductCatalog.invalidate()
+            return
+
+        found = fetchRows(query, ProductRow)
+        if not found:
+            previous = ProductCatalog.getByCode(code) if code is not None else ProductCatalog.getByName(name)
+            if previous:
+                ProductCatalog.remove(previous.name)
+            return
+
+        product = found[0]
+        previous = ProductCatalog._by_code.get(product.code)
+        if previous and previous.name != product.name:
+            ProductCatalog._by_name.pop(previous.name, None)
+        ProductCatalog._by_code[product.code] = product
+        ProductCatalog._by_name[product.name] = product
+
+    @staticmethod
+    def remove(name):
+        """
+            Removes a deleted product from the cache.
+
+            :param name: The product name.
+            :type name: str
+        """
+        ProductCatalog.generation += 1
+        if ProductCatalog._by_code is None:
+            return
+        product = ProductCatalog._by_name.pop(name, None)
+        if product:
+            ProductCatalog._by_code.pop(product.code, None)
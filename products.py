@@ -1,5 +1,7 @@
 from PyQt6.QtGui import QColor
 from connection import Connection
+from repository import Repository
+from productCatalog import ProductCatalog
 from PyQt6 import QtCore, QtWidgets
 import globals
 from events import Events
@@ -35,39 +37,138 @@ class Products:
     def setTableData():
         """
             Loads the list of all products into the UI table.
+
+            With the SQLite backend the first load reads the catalog on the background query
+            executor when it is running; afterwards the table is filled from the cached catalog.
+            With the server backend every load reads the products on the executor.
         """
         try:
-            all_products = Connection.getProducts()
+            if globals.executor is None or (Repository.isLocal() and ProductCatalog.isLoaded()):
+                Products.populateTable(Repository.getProducts())
+                return
+            if not Repository.isLocal():
+                globals.executor.submit("products", Repository.getProducts, on_finished=Products.populateTable,
+                                        local=False)
+                return
+
+            generation = ProductCatalog.generation
+            globals.executor.submit("products", ProductCatalog.read,
+                                    on_finished=lambda rows: Products.catalogRead(rows, generation))
+        except Exception as e:
+            print("error en cargar setTableData", e)
+
+    @staticmethod
+    def catalogRead(all_products, generation):
+        """
+            Installs the catalog read in the background and fills the table.
+
+            If a product was written while the catalog was being read, the rows are
+            discarded and the catalog is read again on the GUI thread.
 
-            index = 0
+            :param all_products: The rows returned by ProductCatalog.read().
+            :type all_products: list
+            :param generation: The catalog generation when the read was submitted.
+            :type generation: int
+        """
+        ProductCatalog.install(all_products, generation)
+        Products.populateTable(Repository.getProducts())
+
+    @staticmethod
+    def populateTable(all_products):
+        """
+            Fills the product table with already read products.
+
+            :param all_products: The products to show.
+            :type all_products: list
+        """
+        try:
             ui_table = globals.ui.table_product
-            for product in all_products:
-                ui_table.setRowCount(index + 1)
-                ui_table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(product[0])))
-                ui_table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(product[1])))
-                ui_table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(product[2])))
-                ui_table.setItem(index, 3, QtWidgets.QTableWidgetItem(str(product[3])))
-                ui_table.setItem(index, 4, QtWidgets.QTableWidgetItem(str(product[4])))
-                ui_table.setItem(index, 5, QtWidgets.QTableWidgetItem(str(product[5])))
-
-                ui_table.item(index, 0).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 1).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignLeft.AlignVCenter)
-                ui_table.item(index, 2).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 3).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 4).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-                ui_table.item(index, 5).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
-
-                if int(product[2]) <= 5:
-                    ui_table.item(index, 2).setData(
-                    QtCore.Qt.ItemDataRole.BackgroundRole,
-                    QColor("red")
-                )
-
-                index += 1
+            ui_table.setRowCount(len(all_products))
+            for index, product in enumerate(all_products):
+                Products.setRowItems(index, product)
 
         except Exception as e:
             print("error en cargar setTableData", e)
 
+    @staticmethod
+    def setRowItems(index, product):
+        """
+            Fills one row of the product table.
+
+            :param index: The row of the table.
+            :type index: int
+            :param product: The product to show.
+            :type product: ProductRow
+        """
+        ui_table = globals.ui.table_product
+        ui_table.setItem(index, 0, QtWidgets.QTableWidgetItem(str(product.code)))
+        ui_table.setItem(index, 1, QtWidgets.QTableWidgetItem(str(product.name)))
+        ui_table.setItem(index, 2, QtWidgets.QTableWidgetItem(str(product.stock)))
+        ui_table.setItem(index, 3, QtWidgets.QTableWidgetItem(str(product.family)))
+        ui_table.setItem(index, 4, QtWidgets.QTableWidgetItem(str(product.unit_price)))
+        ui_table.setItem(index, 5, QtWidgets.QTableWidgetItem(str(product.currency)))
+
+        ui_table.item(index, 0).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
+        ui_table.item(index, 1).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignLeft.AlignVCenter)
+        ui_table.item(index, 2).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
+        ui_table.item(index, 3).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
+        ui_table.item(index, 4).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
+        ui_table.item(index, 5).setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter.AlignVCenter)
+
+        if int(product.stock) <= 5:
+            ui_table.item(index, 2).setData(
+            QtCore.Qt.ItemDataRole.BackgroundRole,
+            QColor("red")
+        )
+
+    @staticmethod
+    def findRow(column, text):
+        """
+            :param column: 0 to search by code, 1 to search by name.
+            :type column: int
+            :param text: The code or name of the product.
+            :type text: str
+            :return: The row showing the product, -1 if there is none.
+            :rtype: int
+        """
+        ui_table = globals.ui.table_product
+        for index in range(ui_table.rowCount()):
+            item = ui_table.item(index, column)
+            if item is not None and item.text() == text:
+                return index
+        return -1
+
+    @staticmethod
+    def refreshRow(name):
+        """
+            Re-reads one product after a write and updates, inserts or removes only its row,
+            keeping the code order of the catalog, the selection and the scroll position.
+
+            :param name: The name of the written product.
+            :type name: str
+        """
+        try:
+            ui_table = globals.ui.table_product
+            name = str(name)
+            product = Repository.getProductData(name)
+            index = Products.findRow(1, name)
+            if not product:
+                if index >= 0:
+                    ui_table.removeRow(index)
+                return
+
+            if index < 0:
+                index = ui_table.rowCount()
+                for row in range(ui_table.rowCount()):
+                    item = ui_table.item(row, 0)
+                    if item is not None and int(item.text()) > int(product.code):
+                        index = row
+                        break
+                ui_table.insertRow(index)
+            Products.setRowItems(index, product)
+        except Exception as e:
+            print("error en refreshRow", e)
+
     @staticmethod
     def saveProduct():
         """
@@ -76,13 +177,13 @@ class Products:
         try:
             all_data_boxes = [globals.ui.le_name_product, globals.ui.le_stock, globals.ui.cb_family, globals.ui.le_unit_price, globals.ui.cb_currency]
 
-            if Connection.addProduct(all_data_boxes):
+            if Repository.addProduct(all_data_boxes):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Information")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox.setText("Success saving the product")
                 mbox.exec()
-                Products.setTableData()
+                Products.refreshRow(globals.ui.le_name_product.text())
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -91,8 +192,6 @@ class Products:
             mbox.setText("An error has occurred while saving the product")
             mbox.exec()
 
-            Products.setTableData()
-
         except Exception as e:
             print("error en cargar saveProduct", e)
 
@@ -106,7 +205,7 @@ class Products:
             Utils.disableLineEdit(globals.ui.le_name_product)
             row_selected = globals.ui.table_product.selectedItems()
             name_product_selected = row_selected[1].text()
-            all_product_data = Connection.getProductData(str(name_product_selected))
+            all_product_data = Repository.getProductData(str(name_product_selected))
 
             all_data_boxes = [globals.ui.le_name_product, globals.ui.le_stock, globals.ui.cb_family, globals.ui.le_unit_price, globals.ui.cb_currency]
 
@@ -156,13 +255,13 @@ class Products:
 
             name_product = globals.ui.le_name_product.text()
 
-            if Connection.deleteProduct(name_product):
+            if Repository.deleteProduct(name_product):
                 mbox_success = QtWidgets.QMessageBox()
                 mbox_success.setWindowTitle("Information")
                 mbox_success.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox_success.setText("Success deleting the product")
                 mbox_success.exec()
-                Products.setTableData()
+                Products.refreshRow(name_product)
                 return
 
             mbox = QtWidgets.QMessageBox()
@@ -195,14 +294,14 @@ class Products:
             all_data_boxes = [globals.ui.le_name_product, globals.ui.le_stock, globals.ui.cb_family,
                               globals.ui.le_unit_price, globals.ui.cb_currency]
 
-            if Connection.setProductData(all_data_boxes):
+            if Repository.setProductData(all_data_boxes):
                 mbox = QtWidgets.QMessageBox()
                 mbox.setWindowTitle("Information")
                 mbox.setIcon(QtWidgets.QMessageBox.Icon.Information)
                 mbox.setText("Success modifying the product's data")
                 mbox.exec()
                 Utils.enableAllLineEdit()
-                Products.setTableData()
+                Products.refreshRow(globals.ui.le_name_product.text())
                 return
 
             mbox = QtWidgets.QMessageBox()
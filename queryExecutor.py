@@ -0,0 +1,258 @@
+import itertools
+import threading
+
+from PyQt6 import QtCore, QtSql
+
+from sqliteProfile import SqliteProfile
+from statementCache import StatementCache
+
+
+class _QueryTask(QtCore.QRunnable):
+    """
+        Runs one submitted reader in a pool thread and reports back to the executor.
+    """
+    def __init__(self, executor, request_id, function, args, kwargs, local):
+        super(_QueryTask, self).__init__()
+        self.executor = executor
+        self.request_id = request_id
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.local = local
+
+    def run(self):
+        if self.executor.isCancelled(self.request_id):
+            return
+        try:
+            db = self.executor.threadDatabase() if self.local else None
+            result = self.function(*self.args, db=db, **self.kwargs)
+            if not self.executor.isCancelled(self.request_id):
+                self.executor._done.emit(self.request_id, result)
+        except Exception as error:
+            self.executor._error.emit(self.request_id, str(error))
+
+
+class _CloseTask(QtCore.QRunnable):
+    """
+        Closes the connection of the pool thread it runs on; reset() runs one per thread.
+    """
+    def __init__(self, executor, barrier):
+        super(_CloseTask, self).__init__()
+        self.executor = executor
+        self.barrier = barrier
+
+    def run(self):
+        self.executor._closeThreadDatabase()
+        # Holds the thread until every close task started, so each one gets its own thread
+        self.barrier.wait()
+
+
+class QueryExecutor(QtCore.QObject):
+    """
+        Runs Connection readers on a QThreadPool so table loads never block the Qt event loop.
+
+        QtSql connections cannot cross threads, so every pool thread opens its own
+        connection to the database file. Readers are called with a ``db`` keyword argument
+        and their result is delivered on the GUI thread, to the callback given to submit()
+        and through the ``finished`` signal. Submitting a new request with the same key
+        cancels the previous one: its result is discarded even if it was already running.
+    """
+    finished = QtCore.pyqtSignal(str, object)
+    failed = QtCore.pyqtSignal(str, str)
+
+    _done = QtCore.pyqtSignal(int, object)
+    _error = QtCore.pyqtSignal(int, str)
+
+    def __init__(self, database_path, max_threads=2, parent=None):
+        super(QueryExecutor, self).__init__(parent)
+        self.database_path = database_path
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        # Threads keep their database connection, so they must not expire
+        self._pool.setExpiryTimeout(-1)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._latest = {}
+        self._tasks = {}
+        self._generation = 0
+        # Keyed by thread id: Python thread-local storage does not survive between
+        # tasks on threads started by Qt
+        self._databases = {}
+
+        self._done.connect(self._onDone)
+        self._error.connect(self._onError)
+
+    def submit(self, key, function, *args, on_finished=None, local=True, **kwargs):
+        """
+            Queues ``function(*args, db=<thread connection>, **kwargs)`` on the pool.
+
+            :param key: Identifies the kind of request; a newer request with the same key
+                        cancels the older one.
+            :type key: str
+            :param function: The reader to run, it must accept a ``db`` keyword argument.
+            :param on_finished: Callback called on the GUI thread with the result.
+            :param local: False for readers that do not use the local SQLite database, e.g.
+                          the ConnectionServer ones: no thread connection is opened and they
+                          get ``db=None``.
+            :type local: bool
+            :return: The request id.
+            :rtype: int
+        """
+        request_id = next(self._ids)
+        task = _QueryTask(self, request_id, function, args, kwargs, local)
+        task.setAutoDelete(False)
+
+        with self._lock:
+            previous = self._latest.get(key)
+            self._requests[request_id] = (key, on_finished)
+            self._latest[key] = request_id
+            self._tasks[request_id] = task
+
+        if previous is not None:
+            self._cancelRequest(previous)
+
+        self._pool.start(task)
+        return request_id
+
+    def cancel(self, key):
+        """
+            Cancels the pending request of a key, if any.
+
+            :param key: The request key.
+            :type key: str
+        """
+        with self._lock:
+            request_id = self._latest.pop(key, None)
+        if request_id is not None:
+            self._cancelRequest(request_id)
+
+    def _cancelRequest(self, request_id):
+        with self._lock:
+            self._requests.pop(request_id, None)
+            task = self._tasks.pop(request_id, None)
+        if task is not None:
+            self._pool.tryTake(task)
+
+    def isCancelled(self, request_id):
+        """
+            :param request_id: The id returned by submit().
+            :type request_id: int
+            :return: True if the request was cancelled or superseded.
+            :rtype: bool
+        """
+        with self._lock:
+            return request_id not in self._requests
+
+    def isBusy(self, key):
+        """
+            :param key: The request key.
+            :type key: str
+            :return: True if a request with that key is queued or running.
+            :rtype: bool
+        """
+        with self._lock:
+            return key in self._latest
+
+    def _finish(self, request_id):
+        with self._lock:
+            key, on_finished = self._requests.pop(request_id, (None, None))
+            self._tasks.pop(request_id, None)
+            if key is not None and self._latest.get(key) == request_id:
+                del self._latest[key]
+        return key, on_finished
+
+    def _onDone(self, request_id, result):
+        key, on_finished = self._finish(request_id)
+        if key is None:
+            return
+        if on_finished is not None:
+            on_finished(result)
+        self.finished.emit(key, result)
+
+    def _onError(self, request_id, message):
+        key, _ = self._finish(request_id)
+        if key is None:
+            return
+        print(f"Error QueryExecutor {key}: ", message)
+        self.failed.emit(key, message)
+
+    def threadDatabase(self):
+        """
+            Returns the connection of the calling pool thread, opening it on first use or
+            after reset().
+
+            :return: The open connection of the current thread.
+            :rtype: QSqlDatabase
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            db, generation = self._databases.get(ident, (None, None))
+        if db is not None and generation == self._generation and db.isOpen():
+            return db
+
+        if db is not None:
+            del db
+            self._closeThreadDatabase()
+
+        db = QtSql.QSqlDatabase.addDatabase("QSQLITE", self._connectionName(ident))
+        db.setDatabaseName(self.database_path)
+        if not db.open():
+            raise RuntimeError(db.lastError().text())
+        SqliteProfile.apply(db, record=False)
+
+        with self._lock:
+            self._databases[ident] = (db, self._generation)
+        return db
+
+    def _connectionName(self, ident):
+        return f"query-executor-{id(self)}-{ident}"
+
+    def _closeThreadDatabase(self):
+        """
+            Closes and removes the connection of the calling pool thread, if it has one.
+            QtSql connections must be closed on the thread that uses them.
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._databases.pop(ident, None)
+        if entry is None:
+            return
+        name = self._connectionName(ident)
+        StatementCache.invalidate(name)
+        db = entry[0]
+        del entry
+        db.close()
+        del db
+        QtSql.QSqlDatabase.removeDatabase(name)
+
+    def reset(self):
+        """
+            Cancels every pending request, waits for the running ones and closes the
+            connection of every pool thread, each on its own thread; the next request
+            opens a new one. Must be called before the database file is replaced, e.g. by
+            a backup restore, so no connection keeps the old file or its -wal open.
+        """
+        with self._lock:
+            pending = list(self._tasks)
+            self._latest.clear()
+        for request_id in pending:
+            self._cancelRequest(request_id)
+        self._generation += 1
+
+        # One close task per thread, queued behind the requests still running. The pool
+        # must not be waited for before: waitForDone() ends its threads, and a thread that
+        # ends with its connection open leaves it open for good.
+        threads = self._pool.maxThreadCount()
+        barrier = threading.Barrier(threads)
+        for _ in range(threads):
+            self._pool.start(_CloseTask(self, barrier))
+        self._pool.waitForDone()
+
+    def openConnections(self):
+        """
+            :return: The number of pool threads holding an open connection.
+            :rtype: int
+        """
+        with self._lock:
+            return len(self._databases)
@@ -0,0 +1,224 @@
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from PyQt6 import QtSql
+
+from statementCache import StatementCache
+
+
+class QueryStats:
+    """
+        Timing instrumentation for the Connection methods.
+
+        instrument() wraps every public static method of a class and records the number
+        of calls, the latency (total, p50, p95, max) and the rows returned. Calls slower
+        than the ``slow_query_ms`` setting are written to a rotating slow-query log with
+        their arguments and, for every statement they executed, the SQL text, the bound
+        values and the EXPLAIN QUERY PLAN.
+    """
+    SETTING_KEY = "slow_query_ms"
+    DEFAULT_THRESHOLD_MS = 100
+    LOG_PATH = "./data/slow_queries.log"
+    SAMPLES = 1024
+
+    threshold_ms = DEFAULT_THRESHOLD_MS
+    _stats = {}
+    _lock = threading.Lock()
+    _logger = None
+
+    @staticmethod
+    def configure(threshold_ms):
+        """
+            :param threshold_ms: Calls slower than this are logged, a negative value disables the log.
+            :type threshold_ms: int|str
+        """
+        try:
+            QueryStats.threshold_ms = float(threshold_ms)
+        except (TypeError, ValueError):
+            QueryStats.threshold_ms = QueryStats.DEFAULT_THRESHOLD_MS
+
+    @staticmethod
+    def instrument(cls):
+        """
+            Replaces every public static method of a class with a timed wrapper.
+
+            :param cls: The class to instrument, e.g. Connection.
+            :type cls: type
+        """
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or not isinstance(member, staticmethod):
+                continue
+            function = member.__func__
+            if getattr(function, "__wrapped__", None) is not None:
+                continue
+            label = f"{cls.__name__}.{name}"
+            if inspect.isgeneratorfunction(function):
+                wrapper = QueryStats._wrapGenerator(label, function)
+            else:
+                wrapper = QueryStats._wrapFunction(label, function)
+            setattr(cls, name, staticmethod(wrapper))
+
+    @staticmethod
+    def _wrapFunction(label, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            trace = StatementCache.startTrace()
+            start = time.perf_counter()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                traced = StatementCache.stopTrace(trace)
+                QueryStats.record(label, elapsed, QueryStats._countRows(result), args, kwargs, traced)
+        return wrapper
+
+    @staticmethod
+    def _wrapGenerator(label, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # Timed over the whole iteration; the nested calls are recorded on their own
+            start = time.perf_counter()
+            rows = 0
+            try:
+                for row in function(*args, **kwargs):
+                    rows += 1
+                    yield row
+            finally:
+                QueryStats.record(label, time.perf_counter() - start, rows, args, kwargs, [])
+        return wrapper
+
+    @staticmethod
+    def _countRows(result):
+        if isinstance(result, list):
+            return len(result)
+        if isinstance(result, tuple):
+            if hasattr(result, "_fields"):
+                return 1
+            if result and isinstance(result[0], list):
+                return len(result[0])
+            return len(result)
+        return 0
+
+    @staticmethod
+    def record(label, elapsed, rows, args=(), kwargs=None, traced=()):
+        """
+            Adds one call to the aggregates and logs it if it is slow.
+
+            :param label: The method name.
+            :type label: str
+            :param elapsed: The duration in seconds.
+            :type elapsed: float
+            :param rows: The number of rows returned.
+            :type rows: int
+            :param traced: (db, sql, query) of the statements executed by the call.
+            :type traced: list
+        """
+        with QueryStats._lock:
+            stats = QueryStats._stats.get(label)
+            if stats is None:
+                stats = QueryStats._stats[label] = {
+                    "count": 0, "total": 0.0, "max": 0.0, "rows": 0,
+                    "samples": deque(maxlen=QueryStats.SAMPLES),
+                }
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["rows"] += rows
+            stats["samples"].append(elapsed)
+
+        if 0 <= QueryStats.threshold_ms <= elapsed * 1000:
+            QueryStats._logSlow(label, elapsed, rows, args, kwargs or {}, traced)
+
+    @staticmethod
+    def _percentile(samples, fraction):
+        ordered = sorted(samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @staticmethod
+    def summary():
+        """
+            :return: One dict per method (method, count, total_ms, p50_ms, p95_ms, max_ms, rows),
+                     slowest total first. The percentiles cover the last SAMPLES calls.
+            :rtype: list
+        """
+        with QueryStats._lock:
+            items = [(label, dict(stats, samples=list(stats["samples"]))) for label, stats in QueryStats._stats.items()]
+
+        result = []
+        for label, stats in items:
+            result.append({
+                "method": label,
+                "count": stats["count"],
+                "total_ms": stats["total"] * 1000,
+                "p50_ms": QueryStats._percentile(stats["samples"], 0.50) * 1000,
+                "p95_ms": QueryStats._percentile(stats["samples"], 0.95) * 1000,
+                "max_ms": stats["max"] * 1000,
+                "rows": stats["rows"],
+            })
+        result.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return result
+
+    @staticmethod
+    def reset():
+        """
+            Clears the aggregates.
+        """
+        with QueryStats._lock:
+            QueryStats._stats.clear()
+
+    @staticmethod
+    def _getLogger():
+        if QueryStats._logger is None:
+            logger = logging.getLogger("slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            os.makedirs(os.path.dirname(QueryStats.LOG_PATH), exist_ok=True)
+            handler = RotatingFileHandler(QueryStats.LOG_PATH, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            QueryStats._logger = logger
+        return QueryStats._logger
+
+    @staticmethod
+    def _explain(db, sql, bound):
+        query = QtSql.QSqlQuery(db)
+        if not query.prepare(f"EXPLAIN QUERY PLAN {sql}"):
+            return [query.lastError().text()]
+        for position, value in enumerate(bound):
+            # Batch statements are bound with lists; the plan does not depend on the values
+            query.bindValue(position, None if isinstance(value, list) else value)
+        if not query.exec():
+            return [query.lastError().text()]
+        plan = []
+        while query.next():
+            plan.append(str(query.value(3)))
+        query.finish()
+        return plan
+
+    @staticmethod
+    def _logSlow(label, elapsed, rows, args, kwargs, traced):
+        try:
+            lines = [f"{label} {elapsed * 1000:.1f} ms, {rows} rows, args={args!r:.200} kwargs={kwargs!r:.200}"]
+            logged = set()
+            for db, sql, query in traced:
+                if (db.connectionName(), sql) in logged:
+                    continue
+                logged.add((db.connectionName(), sql))
+                lines.append(f"    SQL: {sql}")
+                bound = query.boundValues()
+                lines.append(f"    bound: {bound!r:.500}")
+                for step in QueryStats._explain(db, sql, bound):
+                    lines.append(f"    plan: {step}")
+            QueryStats._getLogger().info("\n".join(lines))
+        except Exception as error:
+            print("Error QueryStats._logSlow: ", error)
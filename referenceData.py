@@ -0,0 +1,215 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from statementCache import StatementCache
+
+
+class ReferenceData:
+    """
+        In-memory store of the reference tables (provinces and municipalities).
+
+        Every municipality name is kept in one tuple of interned strings sorted by
+        province, and ``_offsets[i]:_offsets[i + 1]`` is the range of the i-th province,
+        so getCities() is a tuple slice and the province/city combo boxes never hit the
+        database. The store is read from the binary snapshot at ``SNAPSHOT_PATH`` when it
+        matches the database, otherwise with a single join (the snapshot is written then
+        if there is none). The data never changes at runtime; the store is only dropped
+        when the database is reopened.
+
+        Snapshot layout (little endian): MAGIC, then the number of provinces, the number
+        of municipalities, the largest idmuni, the CRC32 of the payload and the payload:
+        the offsets (uint32, one more than provinces), the province names, a NUL byte and
+        the municipality names, the names as UTF-8 separated by "\\n".
+    """
+    SNAPSHOT_PATH = "./data/municipios.bin"
+    MAGIC = b"REFDATA1"
+    _HEADER = struct.Struct("<8sIIII")
+
+    _provinces = None
+    _index = {}
+    _names = ()
+    _offsets = array("I")
+
+    @staticmethod
+    def load():
+        """
+            Fills the store from the snapshot, or from the database if the snapshot is
+            missing or does not match it.
+
+            :return: True if the data was loaded, False otherwise.
+            :rtype: bool
+        """
+        try:
+            signature = ReferenceData._signature()
+            if signature is None:
+                return False
+            if ReferenceData.loadSnapshot(ReferenceData.SNAPSHOT_PATH, signature):
+                return True
+            if not ReferenceData._loadDatabase():
+                return False
+            if not os.path.exists(ReferenceData.SNAPSHOT_PATH):
+                ReferenceData.writeSnapshot(ReferenceData.SNAPSHOT_PATH)
+            return True
+        except Exception as error:
+            print("Error ReferenceData.load: ", error)
+            return False
+
+    @staticmethod
+    def _signature():
+        """
+            :return: (provinces, municipalities, largest idmuni) of the database, read
+                     from the primary keys only; None on error.
+            :rtype: tuple
+        """
+        query = StatementCache.prepare("SELECT (SELECT count(*) FROM provincias), (SELECT count(*) FROM municipios), "
+                                       "(SELECT coalesce(max(idmuni), 0) FROM municipios);")
+        if not query.exec() or not query.next():
+            print("Error ReferenceData._signature: ", query.lastError().text())
+            return None
+        signature = (int(query.value(0)), int(query.value(1)), int(query.value(2)))
+        query.finish()
+        return signature
+
+    @staticmethod
+    def _loadDatabase():
+        """
+            Reads every province and municipality in one query.
+
+            :return: True if the data was loaded, False otherwise.
+            :rtype: bool
+        """
+        query = StatementCache.prepare("SELECT p.provincia, m.municipio FROM provincias p "
+                                       "LEFT JOIN municipios m ON m.idprov = p.idprov "
+                                       "ORDER BY p.rowid, m.rowid;")
+        if not query.exec():
+            print("Error ReferenceData.load: ", query.lastError().text())
+            return False
+
+        provinces = []
+        names = []
+        offsets = array("I")
+        while query.next():
+            province = str(query.value(0))
+            if not provinces or provinces[-1] != province:
+                provinces.append(province)
+                offsets.append(len(names))
+            city = query.value(1)
+            if city is not None:
+                names.append(str(city))
+        query.finish()
+        offsets.append(len(names))
+
+        ReferenceData._store(provinces, names, offsets)
+        return True
+
+    @staticmethod
+    def _store(provinces, names, offsets):
+        ReferenceData._provinces = tuple(sys.intern(province) for province in provinces)
+        ReferenceData._index = {province: position for position, province in enumerate(ReferenceData._provinces)}
+        ReferenceData._names = tuple(sys.intern(name) for name in names)
+        ReferenceData._offsets = offsets
+
+    @staticmethod
+    def writeSnapshot(path):
+        """
+            Writes the loaded store to a binary snapshot.
+
+            :param path: The snapshot file, e.g. SNAPSHOT_PATH.
+            :type path: str
+            :return: True if the snapshot was written, False otherwise.
+            :rtype: bool
+        """
+        try:
+            signature = ReferenceData._signature()
+            if signature is None or (ReferenceData._provinces is None and not ReferenceData._loadDatabase()):
+                return False
+            offsets = ReferenceData._offsets
+            payload = struct.pack(f"<{len(offsets)}I", *offsets)
+            payload += "\n".join(ReferenceData._provinces).encode("utf-8") + b"\0"
+            payload += "\n".join(ReferenceData._names).encode("utf-8")
+            header = ReferenceData._HEADER.pack(ReferenceData.MAGIC, signature[0], signature[1], signature[2],
+                                                zlib.crc32(payload))
+            # Written next to the final file and renamed, so a reader never sees half a snapshot
+            temporary = f"{path}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(header + payload)
+            os.replace(temporary, path)
+            return True
+        except Exception as error:
+            print("Error ReferenceData.writeSnapshot: ", error)
+            return False
+
+    @staticmethod
+    def loadSnapshot(path, signature):
+        """
+            Fills the store from a binary snapshot written by writeSnapshot().
+
+            :param path: The snapshot file.
+            :type path: str
+            :param signature: The (provinces, municipalities, largest idmuni) the snapshot
+                              must have been written from.
+            :type signature: tuple
+            :return: True if the snapshot matched and was loaded, False otherwise.
+            :rtype: bool
+        """
+        try:
+            if not os.path.isfile(path):
+                return False
+            with open(path, "rb") as file:
+                data = file.read()
+            magic, provinces, cities, last_id, checksum = ReferenceData._HEADER.unpack_from(data)
+            payload = memoryview(data)[ReferenceData._HEADER.size:]
+            if magic != ReferenceData.MAGIC or (provinces, cities, last_id) != tuple(signature) \
+                    or zlib.crc32(payload) != checksum:
+                return False
+
+            offsets = array("I", struct.unpack_from(f"<{provinces + 1}I", payload))
+            province_names, _, city_names = bytes(payload[4 * (provinces + 1):]).partition(b"\0")
+            province_names = province_names.decode("utf-8").split("\n")
+            city_names = city_names.decode("utf-8").split("\n") if cities else []
+            if len(province_names) != provinces or len(city_names) != cities or offsets[-1] != cities:
+                return False
+
+            ReferenceData._store(province_names, city_names, offsets)
+            return True
+        except Exception as error:
+            print("Error ReferenceData.loadSnapshot: ", error)
+            return False
+
+    @staticmethod
+    def invalidate():
+        """
+            Drops the store; it is read again on the next access.
+        """
+        ReferenceData._provinces = None
+        ReferenceData._index = {}
+        ReferenceData._names = ()
+        ReferenceData._offsets = array("I")
+
+    @staticmethod
+    def getProvinces():
+        """
+            :return: All province names, in table order.
+            :rtype: tuple
+        """
+        if ReferenceData._provinces is None and not ReferenceData.load():
+            return ()
+        return ReferenceData._provinces
+
+    @staticmethod
+    def getCities(province):
+        """
+            :param province: The name of the province.
+            :type province: str
+            :return: The names of the municipalities of the province, empty if unknown.
+            :rtype: tuple
+        """
+        if ReferenceData._provinces is None and not ReferenceData.load():
+            return ()
+        position = ReferenceData._index.get(province)
+        if position is None:
+            return ()
+        return ReferenceData._names[ReferenceData._offsets[position]:ReferenceData._offsets[position + 1]]
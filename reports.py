@@ -5,7 +5,7 @@ from reportlab.pdfgen import canvas
 import os
 import globals
 
-from connection import Connection
+from repository import Repository
 
 
 class Reports:
@@ -26,6 +26,12 @@ class Reports:
     COLUMNS_TICKET = ["CODE", "NAME", "PRICE", "AMOUNT", "TOTAL"]
     COORDS_TICKET = [(55, 650), (160, 650), (280, 650), (380, 650), (480, 650)]
 
+    COLUMNS_INVOICES = ["Nº", "DNI_NIE", "DATE", "LINES", "SUBTOTAL", "IVA", "TOTAL"]
+    COORDS_INVOICES = [(45, 650), (95, 650), (180, 650), (260, 650), (320, 650), (400, 650), (470, 650)]
+
+    COLUMNS_REVENUE = ["FAMILY", "LINES", "UNITS", "REVENUE"]
+    COORDS_REVENUE = [(55, 650), (220, 650), (320, 650), (420, 650)]
+
     @staticmethod
     def ticket():
         """
@@ -51,9 +57,11 @@ class Reports:
 
             Reports.displayColumnDataHeaders(c, Reports.COLUMNS_TICKET, Reports.COORDS_TICKET)
 
-            last_y_position = Reports._displayTicketSalesData(c, title, Connection.getSale(id_factura))
+            last_y_position = Reports._displayTicketSalesData(c, title, Repository.getSale(id_factura))
 
-            Reports._displayTotalsData(c, last_y_position)
+            totals = Repository.getInvoiceTotals(id_factura)
+            if totals:
+                Reports._displayTotalsData(c, last_y_position, totals.subtotal, totals.vat, totals.total)
 
             Reports.footer(c, title)
 
@@ -76,7 +84,7 @@ class Reports:
             customer_data = None
         else:
             title = "FACTURA"
-            customer_data = Connection.getCustomerData(dni, "dni")
+            customer_data = Repository.getCustomerData(dni, "dni")
 
         return title, customer_data
 
@@ -86,11 +94,11 @@ class Reports:
         try:
             c.setFont("Helvetica-Bold", 10)
 
-            c.drawString(250, 790, f"DNI: {str(data[0])}")
-            c.drawString(250, 775, f"APELLIDOS: {str(data[2])}")
-            c.drawString(250, 760, f"NOMBRE: {str(data[3])}")
-            c.drawString(250, 745, f"DIRECCIÓN: {str(data[6])}")
-            c.drawString(250, 730, f"LOCALIDAD: {str(data[8])} PROVINCIA: {str(data[7])}")
+            c.drawString(250, 790, f"DNI: {str(data.dni_nie)}")
+            c.drawString(250, 775, f"APELLIDOS: {str(data.surname)}")
+            c.drawString(250, 760, f"NOMBRE: {str(data.name)}")
+            c.drawString(250, 745, f"DIRECCIÓN: {str(data.address)}")
+            c.drawString(250, 730, f"LOCALIDAD: {str(data.city)} PROVINCIA: {str(data.province)}")
         except Exception as e:
             print(f"Error en _displayTicketData: {e}")
 
@@ -105,7 +113,7 @@ class Reports:
             title = "Customers"
             pdf_path, _ = Reports._prepare_file_path("customers")
 
-            all_customers_data = Connection.getCustomers(False)
+            all_customers_data = Repository.iterCustomers(False)
 
             c = canvas.Canvas(pdf_path)
             Reports.topHeaderReport(c, title)
@@ -126,12 +134,12 @@ class Reports:
         filtered_products = all_products_data[:]
         if only_low_stock:
             search_on_all_products_data = filtered_products[:]
-            products_with_low_stock = [product for product in search_on_all_products_data if product[2] <= 5]
+            products_with_low_stock = [product for product in search_on_all_products_data if product.stock <= 5]
             filtered_products = products_with_low_stock
 
         if stock_family:
             search_on_all_products_data = filtered_products[:]
-            all_family_products = [product for product in search_on_all_products_data if str(product[3]).lower().strip()  == str(stock_family).lower().strip()]
+            all_family_products = [product for product in search_on_all_products_data if str(product.family).lower().strip()  == str(stock_family).lower().strip()]
             filtered_products = all_family_products
 
         return filtered_products
@@ -146,7 +154,7 @@ class Reports:
             title = "Products List"
             pdf_path, _ = Reports._prepare_file_path("products")
 
-            all_products_data = Reports.filterProducts(Connection.getProducts(), only_low_stock, stock_family)
+            all_products_data = Reports.filterProducts(Repository.getProducts(), only_low_stock, stock_family)
 
             c = canvas.Canvas(pdf_path)
             Reports.topHeaderReport(c, title)
@@ -160,6 +168,92 @@ class Reports:
         except Exception as e:
             print(f"Error en reportProducts: {e}")
 
+    @staticmethod
+    def reportInvoices():
+        """
+            Generates a PDF containing every invoice with its totals and the grand totals.
+
+            The totals are read from the materialized invoice totals, the sale lines are not summed.
+        """
+        print("Report Invoices")
+        try:
+            title = "Invoices"
+            pdf_path, _ = Reports._prepare_file_path("invoices")
+
+            c = canvas.Canvas(pdf_path)
+            Reports.topHeaderReport(c, title)
+            Reports.displayColumnDataHeaders(c, Reports.COLUMNS_INVOICES, Reports.COORDS_INVOICES)
+            Reports.footer(c, title)
+
+            last_y_position, subtotal, iva, total = Reports._displayInvoicesData(c, title, Repository.iterInvoices())
+            Reports._displayTotalsData(c, last_y_position, subtotal, iva, total)
+
+            c.save()
+            Reports._open_pdf(pdf_path)
+
+        except Exception as e:
+            print(f"Error en reportInvoices: {e}")
+
+    @staticmethod
+    def quarter(today=None, offset=-1):
+        """
+            First and last day of a calendar quarter relative to the one of ``today``.
+
+            :param today: The reference day, today if None.
+            :type today: datetime.date
+            :param offset: 0 for the current quarter, -1 for the previous one...
+            :type offset: int
+            :return: A tuple (first day, last day).
+            :rtype: tuple
+        """
+        today = today or datetime.date.today()
+        index = today.year * 4 + (today.month - 1) // 3 + offset
+        year, first_month = index // 4, index % 4 * 3 + 1
+        start = datetime.date(year, first_month, 1)
+        next_start = datetime.date(year + 1, 1, 1) if first_month == 10 else datetime.date(year, first_month + 3, 1)
+        return start, next_start - datetime.timedelta(days=1)
+
+    @staticmethod
+    def reportRevenueByFamily(start=None, end=None):
+        """
+            Generates a PDF with the revenue (without IVA) of every product family between
+            two days, the last quarter by default. The figures come from the daily sales aggregates.
+        """
+        print("Report Revenue by Family")
+        try:
+            if start is None or end is None:
+                start, end = Reports.quarter()
+            title = f"Revenue by family {start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}"
+            pdf_path, _ = Reports._prepare_file_path("revenue_family")
+
+            c = canvas.Canvas(pdf_path)
+            Reports.topHeaderReport(c, title)
+            Reports.displayColumnDataHeaders(c, Reports.COLUMNS_REVENUE, Reports.COORDS_REVENUE)
+            Reports.footer(c, title)
+
+            y = 630
+            revenue = 0.0
+            for row in Repository.getRevenueByFamily(start, end):
+                if y <= 90:
+                    y = 630
+                    Reports._createNextPage(c, title, Reports.COLUMNS_REVENUE, Reports.COORDS_REVENUE)
+
+                c.setFont("Helvetica", 8)
+                c.drawString(Reports.COORDS_REVENUE[0][0], y, Reports.displayMaxDataLengthFromData(str(row.label), length=25))
+                c.drawString(Reports.COORDS_REVENUE[1][0], y, str(row.lines))
+                c.drawString(Reports.COORDS_REVENUE[2][0], y, str(row.units))
+                c.drawString(Reports.COORDS_REVENUE[3][0], y, "{:.2f}".format(row.revenue))
+                revenue += row.revenue
+                y -= 25
+
+            Reports._displayTotalsData(c, y, revenue, revenue * 0.21, revenue * 1.21)
+
+            c.save()
+            Reports._open_pdf(pdf_path)
+
+        except Exception as e:
+            print(f"Error en reportRevenueByFamily: {e}")
+
     # ==========================================
     # HELPERS DE IO (Archivos y Rutas)
     # ==========================================
@@ -297,14 +391,14 @@ class Reports:
             c.setFont("Helvetica", 8)
 
 
-            dni = "****" + str(customer[0][4:7] + "****")
+            dni = "****" + str(customer.dni_nie[4:7] + "****")
             c.drawString(x - 7, y, dni)
-            c.drawString(x + 50, y, Reports.displayMaxDataLengthFromData(str(customer[2])))
-            c.drawString(x + 130, y, Reports.displayMaxDataLengthFromData(str(customer[3])))
-            c.drawString(x + 190, y, Reports.displayMaxDataLengthFromData(str(customer[5])))
-            c.drawString(x + 270, y, Reports.displayMaxDataLengthFromData(str(customer[8])))
-            c.drawString(x + 350, y, Reports.displayMaxDataLengthFromData(str(customer[9])))
-            c.drawString(x + 430, y, Reports._displayHumanReadHistorical(customer[10]))
+            c.drawString(x + 50, y, Reports.displayMaxDataLengthFromData(str(customer.surname)))
+            c.drawString(x + 130, y, Reports.displayMaxDataLengthFromData(str(customer.name)))
+            c.drawString(x + 190, y, Reports.displayMaxDataLengthFromData(str(customer.mobile)))
+            c.drawString(x + 270, y, Reports.displayMaxDataLengthFromData(str(customer.city)))
+            c.drawString(x + 350, y, Reports.displayMaxDataLengthFromData(str(customer.invoicetype)))
+            c.drawString(x + 430, y, Reports._displayHumanReadHistorical(customer.historical))
 
             y -= 25
 
@@ -318,17 +412,17 @@ class Reports:
                 Reports._createNextPage(c, "Products List", Reports.COLUMNS_PRODUCTS, Reports.COORDS_PRODUCTS)
 
             c.setFont("Helvetica", 8)
-            c.drawString(45, y, str(product[0]))
-            c.drawString(95, y, Reports.displayMaxDataLengthFromData(str(product[1]), length=25))
-            c.drawString(245, y, str(product[2]))
-            c.drawString(300, y, Reports.displayMaxDataLengthFromData(str(product[3])))
+            c.drawString(45, y, str(product.code))
+            c.drawString(95, y, Reports.displayMaxDataLengthFromData(str(product.name), length=25))
+            c.drawString(245, y, str(product.stock))
+            c.drawString(300, y, Reports.displayMaxDataLengthFromData(str(product.family)))
 
             try:
-                price = "{:.2f}".format(product[4])
+                price = "{:.2f}".format(product.unit_price)
             except:
-                price = str(product[4])
+                price = str(product.unit_price)
             c.drawString(400, y, price)
-            c.drawString(480, y, str(product[5]))
+            c.drawString(480, y, str(product.currency))
 
             y -= 25
 
@@ -342,21 +436,21 @@ class Reports:
                 Reports._createNextPage(c, title, Reports.COLUMNS_TICKET, Reports.COORDS_TICKET)
 
             c.setFont("Helvetica", 8)
-            c.drawString(Reports.COORDS_TICKET[0][0], y, str(product[2]))
-            c.drawString(Reports.COORDS_TICKET[1][0], y, Reports.displayMaxDataLengthFromData(str(product[4]), length=25))
+            c.drawString(Reports.COORDS_TICKET[0][0], y, str(product.idProducto))
+            c.drawString(Reports.COORDS_TICKET[1][0], y, Reports.displayMaxDataLengthFromData(str(product.product), length=25))
 
             try:
-                unit_price = "{:.2f}".format(product[5])
+                unit_price = "{:.2f}".format(product.unitprice)
             except:
-                unit_price = str(product[4])
+                unit_price = str(product.unitprice)
 
             c.drawString(Reports.COORDS_TICKET[2][0], y, unit_price)
-            c.drawString(Reports.COORDS_TICKET[3][0], y, str(product[3]))
+            c.drawString(Reports.COORDS_TICKET[3][0], y, str(product.amount))
 
             try:
-                total_price = "{:.2f}".format(product[6])
+                total_price = "{:.2f}".format(product.total)
             except:
-                total_price = str(product[4])
+                total_price = str(product.total)
 
             c.drawString(Reports.COORDS_TICKET[4][0], y, total_price)
 
@@ -365,7 +459,36 @@ class Reports:
         return y
 
     @staticmethod
-    def _displayTotalsData(c, y):
+    def _displayInvoicesData(c, title, all_invoices_data):
+        """
+            :return: A tuple (last y position, sum of subtotals, sum of IVA, sum of totals).
+            :rtype: tuple
+        """
+        y = 630
+        subtotal = iva = total = 0.0
+        for invoice in all_invoices_data:
+            if y <= 90:
+                y = 630
+                Reports._createNextPage(c, title, Reports.COLUMNS_INVOICES, Reports.COORDS_INVOICES)
+
+            c.setFont("Helvetica", 8)
+            c.drawString(Reports.COORDS_INVOICES[0][0], y, str(invoice.idFac))
+            c.drawString(Reports.COORDS_INVOICES[1][0], y, str(invoice.dni_nie))
+            c.drawString(Reports.COORDS_INVOICES[2][0], y, str(invoice.date))
+            c.drawString(Reports.COORDS_INVOICES[3][0], y, str(invoice.lines))
+            c.drawString(Reports.COORDS_INVOICES[4][0], y, "{:.2f}".format(invoice.subtotal))
+            c.drawString(Reports.COORDS_INVOICES[5][0], y, "{:.2f}".format(invoice.vat))
+            c.drawString(Reports.COORDS_INVOICES[6][0], y, "{:.2f}".format(invoice.total))
+
+            subtotal += invoice.subtotal
+            iva += invoice.vat
+            total += invoice.total
+            y -= 25
+
+        return y, subtotal, iva, total
+
+    @staticmethod
+    def _displayTotalsData(c, y, subtotal, iva, total):
         try:
             if y < 150:
                 c.showPage()
@@ -380,22 +503,18 @@ class Reports:
 
             c.setFont("Helvetica-Bold", 8)
 
-            subtotal = globals.ui.lbl_subtotal_invoice.text()
-            iva = globals.ui.lbl_iva_invoice.text()
-            total = globals.ui.lbl_total_invoice.text()
-
             c.drawString(x_label, y, "Subtotal:")
-            c.drawRightString(x_value, y, f"{subtotal} €")
+            c.drawRightString(x_value, y, f"{subtotal:.2f} €")
 
             y -= 15
             c.drawString(x_label, y, "IVA (21%):")
-            c.drawRightString(x_value, y, f"{iva} €")
+            c.drawRightString(x_value, y, f"{iva:.2f} €")
 
             y -= 20
 
             c.line(350, y +15, 525, y +15)
             c.setFont("Helvetica-Bold", 12)
             c.drawString(x_label, y, "Total:")
-            c.drawRightString(x_value, y, f"{total} €")
+            c.drawRightString(x_value, y, f"{total:.2f} €")
         except Exception as e:
             print(f"Error en _displayTotalsData: {e}")
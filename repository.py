@@ -0,0 +1,98 @@
+from connection import Connection
+
+
+class _RepositoryType(type):
+    def __getattr__(cls, name):
+        if name in cls.METHODS:
+            return getattr(cls.backend, name)
+        raise AttributeError(name)
+
+
+class Repository(metaclass=_RepositoryType):
+    """
+        Common data access interface of the application.
+
+        The UI layer calls ``Repository.<method>`` and the call is forwarded to the selected
+        backend: Connection (local SQLite file) or ConnectionServer (pooled MySQL/MariaDB).
+        Both backends implement every name in ``METHODS`` with the same arguments and
+        return values. The backend is chosen with the ``db_backend`` setting, which is
+        always read from the local SQLite database.
+    """
+    SETTING_KEY = "db_backend"
+    DEFAULT = "sqlite"
+
+    METHODS = (
+        "getProvinces", "getCities",
+        "getCustomers", "getCustomersPage", "iterCustomers", "getCustomerData",
+        "deleteCustomer", "addCustomer", "setCustomerData",
+        "getProducts", "addProduct", "getProductData", "deleteProduct", "setProductData",
+        "updateStockProductData", "reserveStock", "getStockShortages", "getProductFamilies",
+        "search",
+        "addInvoice", "getAllInvoices", "getInvoicesPage", "iterInvoices", "getInvoiceTotals",
+        "addSale", "saveSales", "getSale", "deleteInvoice", "deleteSale", "deleteInvoiceAndSale",
+        "getRevenueByFamily", "getRevenueByDay", "getTopProducts", "getTopCustomers",
+    )
+
+    backend = Connection
+    name = DEFAULT
+
+    @staticmethod
+    def backends():
+        """
+            :return: The available backends by setting value.
+            :rtype: dict
+        """
+        from connectionServer import ConnectionServer
+        return {"sqlite": Connection, "mysql": ConnectionServer}
+
+    @staticmethod
+    def isLocal():
+        """
+            :return: True if the selected backend is the local SQLite database, whose
+                     readers need a connection of their own on the QueryExecutor threads.
+            :rtype: bool
+        """
+        return Repository.backend is Connection
+
+    @staticmethod
+    def missingMethods(backend):
+        """
+            :param backend: A backend class.
+            :return: The names of ``METHODS`` the backend does not implement.
+            :rtype: list
+        """
+        return [method for method in Repository.METHODS if not callable(getattr(backend, method, None))]
+
+    @staticmethod
+    def select(name=None):
+        """
+            Selects the backend used by the application.
+
+            The server backend is only selected if its pool can be created; otherwise the
+            local SQLite backend stays in use.
+
+            :param name: "sqlite" or "mysql", the ``db_backend`` setting if None.
+            :type name: str
+            :return: True if the requested backend is in use, False otherwise.
+            :rtype: bool
+        """
+        if name is None:
+            name = str(Connection.getSetting(Repository.SETTING_KEY, Repository.DEFAULT)).strip().lower()
+
+        backend = Repository.backends().get(name)
+        if backend is None:
+            print(f"Error Repository.select: unknown backend {name}")
+            Repository.backend, Repository.name = Connection, Repository.DEFAULT
+            return False
+
+        missing = Repository.missingMethods(backend)
+        if missing:
+            print(f"Error Repository.select: {name} does not implement {', '.join(missing)}")
+            return False
+
+        if backend is not Connection and not backend.configure():
+            Repository.backend, Repository.name = Connection, Repository.DEFAULT
+            return False
+
+        Repository.backend, Repository.name = backend, name
+        return True
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+# Typed, slotted rows returned by the Connection readers. Being tuples they keep
+# supporting positional access (row[2]) and iteration (csv.writer.writerows) while
+# avoiding a per-row __dict__. The field order matches the SELECT column order.
+
+CustomerRow = namedtuple("CustomerRow", ["dni_nie", "adddata", "surname", "name", "mail", "mobile",
+                                         "address", "province", "city", "invoicetype", "historical"])
+CustomerRow.__doc__ = "A row of the customers table."
+
+ProductRow = namedtuple("ProductRow", ["code", "name", "stock", "family", "unit_price", "currency"])
+ProductRow.__doc__ = "A row of the products table."
+
+InvoiceRow = namedtuple("InvoiceRow", ["idFac", "dni_nie", "date"])
+InvoiceRow.__doc__ = "A row of the invoices table."
+
+InvoiceSummaryRow = namedtuple("InvoiceSummaryRow", ["idFac", "dni_nie", "date", "lines", "subtotal", "vat", "total"])
+InvoiceSummaryRow.__doc__ = "An invoice with its number of sale lines, subtotal, VAT (21%) and total."
+
+SaleRow = namedtuple("SaleRow", ["id", "idFactura", "idProducto", "amount", "product", "unitprice", "total"])
+SaleRow.__doc__ = "A row of the sales table (a line item of an invoice)."
+
+StockMovementRow = namedtuple("StockMovementRow", ["id", "code", "delta", "stock", "reason", "ref", "created"])
+StockMovementRow.__doc__ = "A row of the stock_movements ledger: delta is the stock change, stock the stock after it."
+
+RevenueRow = namedtuple("RevenueRow", ["key", "label", "lines", "units", "revenue"])
+RevenueRow.__doc__ = ("A sales aggregate: key is the family, ISO day, product code or DNI/NIE it is grouped by; "
+                      "revenue is the sum of the line totals without VAT.")
+
+SearchResult = namedtuple("SearchResult", ["kind", "key", "label", "rank"])
+SearchResult.__doc__ = ("A full-text search hit: kind is 'customer' (key = dni_nie) or 'product' (key = code); "
+                        "a lower rank is a better match.")
+
+
+def columnList(row_type, alias=None):
+    """
+        Builds the SELECT column list for a row type.
+
+        :param row_type: One of the row namedtuples.
+        :param alias: Optional table alias to prefix every column with.
+        :type alias: str
+        :return: The comma separated column names.
+        :rtype: str
+    """
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + field for field in row_type._fields)
+
+
+def fetchRows(query, row_type):
+    """
+        Decodes every remaining row of an executed query into ``row_type`` instances.
+
+        The column count is taken once from the row type instead of rebuilding a
+        QSqlRecord per row.
+
+        :param query: An executed QSqlQuery whose columns match ``row_type``.
+        :type query: QSqlQuery
+        :param row_type: One of the row namedtuples.
+        :return: The decoded rows.
+        :rtype: list
+    """
+    columns = range(len(row_type._fields))
+    value = query.value
+    make = row_type._make
+    rows = []
+    append = rows.append
+    while query.next():
+        append(make(map(value, columns)))
+    return rows
@@ -0,0 +1,172 @@
+from PyQt6 import QtSql
+
+
+class SqliteProfile:
+    """
+        Connection profiles (sets of PRAGMAs) applied every time the SQLite database is opened.
+
+        The selected preset is stored in the settings table under ``SETTING_KEY``. Single
+        pragmas can be overridden with a ``pragma.<name>`` setting, e.g. ("pragma.cache_size", "-32768").
+    """
+    SETTING_KEY = "db_profile"
+    OVERRIDE_PREFIX = "pragma."
+    DEFAULT = "fast"
+
+    # journal_mode must go first: it cannot be changed inside a transaction and
+    # synchronous=NORMAL is only crash-safe under WAL.
+    PRESETS = {
+        "fast": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 268435456,
+            "cache_size": -65536,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+        "durable": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "mmap_size": 0,
+            "cache_size": -16384,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+    }
+
+    # Numeric values returned by SQLite when reading some pragmas back
+    _NAMES = {
+        "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+        "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+    }
+
+    # Accepted values: the names of an enumerated pragma, or the type of a numeric one
+    # and whether it may be negative. Anything else read from settings is rejected.
+    _VALUES = {
+        "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+        "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+        "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+        "mmap_size": (int, False),
+        "cache_size": (int, True),
+        "busy_timeout": (int, False),
+    }
+
+    applied = {}
+
+    @staticmethod
+    def getSettings(db):
+        """
+            Reads the selected preset name and the pragma overrides from the settings table.
+
+            :param db: The database connection.
+            :type db: QSqlDatabase
+            :return: A tuple (preset name, {pragma: value}).
+            :rtype: tuple
+        """
+        profile_name = SqliteProfile.DEFAULT
+        overrides = {}
+        query = QtSql.QSqlQuery(db)
+        if query.exec("SELECT id, value FROM settings;"):
+            while query.next():
+                key, value = str(query.value(0)), str(query.value(1))
+                if key == SqliteProfile.SETTING_KEY and value in SqliteProfile.PRESETS:
+                    profile_name = value
+                elif key.startswith(SqliteProfile.OVERRIDE_PREFIX):
+                    overrides[key[len(SqliteProfile.OVERRIDE_PREFIX):]] = value
+        query.finish()
+        return profile_name, overrides
+
+    @staticmethod
+    def validate(pragma, value):
+        """
+            Checks a pragma value before it is written into a PRAGMA statement.
+
+            :param pragma: The pragma name.
+            :type pragma: str
+            :param value: The requested value, e.g. read from the settings table.
+            :return: The value to use (an int or an upper-case name), None if it is not
+                     valid for that pragma.
+        """
+        accepted = SqliteProfile._VALUES.get(pragma)
+        if accepted is None:
+            return None
+        text = str(value).strip()
+        if accepted[0] is int:
+            try:
+                number = int(text)
+            except ValueError:
+                return None
+            return number if number >= 0 or accepted[1] else None
+        if text.isdigit():
+            text = SqliteProfile._NAMES.get(pragma, {}).get(int(text), "")
+        return text.upper() if text.upper() in accepted else None
+
+    @staticmethod
+    def _normalize(pragma, value):
+        """Returns a comparable, upper-case representation of a pragma value."""
+        names = SqliteProfile._NAMES.get(pragma, {})
+        try:
+            return names.get(int(value), str(int(value)))
+        except (TypeError, ValueError):
+            return str(value).upper()
+
+    @staticmethod
+    def apply(db, profile_name=None, record=True):
+        """
+            Applies a profile to an open connection and reads every pragma back.
+
+            :param db: The open database connection.
+            :type db: QSqlDatabase
+            :param profile_name: The preset to apply, the one stored in settings if None.
+            :type profile_name: str
+            :param record: If True the report is kept in ``applied``; secondary connections
+                           (e.g. QueryExecutor threads) pass False.
+            :type record: bool
+            :return: {pragma: {"requested": value, "effective": value, "ok": bool}}
+            :rtype: dict
+        """
+        stored_name, overrides = SqliteProfile.getSettings(db)
+        if profile_name not in SqliteProfile.PRESETS:
+            profile_name = stored_name
+
+        pragmas = dict(SqliteProfile.PRESETS[profile_name])
+        for pragma, value in overrides.items():
+            if pragma in pragmas:
+                checked = SqliteProfile.validate(pragma, value)
+                if checked is None:
+                    print(f"Error SqliteProfile.apply: invalid value {value!r} for {pragma}, the preset value is kept")
+                else:
+                    pragmas[pragma] = checked
+
+        report = {}
+        query = QtSql.QSqlQuery(db)
+        for pragma, value in pragmas.items():
+            if not query.exec(f"PRAGMA {pragma} = {value};"):
+                print(f"Error SqliteProfile.apply {pragma}: ", query.lastError().text())
+            query.finish()
+
+            effective = None
+            if query.exec(f"PRAGMA {pragma};") and query.next():
+                effective = query.value(0)
+            query.finish()
+
+            ok = SqliteProfile._normalize(pragma, effective) == SqliteProfile._normalize(pragma, value)
+            report[pragma] = {"requested": value, "effective": effective, "ok": ok}
+            if not ok:
+                print(f"SqliteProfile: {pragma} requested {value}, effective {effective}")
+
+        if record:
+            SqliteProfile.applied = {"profile": profile_name, "pragmas": report}
+        return report
+
+    @staticmethod
+    def summary():
+        """
+            :return: A one-line description of the pragmas in effect on the main connection.
+            :rtype: str
+        """
+        if not SqliteProfile.applied:
+            return ""
+        values = ", ".join(f"{pragma}={SqliteProfile._normalize(pragma, data['effective'])}"
+                           + ("" if data["ok"] else " (!)")
+                           for pragma, data in SqliteProfile.applied["pragmas"].items())
+        return f"{SqliteProfile.applied['profile']}: {values}"
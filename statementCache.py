@@ -0,0 +1,132 @@
+import threading
+
+from PyQt6 import QtSql
+
+
+class StatementCache:
+    """
+        Keeps prepared QSqlQuery objects alive per database connection, keyed by SQL text.
+
+        Callers get back an already prepared query, rebind their values and execute it,
+        so SQLite only compiles every statement once per connection. The cache must be
+        invalidated before a connection is closed or replaced (see Connection.db_connection).
+
+        While a trace is active (see QueryStats) every prepared statement handed out on
+        the current thread is also recorded in it.
+    """
+    _statements = {}
+    _lock = threading.Lock()
+    _traces = threading.local()
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def prepare(sql, db=None):
+        """
+            Returns a prepared, forward-only query for the given SQL text.
+
+            :param sql: The SQL statement.
+            :type sql: str
+            :param db: The database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: The prepared query, ready to bind values and execute.
+            :rtype: QSqlQuery
+        """
+        if db is None:
+            db = QtSql.QSqlDatabase.database()
+        key = (db.connectionName(), sql)
+
+        with StatementCache._lock:
+            query = StatementCache._statements.get(key)
+            if query is not None:
+                StatementCache.hits += 1
+            else:
+                StatementCache.misses += 1
+
+        if query is not None:
+            query.finish()
+        else:
+            query = QtSql.QSqlQuery(db)
+            query.setForwardOnly(True)
+            if not query.prepare(sql):
+                print("Error StatementCache.prepare: ", query.lastError().text())
+                return query
+            with StatementCache._lock:
+                StatementCache._statements[key] = query
+
+        stack = getattr(StatementCache._traces, "stack", None)
+        if stack:
+            stack[-1].append((db, sql, query))
+        return query
+
+    @staticmethod
+    def startTrace():
+        """
+            Starts recording the statements prepared on the current thread.
+
+            :return: The trace, to be passed to stopTrace().
+            :rtype: list
+        """
+        stack = getattr(StatementCache._traces, "stack", None)
+        if stack is None:
+            stack = StatementCache._traces.stack = []
+        trace = []
+        stack.append(trace)
+        return trace
+
+    @staticmethod
+    def stopTrace(trace):
+        """
+            Stops a trace; its statements are also added to the enclosing trace, if any.
+
+            :param trace: The trace returned by startTrace().
+            :type trace: list
+            :return: (db, sql, query) for every statement prepared during the trace.
+            :rtype: list
+        """
+        stack = StatementCache._traces.stack
+        if stack and stack[-1] is trace:
+            stack.pop()
+            if stack:
+                stack[-1].extend(trace)
+        return trace
+
+    @staticmethod
+    def invalidate(connection_name=None):
+        """
+            Drops the cached statements of a connection, or of every connection.
+
+            :param connection_name: The connection name, None to drop everything.
+            :type connection_name: str
+        """
+        with StatementCache._lock:
+            for key in list(StatementCache._statements):
+                if connection_name is None or key[0] == connection_name:
+                    StatementCache._statements.pop(key).finish()
+
+    @staticmethod
+    def stats():
+        """
+            :return: The hit/miss counters, the hit rate and the number of cached statements.
+            :rtype: dict
+        """
+        with StatementCache._lock:
+            total = StatementCache.hits + StatementCache.misses
+            return {
+                "hits": StatementCache.hits,
+                "misses": StatementCache.misses,
+                "hit_rate": StatementCache.hits / total if total else 0.0,
+                "size": len(StatementCache._statements),
+            }
+
+    @staticmethod
+    def statements(connection_name=None):
+        """
+            :param connection_name: The connection name, None for every connection.
+            :type connection_name: str
+            :return: The SQL text of every cached statement.
+            :rtype: list
+        """
+        with StatementCache._lock:
+            return [sql for name, sql in StatementCache._statements
+                    if connection_name is None or name == connection_name]
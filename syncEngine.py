@@ -0,0 +1,238 @@
+import json
+import uuid
+
+from PyQt6 import QtSql
+
+from connection import Connection
+from connectionServer import ConnectionServer
+from rows import CustomerRow, ProductRow, InvoiceRow, SaleRow, StockMovementRow, columnList, fetchRows
+from statementCache import StatementCache
+
+
+class SyncEngine:
+    """
+        Ships local SQLite changes to the server database incrementally.
+
+        Triggers log every insert, update and delete of the synced tables in the
+        ``changes`` table with a growing sequence number (migration 4). A sync reads the
+        changes after the last acknowledged sequence in batches, keeps only the last
+        operation of every row, and sends the current rows as upserts plus the deleted
+        keys, all in one server transaction per batch. Replaying a batch gives the same
+        result, so a batch that fails before it is acknowledged is simply sent again.
+        Acknowledged changes are removed from the log.
+
+        Several tills sync into the same server, so every batch is sent with the till
+        identifier (``till_id`` setting, generated on the first sync) and the server
+        keeps the local keys per till (ConnectionServer.applyChanges). Stock is shipped
+        as the movements of the stock ledger (migration 8), never as the local stock.
+
+        Every method takes the local connection as an optional ``db`` argument, so
+        serverSync() can run on a QueryExecutor thread with that thread's connection.
+    """
+    SETTING_KEY = "sync_seq"
+    TILL_KEY = "till_id"
+    DEFAULT_BATCH_SIZE = 500
+
+    # Applied in this order: products before the sales and movements that refer to them
+    TABLES = {
+        "customers": (CustomerRow, "dni_nie"),
+        "products": (ProductRow, "code"),
+        "invoices": (InvoiceRow, "idFac"),
+        "sales": (SaleRow, "id"),
+        "stock_movements": (StockMovementRow, "id"),
+    }
+
+    @staticmethod
+    def tillId(db=None):
+        """
+            :return: The identifier of this till on the server, generated and stored the
+                     first time.
+            :rtype: str
+        """
+        till_id = Connection.getSetting(SyncEngine.TILL_KEY, db=db)
+        if till_id:
+            return str(till_id)
+        till_id = uuid.uuid4().hex[:12]
+        if not Connection.saveSettings([(SyncEngine.TILL_KEY, till_id)], db):
+            raise RuntimeError("could not store the till identifier")
+        return till_id
+
+    @staticmethod
+    def lastAcknowledged(db=None):
+        """
+            :return: The sequence number of the last change acknowledged by the server.
+            :rtype: int
+        """
+        try:
+            return int(Connection.getSetting(SyncEngine.SETTING_KEY, 0, db))
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def pending(db=None):
+        """
+            :return: The number of logged changes not yet acknowledged.
+            :rtype: int
+        """
+        query = StatementCache.prepare("SELECT count(*) FROM changes WHERE seq > :after;", db)
+        query.bindValue(":after", SyncEngine.lastAcknowledged(db))
+        if query.exec() and query.next():
+            count = int(query.value(0))
+            query.finish()
+            return count
+        return 0
+
+    @staticmethod
+    def _readChanges(after, limit, db=None):
+        """
+            :return: Up to ``limit`` changes (seq, tbl, pk, op) after ``after``, in order.
+            :rtype: list
+        """
+        query = StatementCache.prepare("SELECT seq, tbl, pk, op FROM changes WHERE seq > :after ORDER BY seq LIMIT :limit;", db)
+        query.bindValue(":after", int(after))
+        query.bindValue(":limit", int(limit))
+        changes = []
+        if not query.exec():
+            raise RuntimeError(query.lastError().text())
+        while query.next():
+            changes.append((int(query.value(0)), query.value(1), query.value(2), query.value(3)))
+        return changes
+
+    @staticmethod
+    def _readRows(table, keys, db=None):
+        """
+            Reads the current local rows of a table for a set of keys.
+
+            :return: The rows found; missing keys were deleted after being logged.
+            :rtype: list
+        """
+        row_type, key = SyncEngine.TABLES[table]
+        # CROSS JOIN keeps json_each as the outer loop, so every key is one primary key lookup at any table size
+        query = StatementCache.prepare(f"SELECT {columnList(row_type, 't')} FROM json_each(:keys) AS j "
+                                       f"CROSS JOIN {table} AS t ON t.{key} = j.value;", db)
+        query.bindValue(":keys", json.dumps(list(keys)))
+        if not query.exec():
+            raise RuntimeError(query.lastError().text())
+        return fetchRows(query, row_type)
+
+    @staticmethod
+    def _acknowledge(seq, db=None):
+        """
+            Stores ``seq`` as the last acknowledged sequence and removes the changes up to
+            it from the log, both in one local transaction.
+
+            :raise RuntimeError: If either write fails; nothing is changed then.
+        """
+        if db is None:
+            db = QtSql.QSqlDatabase.database()
+        if not Connection._beginImmediate(db):
+            raise RuntimeError("could not start the acknowledge transaction")
+        try:
+            if not Connection.saveSettings([(SyncEngine.SETTING_KEY, seq)], db):
+                raise RuntimeError("could not store the acknowledged sequence")
+            query = StatementCache.prepare("DELETE FROM changes WHERE seq <= :seq;", db)
+            query.bindValue(":seq", int(seq))
+            if not query.exec():
+                raise RuntimeError(f"could not remove the acknowledged changes: {query.lastError().text()}")
+            if not db.commit():
+                raise RuntimeError(db.lastError().text())
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def syncBatch(batch_size=DEFAULT_BATCH_SIZE, db=None):
+        """
+            Ships one batch of changes to the server.
+
+            :param batch_size: The maximum number of logged changes read.
+            :type batch_size: int
+            :param db: The local database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: A tuple (changes read, rows upserted, rows deleted).
+            :rtype: tuple
+        """
+        changes = SyncEngine._readChanges(SyncEngine.lastAcknowledged(db), batch_size, db)
+        if not changes:
+            return 0, 0, 0
+
+        # Only the last operation of every row matters
+        last_op = {}
+        for seq, table, pk, op in changes:
+            if table in SyncEngine.TABLES:
+                last_op[(table, pk)] = op
+
+        upserts = []
+        deletes = []
+        upserted = deleted = 0
+        for table, (row_type, key) in SyncEngine.TABLES.items():
+            written = [pk for (name, pk), op in last_op.items() if name == table and op != "D"]
+            removed = [pk for (name, pk), op in last_op.items() if name == table and op == "D"]
+
+            rows = SyncEngine._readRows(table, written, db) if written else []
+            found = {getattr(row, key) for row in rows}
+            removed.extend(pk for pk in written if pk not in found)
+            if table == "products":
+                # The products of the movements are sent as well, so the server has them mapped
+                moved = [pk for (name, pk), op in last_op.items() if name == "stock_movements" and op != "D"]
+                codes = {movement.code for movement in SyncEngine._readRows("stock_movements", moved, db)} if moved else set()
+                codes -= found | set(removed)
+                if codes:
+                    rows += SyncEngine._readRows(table, codes, db)
+
+            if rows:
+                upserts.append((table, row_type, rows))
+                upserted += len(rows)
+            if removed:
+                deletes.append((table, key, removed))
+                deleted += len(removed)
+
+        ConnectionServer.applyChanges(SyncEngine.tillId(db), upserts, deletes)
+        SyncEngine._acknowledge(changes[-1][0], db)
+        return len(changes), upserted, deleted
+
+    @staticmethod
+    def run(batch_size=DEFAULT_BATCH_SIZE, db=None):
+        """
+            Ships every pending change, batch by batch.
+
+            A failing batch stops the sync; the batches already shipped stay acknowledged
+            and the next run resumes from the failed one.
+
+            :param batch_size: The maximum number of logged changes per batch.
+            :type batch_size: int
+            :param db: The local database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: {"changes": n, "upserted": n, "deleted": n, "error": str or None}
+            :rtype: dict
+        """
+        report = {"changes": 0, "upserted": 0, "deleted": 0, "error": None}
+        try:
+            while True:
+                read, upserted, deleted = SyncEngine.syncBatch(batch_size, db)
+                if not read:
+                    return report
+                report["changes"] += read
+                report["upserted"] += upserted
+                report["deleted"] += deleted
+        except Exception as error:
+            print("Error SyncEngine.run: ", error)
+            report["error"] = str(error)
+            return report
+
+    @staticmethod
+    def serverSync(batch_size=DEFAULT_BATCH_SIZE, db=None):
+        """
+            Connects to the server and ships every pending change; the reader submitted
+            to the QueryExecutor by Events.syncServer.
+
+            :param batch_size: The maximum number of logged changes per batch.
+            :type batch_size: int
+            :param db: The local database connection, the default one if None.
+            :type db: QSqlDatabase
+            :return: The report of run(); its error says so if the server is unreachable.
+            :rtype: dict
+        """
+        if not ConnectionServer.configure(db=db):
+            return {"changes": 0, "upserted": 0, "deleted": 0, "error": "could not connect to the server"}
+        return SyncEngine.run(batch_size, db)
@@ -0,0 +1,197 @@
+import time
+
+from PyQt6 import QtCore
+
+
+class TabLoader:
+    """
+        Loads the data of each tab of the main window the first time it is needed.
+
+        Every tab registers the functions that fill it. Nothing is loaded until the main
+        window has painted once (firstPaint()); then the visible tab is loaded on a zero
+        timer and the other tabs are prefetched one per event loop turn, so the first
+        paint never waits for the database. A tab whose data is read on the background
+        query executor holds the prefetch back until its reads finish (or FALLBACK_MS
+        pass), so the visible tab is filled before the hidden ones are loaded. Switching
+        to a tab that is still pending loads it immediately.
+
+        The startup is recorded as a timeline of (label, milliseconds since begin()),
+        shown in the query statistics dialog.
+    """
+    # Starts the loading anyway if the window is not painted by then, e.g. minimized
+    FALLBACK_MS = 500
+
+    _tabs = None
+    _executor = None
+    _scheduled = False
+    # Executor keys the prefetch waits for before loading the next tab
+    _waiting = set()
+    _loaders = {}
+    _loaded = set()
+    _start = None
+    _timeline = []
+
+    @staticmethod
+    def begin():
+        """
+            Starts the startup timeline; called first thing when the main window is built.
+        """
+        TabLoader._start = time.perf_counter()
+        TabLoader._timeline = []
+        TabLoader.mark("start")
+
+    @staticmethod
+    def mark(label):
+        """
+            Records the first time ``label`` happens since begin(); later ones are ignored.
+
+            :param label: The startup step, e.g. "first paint".
+            :type label: str
+        """
+        if TabLoader._start is None or any(step == label for step, _ in TabLoader._timeline):
+            return
+        TabLoader._timeline.append((label, (time.perf_counter() - TabLoader._start) * 1000))
+
+    @staticmethod
+    def timeline():
+        """
+            :return: The recorded startup steps as (label, ms since begin()), in order.
+            :rtype: list
+        """
+        return list(TabLoader._timeline)
+
+    @staticmethod
+    def summary():
+        """
+            :return: The startup timeline in one line, e.g. "first paint 85 ms, customers 90 ms".
+            :rtype: str
+        """
+        return ", ".join(f"{label} {ms:.0f} ms" for label, ms in TabLoader._timeline if label != "start")
+
+    @staticmethod
+    def register(tab, label, *functions, reads=()):
+        """
+            :param tab: The page of the tab widget.
+            :type tab: QWidget
+            :param label: The name of the tab in the timeline.
+            :type label: str
+            :param functions: Called without arguments, in order, to fill the tab.
+            :param reads: The keys of the executor requests submitted by ``functions``; the
+                          next tab is prefetched once they have finished.
+            :type reads: tuple
+        """
+        TabLoader._loaders[tab] = (label, functions, tuple(reads))
+        TabLoader._loaded.discard(tab)
+
+    @staticmethod
+    def start(tabs, executor=None):
+        """
+            Follows the current tab of ``tabs``; the tabs are loaded after firstPaint().
+
+            :param tabs: The tab widget of the main window.
+            :type tabs: QTabWidget
+            :param executor: The query executor the tabs submit their reads to, if any.
+            :type executor: QueryExecutor
+        """
+        TabLoader._tabs = tabs
+        TabLoader._executor = executor
+        TabLoader._scheduled = False
+        TabLoader._waiting = set()
+        tabs.currentChanged.connect(TabLoader.load)
+        if executor is not None:
+            executor.finished.connect(TabLoader._readFinished)
+            executor.failed.connect(TabLoader._readDone)
+        QtCore.QTimer.singleShot(TabLoader.FALLBACK_MS, TabLoader._schedule)
+
+    @staticmethod
+    def firstPaint():
+        """
+            Called from the paint event of the main window: records the first paint and
+            schedules the loading of the tabs.
+        """
+        TabLoader.mark("first paint")
+        TabLoader._schedule()
+
+    @staticmethod
+    def _schedule():
+        if not TabLoader._scheduled:
+            TabLoader._scheduled = True
+            QtCore.QTimer.singleShot(0, TabLoader._prefetch)
+
+    @staticmethod
+    def load(index):
+        """
+            Fills the tab at ``index`` unless it was already loaded.
+
+            :param index: The index of the tab.
+            :type index: int
+            :return: True if the tab was loaded now, False otherwise.
+            :rtype: bool
+        """
+        tab = TabLoader._tabs.widget(index) if TabLoader._tabs is not None else None
+        if tab is None or tab in TabLoader._loaded or tab not in TabLoader._loaders:
+            return False
+        TabLoader._loaded.add(tab)
+        label, functions, _ = TabLoader._loaders[tab]
+        for function in functions:
+            try:
+                function()
+            except Exception as error:
+                print(f"Error TabLoader.load {label}: ", error)
+        TabLoader.mark(label)
+        return True
+
+    @staticmethod
+    def _prefetch():
+        """
+            Loads the next pending tab, the visible one first, and schedules the one after
+            it, so the event loop paints and handles input between two tabs. After a tab
+            that submitted reads, the next one waits for them (see _readFinished).
+        """
+        if TabLoader._tabs is None:
+            return
+        current = TabLoader._tabs.currentIndex()
+        for index in [current] + list(range(TabLoader._tabs.count())):
+            if TabLoader.load(index):
+                _, _, reads = TabLoader._loaders[TabLoader._tabs.widget(index)]
+                executor = TabLoader._executor
+                waiting = {key for key in reads if executor is not None and executor.isBusy(key)}
+                TabLoader._waiting = waiting
+                if waiting:
+                    QtCore.QTimer.singleShot(TabLoader.FALLBACK_MS, lambda: TabLoader._resume(waiting))
+                else:
+                    QtCore.QTimer.singleShot(0, TabLoader._prefetch)
+                return
+        TabLoader.mark("all tabs")
+
+    @staticmethod
+    def _readFinished(key, result):
+        """
+            Records a finished executor request in the timeline, see _readDone().
+
+            :param key: The request key.
+            :type key: str
+        """
+        TabLoader.mark(f"{key} read")
+        TabLoader._readDone(key)
+
+    @staticmethod
+    def _readDone(key, message=None):
+        """
+            Resumes the prefetch once the reads of the last loaded tab have all finished or
+            failed.
+
+            :param key: The request key.
+            :type key: str
+        """
+        if key in TabLoader._waiting:
+            TabLoader._waiting.discard(key)
+            if not TabLoader._waiting:
+                QtCore.QTimer.singleShot(0, TabLoader._prefetch)
+
+    @staticmethod
+    def _resume(waiting):
+        # The reads are taking longer than FALLBACK_MS: load the next tab anyway
+        if waiting and TabLoader._waiting is waiting:
+            waiting.clear()
+            TabLoader._prefetch()
@@ -0,0 +1,39 @@
+"""
+    Shared fixtures. The tests run headless (Qt offscreen platform) from any directory.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtWidgets
+
+from connection import Connection
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def database(app, tmp_path):
+    """
+        Opens a copy of the shipped database, migrated to the latest schema.
+
+        :return: The path of the copy.
+    """
+    path = str(tmp_path / "bbdd.sqlite")
+    shutil.copy(os.path.join(ROOT, "data", "bbdd.sqlite"), path)
+    previous = Connection.DB_PATH
+    Connection.DB_PATH = path
+    assert Connection.db_connection()
+    yield path
+    Connection.db_close()
+    Connection.DB_PATH = previous
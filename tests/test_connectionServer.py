@@ -0,0 +1,176 @@
+"""
+    ConnectionServer against a stand-in for the mysql.connector pool: it records every
+    statement and answers with canned rows, so the pool handling, the transactions and
+    the typed rows are checked without a MySQL/MariaDB server. test_syncTills.py runs
+    against a real server.
+"""
+import time
+
+import pytest
+from PyQt6 import QtCore
+
+import connectionServer
+from connection import Connection
+from connectionServer import ConnectionServer
+from queryExecutor import QueryExecutor
+from repository import Repository
+from rows import CustomerRow
+
+pytestmark = pytest.mark.skipif(connectionServer.mysql is None, reason="mysql-connector-python is not installed")
+
+
+class StandInCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = 1
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.pool.statements.append((sql, params))
+        self._rows, self.rowcount, self.lastrowid = self.pool.answer(sql, params)
+
+    def executemany(self, sql, params):
+        for values in params:
+            self.execute(sql, values)
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return StandInCursor(self.pool)
+
+    def commit(self):
+        self.pool.events.append("commit")
+
+    def rollback(self):
+        self.pool.events.append("rollback")
+
+    def close(self):
+        self.pool.borrowed -= 1
+
+
+class StandInPool:
+    """Created by ConnectionServer.configure() instead of MySQLConnectionPool."""
+    created = []
+
+    def __init__(self, **config):
+        self.config = config
+        self.statements = []
+        self.events = []
+        self.borrowed = 0
+        self.removed = False
+        self.answers = []
+        StandInPool.created.append(self)
+
+    def answer(self, sql, params):
+        for fragment, result in self.answers:
+            if fragment in sql:
+                return result(params) if callable(result) else result
+        return [], 1, None
+
+    def get_connection(self):
+        self.borrowed += 1
+        return StandInConnection(self)
+
+    def _remove_connections(self):
+        self.removed = True
+
+
+@pytest.fixture
+def pool(database, monkeypatch):
+    StandInPool.created = []
+    monkeypatch.setattr(connectionServer.pooling, "MySQLConnectionPool", StandInPool)
+    ConnectionServer.close()
+    assert ConnectionServer.configure()
+    yield StandInPool.created[-1]
+    ConnectionServer.close()
+    Repository.select("sqlite")
+
+
+def test_configure_keeps_the_pool_while_the_settings_do_not_change(pool):
+    assert ConnectionServer.configure()
+    assert ConnectionServer.configure({"pool_size": pool.config["pool_size"]})
+    assert StandInPool.created == [pool]
+
+    assert ConnectionServer.configure({"host": "server.example"})
+    assert len(StandInPool.created) == 2
+    assert pool.removed
+    assert StandInPool.created[-1].config["host"] == "server.example"
+
+
+def test_configure_reads_the_local_settings(pool):
+    assert Connection.saveSettings([("mysql.database", "head_office")])
+    assert ConnectionServer.configure()
+    assert StandInPool.created[-1].config["database"] == "head_office"
+
+
+def test_readers_return_typed_rows_and_give_the_connection_back(pool):
+    customer = ("00000000T", "01/01/2025", "García", "Ana", "ana@example.com", 600000000, "Calle Mayor",
+                "Madrid", "Madrid", "paper", "True")
+    pool.answers = [("FROM customers", ([customer], 1, None))]
+
+    customers = ConnectionServer.getCustomers(True)
+
+    assert customers == [CustomerRow._make(customer)]
+    sql, params = pool.statements[-1]
+    assert "historical = 'True'" in sql and "ORDER BY surname, dni_nie" in sql
+    assert pool.borrowed == 0
+
+
+def test_write_failure_rolls_back_and_gives_the_connection_back(pool):
+    def refuse(params):
+        raise connectionServer.Error("duplicate entry")
+
+    pool.answers = [("INSERT INTO invoices", refuse)]
+
+    assert ConnectionServer.addInvoice(["00000000T", "01/01/2025"]) is False
+    assert pool.events == ["rollback"]
+    assert pool.borrowed == 0
+
+
+def test_sale_short_of_stock_rolls_back_every_line(pool):
+    # The stock update matches no row: the product does not have enough units
+    pool.answers = [("UPDATE products SET stock", ([], 0, None))]
+
+    assert ConnectionServer.saveSales(1, [[4, 2, "Manzanas", 1.2, 2.4]]) is False
+    assert any("INSERT INTO sales" in sql for sql, _ in pool.statements)
+    assert pool.events == ["rollback"]
+    assert pool.borrowed == 0
+
+
+def test_repository_forwards_to_the_server_backend(pool):
+    pool.answers = [("FROM products", ([(4, "Manzanas", 120, "Foods", 1.2, "€")], 1, None))]
+
+    assert Repository.missingMethods(ConnectionServer) == []
+    assert Repository.select("mysql")
+    assert [product.name for product in Repository.getProducts()] == ["Manzanas"]
+    assert StandInPool.created == [pool]
+
+
+def test_server_readers_run_on_the_executor_without_a_local_connection(pool):
+    pool.answers = [("FROM customers", ([("00000000T",) + ("",) * 10], 1, None))]
+    assert Repository.select("mysql")
+    executor = QueryExecutor(Connection.DB_PATH)
+    results = []
+
+    executor.submit("customers", Repository.getCustomers, False, on_finished=results.append,
+                    local=Repository.isLocal())
+    deadline = time.monotonic() + 10
+    while not results and time.monotonic() < deadline:
+        QtCore.QCoreApplication.processEvents()
+
+    assert [customer.dni_nie for customer in results[0]] == ["00000000T"]
+    assert executor.openConnections() == 0
+    executor.reset()
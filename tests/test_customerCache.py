@@ -0,0 +1,99 @@
+"""
+    CustomerCache: the LRU bound, both indexes, and the invalidation done by the
+    customer writes of Connection.
+"""
+import pytest
+from PyQt6 import QtSql, QtWidgets
+
+from connection import Connection
+from customerCache import CustomerCache
+from rows import CustomerRow
+
+
+def customer(number, mobile=None):
+    return CustomerRow(f"{number:08d}X", "01/01/2025", "Surname", f"Name {number}", "", mobile or 600000000 + number,
+                       "", "", "", "paper", "True")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(CustomerCache, "capacity", 3)
+    CustomerCache.invalidate()
+    yield CustomerCache
+    CustomerCache.invalidate()
+
+
+def test_least_recently_used_customer_is_evicted(cache):
+    first, second, third, fourth = (customer(number) for number in range(4))
+    for row in (first, second, third):
+        CustomerCache.put(row)
+    assert CustomerCache.get(first.dni_nie, "dni") is first
+
+    CustomerCache.put(fourth)
+
+    assert CustomerCache.stats()["size"] == 3
+    assert CustomerCache.get(second.dni_nie, "dni") is None
+    assert CustomerCache.get(second.mobile, "phone") is None
+    assert [CustomerCache.get(row.mobile, "phone") for row in (first, third, fourth)] == [first, third, fourth]
+
+
+def test_lower_capacity_evicts_the_oldest(cache):
+    rows = [customer(number) for number in range(3)]
+    for row in rows:
+        CustomerCache.put(row)
+
+    CustomerCache.configure(1)
+
+    assert CustomerCache.stats()["size"] == 1
+    assert CustomerCache.get(rows[-1].dni_nie, "dni") is rows[-1]
+    CustomerCache.configure(0)
+    CustomerCache.put(rows[0])
+    assert CustomerCache.stats()["size"] == 0
+
+
+def test_invalid_capacity_falls_back_to_the_default(cache):
+    CustomerCache.configure("many")
+    assert CustomerCache.capacity == CustomerCache.DEFAULT_CAPACITY
+
+
+def test_invalidate_by_dni_and_by_mobile(cache):
+    first, second = customer(1), customer(2)
+    CustomerCache.put(first)
+    CustomerCache.put(second)
+
+    CustomerCache.invalidate(dni=first.dni_nie)
+    assert CustomerCache.get(first.mobile, "phone") is None
+
+    # The mobile was given to someone else: its previous owner is dropped
+    CustomerCache.invalidate(mobile=str(second.mobile))
+    assert CustomerCache.get(second.dni_nie, "dni") is None
+
+
+def test_replaced_row_drops_its_old_mobile(cache):
+    old = customer(1)
+    CustomerCache.put(old)
+    new = old._replace(mobile=699999999)
+    CustomerCache.put(new)
+
+    assert CustomerCache.get(old.mobile, "phone") is None
+    assert CustomerCache.get(new.mobile, "phone") is new
+
+
+def test_customer_writes_invalidate_the_cache(database, cache):
+    query = QtSql.QSqlQuery()
+    assert query.exec("SELECT dni_nie FROM customers ORDER BY dni_nie LIMIT 1") and query.next()
+    dni = query.value(0)
+    cached = Connection.getCustomerData(dni, "dni")
+    assert CustomerCache.get(dni, "dni") == cached
+    assert CustomerCache.get(cached.mobile, "phone") == cached
+
+    # The form hands over its widgets, with the invoice type and historical as text
+    values = [QtWidgets.QLineEdit(str(value)) for value in cached[:9]] + [cached.invoicetype, cached.historical]
+    values[3].setText("Renamed")
+    assert Connection.setCustomerData(values)
+    assert CustomerCache.get(dni, "dni") is None
+    assert Connection.getCustomerData(dni, "dni").name == "Renamed"
+
+    assert Connection.deleteCustomer(dni)
+    assert CustomerCache.get(dni, "dni") is None
+    assert Connection.getCustomerData(dni, "dni").historical == "False"
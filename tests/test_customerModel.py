@@ -0,0 +1,156 @@
+"""
+    CustomerModel: the column lists behind the customer table and the in-memory filter
+    and sort, checked against a full recomputation and with QAbstractItemModelTester.
+"""
+import random
+
+import pytest
+from PyQt6 import QtCore
+from PyQt6.QtTest import QAbstractItemModelTester
+
+from customerModel import CustomerModel
+from rows import CustomerRow
+
+DISPLAY = QtCore.Qt.ItemDataRole.DisplayRole
+
+
+def customer(dni, surname, name="Name", mobile=600000000, city="Vigo", historical="True"):
+    return CustomerRow(dni, "01/01/2025", surname, name, "", mobile, "", "Pontevedra", city, "paper", historical)
+
+
+def shown(model, column=0):
+    return [model.data(model.index(row, column), DISPLAY) for row in range(model.rowCount())]
+
+
+@pytest.fixture
+def model(app):
+    model = CustomerModel()
+    model.tester = QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    model.setCustomers([customer("00000003C", "Castro", mobile=600000003, historical="False"),
+                        customer("00000001A", "Alonso", mobile=600000001),
+                        customer("00000002B", "Blanco", mobile=600000002)])
+    return model
+
+
+def test_rows_are_shown_by_surname(model):
+    assert (model.rowCount(), model.columnCount()) == (3, len(CustomerModel.HEADERS))
+    assert shown(model) == ["Alonso", "Blanco", "Castro"]
+    assert [model.dniAt(row) for row in range(3)] == ["00000001A", "00000002B", "00000003C"]
+    assert model.dniAt(3) is None
+    assert model.rowOf("00000002B") == 1
+    assert model.rowOf("99999999Z") == -1
+
+
+def test_cells_are_formatted_on_demand(model):
+    assert shown(model, 2) == ["600000001", "600000002", "600000003"]
+    assert shown(model, 6) == ["Active", "Active", "Inactive"]
+    left = model.data(model.index(0, 0), QtCore.Qt.ItemDataRole.TextAlignmentRole)
+    center = model.data(model.index(0, 4), QtCore.Qt.ItemDataRole.TextAlignmentRole)
+    assert left == CustomerModel._LEFT and center == CustomerModel._CENTER
+    assert model.headerData(0, QtCore.Qt.Orientation.Horizontal) == "Surname"
+    assert model.headerData(0, QtCore.Qt.Orientation.Horizontal, QtCore.Qt.ItemDataRole.FontRole).bold()
+    assert model.headerData(0, QtCore.Qt.Orientation.Vertical) is None
+
+
+def test_set_customers_resets_the_model(model):
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+
+    model.setCustomers([customer("00000009Z", "Zapata")])
+
+    assert resets == [True]
+    assert shown(model) == ["Zapata"]
+
+
+def test_updated_customer_changes_only_its_row(model):
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append((first.row(), last.row())))
+
+    model.upsertCustomer(customer("00000002B", "Blanco", name="Changed", mobile=600000002))
+
+    assert changed == [(1, 1)]
+    assert shown(model, 1) == ["Name", "Changed", "Name"]
+
+
+def reference(customers, model):
+    """The shown DNIs recomputed from scratch: filtered, then sorted by (value, dni_nie)."""
+    field = CustomerModel.FIELDS[model._sort_column]
+    rows = sorted(customers.values(), key=lambda row: ("" if getattr(row, field) is None else str(getattr(row, field)),
+                                                       row.dni_nie),
+                  reverse=model._sort_order == QtCore.Qt.SortOrder.DescendingOrder)
+    text = model._text
+    return [row.dni_nie for row in rows
+            if (not model._active_only or row.historical == "True")
+            and (not text or text in "\t".join("" if value is None else str(value)
+                                               for value in (row.surname, row.name, row.mobile, row.city)).lower())]
+
+
+@pytest.fixture
+def loaded(app):
+    rnd = random.Random(7)
+    customers = {}
+    for number in range(80):
+        row = customer(f"{number:08d}{'ABCDEFGH'[number % 8]}", rnd.choice(["Álvarez", "alonso", "Blanco", "Díaz", None]),
+                       name=rnd.choice(["Ana", "mario", "Marta", "Bo"]), mobile=rnd.randrange(600000000, 700000000),
+                       city=rnd.choice(["Madrid", "Vigo", "A Coruña", None]), historical=rnd.choice(["True", "False"]))
+        customers[row.dni_nie] = row
+    model = CustomerModel()
+    model.setCustomers(list(customers.values()))
+    return model, customers, rnd
+
+
+STATES = [(column, order, text, active_only)
+          for column in (0, 2, 4, 6)
+          for order in (QtCore.Qt.SortOrder.AscendingOrder, QtCore.Qt.SortOrder.DescendingOrder)
+          for text, active_only in (("", False), ("ma", True), ("  MAR ", False), ("zz", True))]
+
+
+def setState(model, state):
+    column, order, text, active_only = state
+    model.sort(column, order)
+    model.setFilterText(text)
+    model.setActiveOnly(active_only)
+
+
+@pytest.mark.parametrize("state", STATES)
+def test_filter_and_sort_match_a_full_recomputation(loaded, state):
+    model, customers, _ = loaded
+    setState(model, state)
+    assert [model.dniAt(row) for row in range(model.rowCount())] == reference(customers, model)
+
+
+def test_selection_follows_its_customer(loaded):
+    model, customers, _ = loaded
+    selected = QtCore.QPersistentModelIndex(model.index(10, 0))
+    dni = model.dniAt(10)
+
+    model.sort(4, QtCore.Qt.SortOrder.DescendingOrder)
+    assert model.dniAt(selected.row()) == dni
+
+    model.setFilterText("no customer matches this")
+    assert not selected.isValid()
+
+
+@pytest.mark.parametrize("state", STATES[::3])
+def test_writes_match_a_full_recomputation(loaded, state):
+    model, customers, rnd = loaded
+    setState(model, state)
+    model.tester = QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    for step in range(40):
+        dni = rnd.choice(list(customers))
+        if step % 10 == 9:
+            assert model.removeCustomer(dni)
+            del customers[dni]
+        else:
+            if step % 10 == 4:
+                dni = f"{900 + step:08d}N"
+            row = customer(dni, rnd.choice(["Aaa", "mad", "Zzz", None]), name=rnd.choice(["Ma", "Bo"]),
+                           city=rnd.choice(["Madrid", "Vigo"]), historical=rnd.choice(["True", "False"]))
+            model.upsertCustomer(row)
+            customers[dni] = row
+        assert [model.dniAt(row) for row in range(model.rowCount())] == reference(customers, model), step
+
+    # The permutations patched by the writes agree with freshly built ones
+    model.sort((state[0] + 2) % 8, state[1])
+    assert [model.dniAt(row) for row in range(model.rowCount())] == reference(customers, model)
+    assert not model.removeCustomer("99999999Z")
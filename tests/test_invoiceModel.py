@@ -0,0 +1,81 @@
+"""
+    InvoiceModel: the invoice list read lazily in keyset pages by fetchMore(), and the
+    single-row updates done after a write.
+"""
+import pytest
+
+from connection import Connection
+from invoiceModel import InvoiceModel
+
+
+def invoiceIds():
+    return [invoice.idFac for invoice in Connection.iterInvoices()]
+
+
+@pytest.fixture
+def model(database, monkeypatch):
+    monkeypatch.setattr(InvoiceModel, "PAGE_SIZE", 5)
+    return InvoiceModel()
+
+
+def loaded(model):
+    return [model.invoiceAt(row).idFac for row in range(model.rowCount())]
+
+
+def test_pages_are_read_on_demand(model):
+    ids = invoiceIds()
+    assert len(ids) > 2 * InvoiceModel.PAGE_SIZE
+    assert model.rowCount() == 0 and model.canFetchMore()
+
+    model.fetchMore()
+    assert loaded(model) == ids[:5]
+    model.fetchMore()
+    assert loaded(model) == ids[:10]
+
+    while model.canFetchMore():
+        model.fetchMore()
+    assert loaded(model) == ids
+    assert [model.rowOf(id_factura) for id_factura in ids] == list(range(len(ids)))
+
+
+def test_last_full_page_ends_with_an_empty_fetch(model, monkeypatch):
+    ids = invoiceIds()
+    monkeypatch.setattr(InvoiceModel, "PAGE_SIZE", len(ids))
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+
+    model.fetchMore()
+    assert model.canFetchMore()
+    model.fetchMore()
+
+    assert not model.canFetchMore()
+    assert inserted == [(0, len(ids) - 1)]
+
+
+def test_reload_reads_the_first_page_again(model):
+    model.fetchMore()
+    model.fetchMore()
+
+    model.reload()
+
+    assert loaded(model) == invoiceIds()[:5]
+    assert model.canFetchMore()
+
+
+def test_writes_change_only_the_loaded_rows(model):
+    ids = invoiceIds()
+    model.fetchMore()
+    newest = Connection.getInvoiceTotals(ids[0])
+    oldest = Connection.getInvoiceTotals(ids[-1])
+
+    assert model.upsertInvoice(newest._replace(total=123.0))
+    assert model.data(model.index(0, 4)) == "123.00"
+    # Older than the loaded pages: left for fetchMore()
+    assert not model.upsertInvoice(oldest)
+    assert model.rowCount() == 5
+
+    assert model.upsertInvoice(newest._replace(idFac=ids[0] + 1))
+    assert loaded(model) == [ids[0] + 1] + ids[:5]
+    assert model.removeInvoice(ids[1])
+    assert loaded(model) == [ids[0] + 1, ids[0]] + ids[2:5]
+    assert not model.removeInvoice(ids[-1])
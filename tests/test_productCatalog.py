@@ -0,0 +1,86 @@
+"""
+    ProductCatalog: every product write done through Connection is reflected in the
+    cache without reading the table again, and a read that raced a write is not installed.
+"""
+import pytest
+from PyQt6 import QtSql, QtWidgets
+
+from connection import Connection
+from productCatalog import ProductCatalog
+
+
+def fields(*values):
+    return [QtWidgets.QLineEdit(str(value)) for value in values]
+
+
+def tableProducts():
+    query = QtSql.QSqlQuery()
+    assert query.exec("SELECT code, name, stock, family, unit_price, currency FROM products ORDER BY code")
+    products = []
+    while query.next():
+        products.append(tuple(query.value(column) for column in range(6)))
+    return products
+
+
+@pytest.fixture
+def catalog(database, monkeypatch):
+    """A loaded catalog that fails the test if it is read in full again."""
+    ProductCatalog.invalidate()
+    assert ProductCatalog.load()
+
+    def read(db=None):
+        raise AssertionError("the catalog was read again")
+
+    monkeypatch.setattr(ProductCatalog, "read", staticmethod(read))
+    return database
+
+
+def test_catalog_matches_the_table(catalog):
+    assert [tuple(product) for product in ProductCatalog.getAll()] == tableProducts()
+
+
+def test_added_product_is_cached(catalog):
+    assert Connection.addProduct(fields("Catalog test", 7, "Foods", 2.5, "€"))
+
+    product = ProductCatalog.getByName("Catalog test")
+    assert product is not None and product.stock == 7
+    assert ProductCatalog.getByCode(product.code) is product
+    assert [tuple(product) for product in ProductCatalog.getAll()] == tableProducts()
+
+
+def test_updated_product_is_refreshed(catalog):
+    product = ProductCatalog.getAll()[0]
+    assert Connection.setProductData(fields(product.name, 42, product.family, 9.75, product.currency))
+    assert ProductCatalog.getByName(product.name).stock == 42
+    assert ProductCatalog.getByCode(product.code).unit_price == 9.75
+
+    assert Connection.updateStockProductData([product.code, 3])
+    assert ProductCatalog.getByCode(product.code).stock == 3
+    assert [tuple(product) for product in ProductCatalog.getAll()] == tableProducts()
+
+
+def test_sale_refreshes_the_stock(catalog):
+    product = next(product for product in ProductCatalog.getAll() if product.stock > 0)
+    assert Connection.reserveStock([(product.code, 1)], "test")
+    assert ProductCatalog.getByCode(product.code).stock == product.stock - 1
+
+
+def test_deleted_product_is_removed(catalog):
+    product = ProductCatalog.getAll()[-1]
+    assert Connection.deleteProduct(product.name)
+
+    assert ProductCatalog.getByName(product.name) is None
+    assert ProductCatalog.getByCode(product.code) is None
+    assert [tuple(product) for product in ProductCatalog.getAll()] == tableProducts()
+
+
+def test_read_that_raced_a_write_is_not_installed(database):
+    ProductCatalog.invalidate()
+    generation = ProductCatalog.generation
+    rows = ProductCatalog.read()
+    assert Connection.updateStockProductData([rows[0].code, rows[0].stock + 1])
+
+    assert not ProductCatalog.install(rows, generation)
+    assert not ProductCatalog.isLoaded()
+    assert ProductCatalog.install(ProductCatalog.read(), ProductCatalog.generation)
+    assert ProductCatalog.getByCode(rows[0].code).stock == rows[0].stock + 1
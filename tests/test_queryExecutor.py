@@ -0,0 +1,97 @@
+"""
+    QueryExecutor: results on the GUI thread and connections closed by reset().
+"""
+import shutil
+import threading
+import time
+
+from PyQt6 import QtCore, QtSql
+
+from connection import Connection
+from queryExecutor import QueryExecutor
+from repository import Repository
+
+
+def wait(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        QtCore.QCoreApplication.processEvents()
+    return condition()
+
+
+def executorConnections():
+    return [name for name in QtSql.QSqlDatabase.connectionNames() if name.startswith("query-executor-")]
+
+
+def test_readers_deliver_their_result(database):
+    executor = QueryExecutor(database)
+    results = []
+    executor.submit("customers", Repository.getCustomers, False, on_finished=results.append)
+
+    assert wait(lambda: results)
+    assert len(results[0]) == len(Connection.getCustomers(False))
+    executor.reset()
+
+
+def test_reset_closes_every_thread_connection(database):
+    executor = QueryExecutor(database, max_threads=2)
+    started = threading.Barrier(2)
+    results = []
+
+    def reader(db=None):
+        # Both readers run at once, so each pool thread opens a connection
+        started.wait(5)
+        query = QtSql.QSqlQuery(db)
+        query.exec("SELECT count(*) FROM customers")
+        query.next()
+        return query.value(0)
+
+    executor.submit("first", reader, on_finished=results.append)
+    executor.submit("second", reader, on_finished=results.append)
+    assert wait(lambda: len(results) == 2)
+    assert executor.openConnections() == 2
+
+    executor.reset()
+
+    assert executor.openConnections() == 0
+    assert executorConnections() == []
+
+
+def test_reset_before_the_file_is_replaced(database, tmp_path):
+    executor = QueryExecutor(database)
+    results = []
+    executor.submit("customers", Repository.getCustomers, False, on_finished=results.append)
+    assert wait(lambda: results)
+    before = len(results[0])
+
+    # What a backup restore does: close every connection, then replace the file
+    executor.reset()
+    Connection.db_close()
+    replacement = str(tmp_path / "replacement.sqlite")
+    shutil.copy(database, replacement)
+    Connection.DB_PATH = replacement
+    assert Connection.db_connection()
+    assert QtSql.QSqlQuery().exec("INSERT INTO customers (dni_nie, surname, name, historical) "
+                                  "VALUES ('11111111H', 'Restored', 'Customer', 'True')")
+    Connection.db_close()
+    Connection.DB_PATH = database
+    shutil.copy(replacement, database)
+    assert Connection.db_connection()
+
+    results.clear()
+    executor.submit("customers", Repository.getCustomers, False, on_finished=results.append)
+    assert wait(lambda: results)
+    assert len(results[0]) == before + 1
+    executor.reset()
+
+
+def test_readers_without_a_local_database_open_no_connection(database):
+    executor = QueryExecutor(database)
+    results = []
+    executor.submit("server", lambda db=None: db, on_finished=results.append, local=False)
+
+    assert wait(lambda: results)
+    assert results == [None]
+    assert executor.openConnections() == 0
+    assert executorConnections() == []
+    executor.reset()
@@ -0,0 +1,171 @@
+"""
+    Query-plan regression tests for every statement issued through Connection.
+
+    Generates a synthetic database (see benchmarks/generateData.py), runs every Connection
+    reader and writer once so all their statements end up in the StatementCache, and
+    runs EXPLAIN QUERY PLAN on each of them. A statement fails when it reads a whole
+    table ("SCAN <table>" without an index) or sorts in a temporary B-tree, unless it is
+    listed in ALLOWED with the exact steps it is allowed to take.
+
+    The database has 1k customers by default, where the planner is the most tempted to
+    scan; set QUERY_PLANS_SCALE (1k, 100k, 1m or a number of customers) to check another
+    scale.
+"""
+import os
+import re
+
+import pytest
+from PyQt6 import QtSql
+
+import generateData
+from connection import Connection
+from customerCache import CustomerCache
+from productCatalog import ProductCatalog
+from statementCache import StatementCache
+from syncEngine import SyncEngine
+
+SCALE = os.environ.get("QUERY_PLANS_SCALE", "1k")
+
+# Statements that read a whole table or sort on purpose: SQL fragment -> (reason, steps allowed)
+ALLOWED = {
+    "ON t.idFac = i.idFac ORDER BY i.idFac DESC;": ("getAllInvoices reads every invoice", {"SCAN i"}),
+    "ON t.idFac = i.idFac ORDER BY i.idFac DESC LIMIT": (
+        "first invoice page walks the rowid backwards and stops at LIMIT", {"SCAN i"}),
+    "FROM products ORDER BY code;": ("the product catalog is read whole once", {"SCAN products"}),
+    "SELECT * FROM settings": ("a handful of rows", {"SCAN settings"}),
+    "FROM sales_daily_": ("groups the days of the range; the temporary B-trees hold those groups only and "
+                          "the outer query reads the grouped rows",
+                          {"USE TEMP B-TREE FOR GROUP BY", "USE TEMP B-TREE FOR ORDER BY", "SCAN a"}),
+}
+
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)(?! VIRTUAL TABLE)(?!.*INDEX)")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE")
+
+
+class Field:
+    """Stands in for the form widgets the Connection writers read with text()."""
+    def __init__(self, value):
+        self.value = value
+
+    def text(self):
+        return str(self.value)
+
+
+def exercise():
+    """Runs every Connection method once so their statements get prepared."""
+    CustomerCache.configure(0)
+    customer = Connection.getCustomers(True)[0]
+
+    Connection.getProvinces()
+    Connection.getCities("Madrid")
+    Connection.getCustomers(False)
+    for historical in (True, False):
+        _, cursor = Connection.getCustomersPage(historical, None, 50)
+        Connection.getCustomersPage(historical, cursor, 50)
+    Connection.getCustomerData(customer.dni_nie, "dni")
+    Connection.getCustomerData(customer.mobile, "phone")
+
+    fields = ["99999999R", "01/01/2025", "Plan", "Check", "plan@example.com", "699999999",
+              "Calle", "Madrid", "Madrid", "paper"]
+    Connection.addCustomer([Field(value) for value in fields])
+    Connection.setCustomerData([Field(value) for value in fields] + ["True"])
+    Connection.deleteCustomer("99999999R")
+
+    Connection.saveSettings([("plan_check", "1")])
+    Connection.getSetting("plan_check")
+    Connection.getSettings()
+
+    ProductCatalog.invalidate()
+    Connection.getProducts()
+    Connection.addProduct([Field(value) for value in ("Plan product", 10, "Foods", 1.5, "€")])
+    Connection.setProductData([Field(value) for value in ("Plan product", 9, "Foods", 1.5, "€")])
+    product = Connection.getProductData("Plan product")
+    Connection.updateStockProductData([product.code, 8])
+    Connection.reserveStock([(product.code, 1)], "plan_check")
+    Connection.getStockShortages([(product.code, 100)])
+    Connection.getProductFamilies()
+
+    Connection.search("surname1 name", None, 20)
+
+    Connection.addInvoice([customer.dni_nie, "01/01/2025"])
+    invoice = Connection.getAllInvoices()[0]
+    _, cursor = Connection.getInvoicesPage(None, 50)
+    Connection.getInvoicesPage(cursor, 50)
+    Connection.addSale([invoice.idFac, product.code, 1, product.name, product.unit_price, product.unit_price])
+    Connection.saveSales(invoice.idFac, [[product.code, 1, product.name, product.unit_price, product.unit_price]])
+    Connection.getSale(invoice.idFac)
+    Connection.getInvoiceTotals(invoice.idFac)
+    Connection.deleteInvoiceAndSale(invoice.idFac)
+    Connection.deleteProduct("Plan product")
+
+    Connection.getRevenueByFamily("2025-07-01", "2025-09-30")
+    Connection.getRevenueByDay("2025-07-01", "2025-09-30")
+    Connection.getTopProducts("2025-07-01", "2025-09-30", 10)
+    Connection.getTopCustomers("2025-07-01", "2025-09-30", 10)
+    Connection.getTopCustomers("2025-07-01", "2025-09-30", 10, "Foods")
+
+    SyncEngine.pending()
+    SyncEngine._readChanges(0, 10)
+    for table in SyncEngine.TABLES:
+        SyncEngine._readRows(table, [1])
+
+
+def explain(sql):
+    query = QtSql.QSqlQuery()
+    if not query.prepare(f"EXPLAIN QUERY PLAN {sql}"):
+        return [f"ERROR {query.lastError().text()}"]
+    # The plan does not depend on the values, every placeholder is bound to NULL
+    for name in dict.fromkeys(re.findall(r":\w+", sql)):
+        query.bindValue(name, None)
+    for position in range(sql.count("?")):
+        query.bindValue(position, None)
+    if not query.exec():
+        return [f"ERROR {query.lastError().text()}"]
+    plan = []
+    while query.next():
+        plan.append(str(query.value(3)))
+    query.finish()
+    return plan
+
+
+@pytest.fixture(scope="module")
+def plans(app, tmp_path_factory):
+    """
+        :return: {sql: plan steps} of every statement prepared by exercise().
+    """
+    path = str(tmp_path_factory.mktemp("plans") / "bbdd.sqlite")
+    generateData.generate(path, generateData.customersFor(SCALE))
+    previous = Connection.DB_PATH
+    Connection.DB_PATH = path
+    try:
+        assert Connection.db_connection()
+        QtSql.QSqlQuery().exec("ANALYZE;")
+        exercise()
+        yield {sql: explain(sql) for sql in StatementCache.statements(Connection.DEFAULT_CONNECTION)}
+    finally:
+        Connection.db_close()
+        Connection.DB_PATH = previous
+
+
+def flagged(plan):
+    return [step for step in plan if FULL_SCAN.search(step) or TEMP_SORT.search(step) or step.startswith("ERROR")]
+
+
+def test_statements_are_collected(plans):
+    assert len(plans) > 40
+
+
+def test_no_plan_regression(plans):
+    regressions = []
+    for sql, plan in sorted(plans.items()):
+        allowed = next((steps for fragment, (_, steps) in ALLOWED.items() if fragment in sql), set())
+        bad = [step for step in flagged(plan) if step not in allowed]
+        if bad:
+            regressions.append(f"{sql}\n    " + "\n    ".join(plan))
+    assert not regressions, f"{len(regressions)} plan regressions:\n" + "\n".join(regressions)
+
+
+@pytest.mark.parametrize("fragment", list(ALLOWED))
+def test_allowed_entries_are_used(plans, fragment):
+    # An entry left behind by a rewritten statement would hide the next regression
+    assert any(fragment in sql and flagged(plan) for sql, plan in plans.items())
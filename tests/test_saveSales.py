@@ -0,0 +1,63 @@
+"""
+    Saving the lines of an invoice: nothing is sent for an empty sales grid, and a line
+    that cannot be saved rolls back every line and every stock change.
+"""
+from types import SimpleNamespace
+
+from PyQt6 import QtSql, QtWidgets
+
+import globals
+import customers  # noqa: F401  (main imports it before invoice, which needs it first)
+from connection import Connection
+from invoice import Invoice
+from repository import Repository
+
+
+def value(sql):
+    query = QtSql.QSqlQuery()
+    assert query.exec(sql) and query.next(), query.lastError().text()
+    return query.value(0)
+
+
+def test_empty_sales_grid_is_not_saved(app, monkeypatch):
+    table = QtWidgets.QTableWidget(2, 5)
+    for row in range(2):
+        for column in range(5):
+            table.setItem(row, column, QtWidgets.QTableWidgetItem(""))
+    monkeypatch.setattr(globals, "ui", SimpleNamespace(table_sales=table, lbl_num_factura=QtWidgets.QLabel("1")),
+                        raising=False)
+    saved = []
+    shown = []
+    monkeypatch.setattr(Repository, "saveSales", staticmethod(lambda id_factura, sales: saved.append(sales)))
+    monkeypatch.setattr(QtWidgets.QMessageBox, "exec", lambda mbox: shown.append(mbox.text()))
+
+    Invoice.saveSales()
+
+    assert saved == []
+    assert shown == ["Add at least one product before saving the sales"]
+
+
+def test_failing_line_rolls_back_every_line_and_stock_change(database):
+    id_factura = value("SELECT idFac FROM invoices ORDER BY idFac LIMIT 1")
+    query = QtSql.QSqlQuery()
+    assert query.exec("SELECT code, stock FROM products WHERE stock > 0 ORDER BY code LIMIT 2")
+    products = []
+    while query.next():
+        products.append((query.value(0), query.value(1)))
+    (first, first_stock), (second, second_stock) = products
+    sales = value("SELECT count(*) FROM sales")
+    movements = value("SELECT count(*) FROM stock_movements")
+
+    # The first line can be sold, the second one asks for more units than in stock
+    assert not Connection.saveSales(id_factura, [[first, 1, "First", 1.0, 1.0],
+                                                 [second, second_stock + 1, "Second", 1.0, 1.0]])
+
+    assert value("SELECT count(*) FROM sales") == sales
+    assert value("SELECT count(*) FROM stock_movements") == movements
+    assert value(f"SELECT stock FROM products WHERE code = {first}") == first_stock
+    assert value(f"SELECT stock FROM products WHERE code = {second}") == second_stock
+    assert Connection.getStockShortages([(first, 1), (second, second_stock + 1)])[0][0] == second
+
+    assert Connection.saveSales(id_factura, [[first, 1, "First", 1.0, 1.0]])
+    assert value("SELECT count(*) FROM sales") == sales + 1
+    assert value(f"SELECT stock FROM products WHERE code = {first}") == first_stock - 1
@@ -0,0 +1,56 @@
+"""
+    SqliteProfile: presets, pragma overrides from the settings table and their validation.
+"""
+import pytest
+from PyQt6 import QtSql
+
+from connection import Connection
+from sqliteProfile import SqliteProfile
+
+
+@pytest.mark.parametrize("pragma, value, expected", [
+    ("cache_size", "-32768", -32768),
+    ("mmap_size", " 0 ", 0),
+    ("busy_timeout", "2500", 2500),
+    ("synchronous", "normal", "NORMAL"),
+    ("synchronous", "2", "FULL"),
+    ("journal_mode", "wal", "WAL"),
+    ("temp_store", "MEMORY", "MEMORY"),
+])
+def test_valid_values(pragma, value, expected):
+    assert SqliteProfile.validate(pragma, value) == expected
+
+
+@pytest.mark.parametrize("pragma, value", [
+    ("cache_size", "-2000; DROP TABLE customers"),
+    ("cache_size", "1e6"),
+    ("mmap_size", "-1"),
+    ("busy_timeout", ""),
+    ("synchronous", "NORMAL; DROP TABLE customers"),
+    ("synchronous", "9"),
+    ("journal_mode", "WAL2"),
+    ("temp_store", "RAM"),
+    ("page_size", "4096"),
+])
+def test_invalid_values(pragma, value):
+    assert SqliteProfile.validate(pragma, value) is None
+
+
+def test_invalid_override_keeps_the_preset(database):
+    db = QtSql.QSqlDatabase.database()
+    assert Connection.saveSettings([("pragma.cache_size", "-2000; DROP TABLE customers"),
+                                    ("pragma.busy_timeout", "2500")])
+
+    report = SqliteProfile.apply(db, "durable")
+
+    assert report["cache_size"]["requested"] == SqliteProfile.PRESETS["durable"]["cache_size"]
+    assert report["cache_size"]["ok"]
+    assert report["busy_timeout"] == {"requested": 2500, "effective": 2500, "ok": True}
+    query = QtSql.QSqlQuery()
+    assert query.exec("SELECT count(*) FROM customers") and query.next()
+
+
+def test_presets_are_valid():
+    for pragmas in SqliteProfile.PRESETS.values():
+        for pragma, value in pragmas.items():
+            assert SqliteProfile.validate(pragma, value) is not None
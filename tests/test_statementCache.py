@@ -0,0 +1,65 @@
+"""
+    StatementCache: one prepared query per connection and SQL text, the hit/miss
+    counters, traces and invalidation of a single connection.
+"""
+from PyQt6 import QtSql
+
+from connection import Connection
+from statementCache import StatementCache
+
+SQL = "SELECT name FROM customers WHERE dni_nie = ?"
+
+
+def test_statements_are_prepared_once_per_connection(database):
+    StatementCache.invalidate()
+    before = StatementCache.stats()
+
+    first = StatementCache.prepare(SQL)
+    second = StatementCache.prepare(SQL)
+
+    assert first is second
+    stats = StatementCache.stats()
+    assert (stats["misses"] - before["misses"], stats["hits"] - before["hits"]) == (1, 1)
+    assert StatementCache.statements(Connection.DEFAULT_CONNECTION) == [SQL]
+
+
+def test_reused_statement_is_rebound_and_executed_again(database):
+    query = QtSql.QSqlQuery()
+    assert query.exec("SELECT dni_nie, name FROM customers ORDER BY dni_nie LIMIT 2")
+    customers = []
+    while query.next():
+        customers.append((query.value(0), query.value(1)))
+
+    for dni, name in customers * 2:
+        statement = StatementCache.prepare(SQL)
+        statement.bindValue(0, dni)
+        assert statement.exec() and statement.next()
+        assert statement.value(0) == name
+
+
+def test_invalidate_drops_only_that_connection(database):
+    other = QtSql.QSqlDatabase.addDatabase("QSQLITE", "statement-cache-test")
+    other.setDatabaseName(database)
+    assert other.open()
+    StatementCache.invalidate()
+    StatementCache.prepare(SQL)
+    theirs = StatementCache.prepare(SQL, other)
+
+    assert theirs is not StatementCache.prepare(SQL)
+    StatementCache.invalidate("statement-cache-test")
+
+    assert StatementCache.statements("statement-cache-test") == []
+    assert StatementCache.statements(Connection.DEFAULT_CONNECTION) == [SQL]
+    other.close()
+    del other, theirs
+    QtSql.QSqlDatabase.removeDatabase("statement-cache-test")
+
+
+def test_traces_record_the_statements_of_the_current_thread(database):
+    outer = StatementCache.startTrace()
+    StatementCache.prepare("SELECT count(*) FROM products")
+    inner = StatementCache.startTrace()
+    StatementCache.prepare(SQL)
+
+    assert [sql for _, sql, _ in StatementCache.stopTrace(inner)] == [SQL]
+    assert [sql for _, sql, _ in StatementCache.stopTrace(outer)] == ["SELECT count(*) FROM products", SQL]
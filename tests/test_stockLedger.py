@@ -0,0 +1,63 @@
+"""
+    Connection.reserveStock from several processes at once, as several tills sharing the
+    database file: no product is sold below zero and the stock movements ledger adds up
+    to the final stock.
+"""
+import multiprocessing
+import os
+
+from PyQt6 import QtSql
+
+from connection import Connection
+
+TILLS = 4
+ATTEMPTS = 25
+
+
+def reserve(path, code, start):
+    """
+        Runs in its own process, with its own connection to ``path``.
+
+        :return: The units this till managed to reserve.
+    """
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PyQt6 import QtWidgets
+    app = QtWidgets.QApplication([])
+    Connection.DB_PATH = path
+    assert Connection.db_connection()
+    start.wait(30)
+    reserved = 0
+    for attempt in range(ATTEMPTS):
+        units = 1 + attempt % 3
+        if Connection.reserveStock([(code, units)], "test"):
+            reserved += units
+    Connection.db_close()
+    del app
+    return reserved
+
+
+def value(sql):
+    query = QtSql.QSqlQuery()
+    assert query.exec(sql) and query.next(), query.lastError().text()
+    return query.value(0)
+
+
+def test_concurrent_tills_neither_oversell_nor_lose_movements(database):
+    code = value("SELECT code FROM products ORDER BY code LIMIT 1")
+    # Far fewer units than the tills ask for altogether, so some reservations must fail
+    stock = 60
+    assert QtSql.QSqlQuery().exec(f"UPDATE products SET stock = {stock} WHERE code = {code}")
+    Connection.db_close()
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        start = manager.Barrier(TILLS)
+        with context.Pool(TILLS) as pool:
+            reserved = pool.starmap(reserve, [(database, code, start)] * TILLS)
+
+    assert Connection.db_connection()
+    final = value(f"SELECT stock FROM products WHERE code = {code}")
+    assert final >= 0
+    assert stock - sum(reserved) == final
+    assert value(f"SELECT sum(delta) FROM stock_movements WHERE code = {code}") == final
+    assert value(f"SELECT count(*) FROM stock_movements WHERE code = {code} AND reason = 'test'") > 0
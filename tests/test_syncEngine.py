@@ -0,0 +1,155 @@
+"""
+    SyncEngine against a local SQLite database, with ConnectionServer.applyChanges
+    replaced by a recorder: the change log triggers, the batches, the last operation
+    of every row and the acknowledged sequence.
+"""
+import time
+
+import pytest
+from PyQt6 import QtCore, QtSql
+
+from connectionServer import ConnectionServer
+from queryExecutor import QueryExecutor
+from syncEngine import SyncEngine
+
+
+def execute(sql):
+    query = QtSql.QSqlQuery()
+    assert query.exec(sql), query.lastError().text()
+    rows = []
+    while query.next():
+        rows.append(tuple(query.value(column) for column in range(query.record().count())))
+    return rows
+
+
+def loggedChanges():
+    return [row[1:] for row in execute("SELECT seq, tbl, pk, op FROM changes ORDER BY seq")]
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """
+        :return: The batches received by the server, as (till_id, upserts, deletes) with
+                 upserts {table: rows} and deletes {table: keys}.
+    """
+    received = []
+
+    def applyChanges(till_id, upserts, deletes):
+        received.append((till_id, {table: rows for table, _, rows in upserts},
+                         {table: list(keys) for table, _, keys in deletes}))
+
+    monkeypatch.setattr(ConnectionServer, "applyChanges", staticmethod(applyChanges))
+    return received
+
+
+@pytest.fixture
+def synced(database, batches):
+    """A database whose initial rows were already shipped, with an empty change log."""
+    assert SyncEngine.run()["error"] is None
+    batches.clear()
+    return database
+
+
+def test_initial_rows_are_logged(database):
+    tables = {table for _, table, _, _ in execute("SELECT seq, tbl, pk, op FROM changes")}
+    assert tables == set(SyncEngine.TABLES)
+    assert SyncEngine.pending() == len(execute("SELECT seq FROM changes"))
+
+
+def test_triggers_capture_every_write(synced):
+    execute("INSERT INTO customers (dni_nie, surname, name, historical) VALUES ('11111111H', 'Sync', 'Test', 'True')")
+    execute("UPDATE customers SET name = 'Changed' WHERE dni_nie = '11111111H'")
+    execute("DELETE FROM customers WHERE dni_nie = '11111111H'")
+
+    assert loggedChanges() == [("customers", "11111111H", "I"), ("customers", "11111111H", "U"),
+                               ("customers", "11111111H", "D")]
+
+
+def test_stock_changes_are_logged_as_movements(synced):
+    code, stock = execute("SELECT code, stock FROM products ORDER BY code LIMIT 1")[0]
+    execute(f"UPDATE products SET stock = {stock + 5} WHERE code = {code}")
+
+    movement = execute("SELECT id, code, delta, stock, reason FROM stock_movements ORDER BY id DESC LIMIT 1")[0]
+    assert movement[1:] == (code, 5, stock + 5, "adjustment")
+    assert ("stock_movements", movement[0], "I") in loggedChanges()
+    assert execute(f"SELECT sum(delta) FROM stock_movements WHERE code = {code}")[0][0] == stock + 5
+
+
+def test_last_operation_of_every_row_is_sent(synced, batches):
+    code = execute("SELECT code FROM products ORDER BY code LIMIT 1")[0][0]
+    execute("INSERT INTO customers (dni_nie, surname, name, historical) VALUES ('11111111H', 'Sync', 'Test', 'True')")
+    execute("UPDATE customers SET name = 'Final' WHERE dni_nie = '11111111H'")
+    execute(f"UPDATE products SET name = 'Renamed' WHERE code = {code}")
+    execute(f"DELETE FROM products WHERE code = {code}")
+
+    report = SyncEngine.run()
+
+    assert report["error"] is None
+    assert len(batches) == 1
+    _, upserts, deletes = batches[0]
+    assert [(row.dni_nie, row.name) for row in upserts["customers"]] == [("11111111H", "Final")]
+    assert code not in [row.code for row in upserts.get("products", [])]
+    assert deletes["products"] == [code]
+
+
+def test_batches_advance_the_acknowledged_sequence(database, batches):
+    changes = loggedChanges()
+    seqs = [row[0] for row in execute("SELECT seq FROM changes ORDER BY seq")]
+
+    report = SyncEngine.run(batch_size=10)
+
+    assert report == {"changes": len(changes), "upserted": report["upserted"], "deleted": 0, "error": None}
+    assert len(batches) == -(-len(changes) // 10)
+    assert SyncEngine.lastAcknowledged() == seqs[-1]
+    assert SyncEngine.pending() == 0
+    assert execute("SELECT count(*) FROM changes")[0][0] == 0
+    assert {batch[0] for batch in batches} == {SyncEngine.tillId()}
+
+
+def test_failed_batch_leaves_the_log_untouched(database, monkeypatch):
+    seqs = [row[0] for row in execute("SELECT seq FROM changes ORDER BY seq")]
+    calls = []
+
+    def applyChanges(till_id, upserts, deletes):
+        calls.append(till_id)
+        if len(calls) == 2:
+            raise RuntimeError("server unavailable")
+
+    monkeypatch.setattr(ConnectionServer, "applyChanges", staticmethod(applyChanges))
+    report = SyncEngine.run(batch_size=10)
+
+    # The first batch is acknowledged, the failed one and the rest are still logged
+    assert report["error"] == "server unavailable"
+    assert report["changes"] == 10
+    assert SyncEngine.lastAcknowledged() == seqs[9]
+    assert [row[0] for row in execute("SELECT seq FROM changes ORDER BY seq")] == seqs[10:]
+
+    monkeypatch.setattr(ConnectionServer, "applyChanges", staticmethod(lambda till_id, upserts, deletes: None))
+    assert SyncEngine.run(batch_size=10)["changes"] == len(seqs) - 10
+    assert SyncEngine.pending() == 0
+
+
+def test_acknowledge_is_one_transaction(synced, batches):
+    execute("INSERT INTO customers (dni_nie, surname, name, historical) VALUES ('11111111H', 'Sync', 'Test', 'True')")
+    before = SyncEngine.lastAcknowledged()
+    execute("CREATE TEMP TRIGGER block_delete BEFORE DELETE ON changes BEGIN SELECT RAISE(ABORT, 'blocked'); END")
+
+    report = SyncEngine.run()
+
+    assert "blocked" in report["error"]
+    assert SyncEngine.lastAcknowledged() == before
+    assert SyncEngine.pending() == 1
+
+
+def test_server_sync_runs_on_the_executor(database, batches, monkeypatch):
+    monkeypatch.setattr(ConnectionServer, "configure", staticmethod(lambda config=None, db=None: True))
+    executor = QueryExecutor(database)
+    results = []
+    executor.submit("sync", SyncEngine.serverSync, on_finished=results.append)
+    deadline = time.monotonic() + 10
+    while not results and time.monotonic() < deadline:
+        QtCore.QCoreApplication.processEvents()
+    executor.reset()
+
+    assert results and results[0]["error"] is None and results[0]["changes"] > 0
+    assert batches and SyncEngine.pending() == 0
@@ -0,0 +1,125 @@
+"""
+    Two tills syncing into one server database (SyncEngine, ConnectionServer.applyChanges).
+
+    The test empties and recreates the tables of a MySQL/MariaDB database, so it only runs
+    when one is named in SYNC_TEST_MYSQL_DATABASE (SYNC_TEST_MYSQL_HOST, _PORT, _USER and
+    _PASSWORD default to the ConnectionServer settings); it is skipped otherwise.
+"""
+import os
+import shutil
+
+import pytest
+from PyQt6 import QtSql
+
+from connection import Connection
+from connectionServer import ConnectionServer
+from rows import StockMovementRow, columnList, fetchRows
+from syncEngine import SyncEngine
+
+DATABASE = os.environ.get("SYNC_TEST_MYSQL_DATABASE")
+pytestmark = pytest.mark.skipif(not DATABASE, reason="SYNC_TEST_MYSQL_DATABASE is not set")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_TABLES = ("customers", "products", "invoices", "sales", "stock_movements", "till_products")
+
+
+@pytest.fixture
+def server(app, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    config = {"database": DATABASE, "pool_size": "2"}
+    for key in ("host", "port", "user", "password"):
+        value = os.environ.get(f"SYNC_TEST_MYSQL_{key.upper()}")
+        if value is not None:
+            config[key] = value
+    assert ConnectionServer.configure(config)
+    ConnectionServer._write([(f"DROP TABLE IF EXISTS {table}", ()) for table in SERVER_TABLES])
+    assert ConnectionServer.createSchema()
+    path = Connection.DB_PATH
+    yield
+    Connection.db_close()
+    Connection.DB_PATH = path
+    ConnectionServer.close()
+
+
+def openTill(tmp_path, till_id):
+    """
+        Opens till ``till_id``, a copy of the shipped database made the first time.
+    """
+    path = tmp_path / f"{till_id}.sqlite"
+    if not path.exists():
+        shutil.copy(os.path.join(ROOT, "data", "bbdd.sqlite"), path)
+    Connection.db_close()
+    Connection.DB_PATH = str(path)
+    assert Connection.db_connection()
+    assert Connection.saveSettings([(SyncEngine.TILL_KEY, till_id)])
+
+
+def localValue(sql):
+    query = QtSql.QSqlQuery()
+    assert query.exec(sql) and query.next()
+    return query.value(0)
+
+
+def sellAndSync(tmp_path, till_id, code, units):
+    """
+        Sells ``units`` of product ``code`` on a new invoice of the till and syncs it.
+
+        :return: (local invoice ID, local stock of the product after the sale)
+    """
+    openTill(tmp_path, till_id)
+    id_factura = Connection.addInvoice(["00000000T", "01/01/2026"])
+    assert Connection.saveSales(id_factura, [[code, units, "test", 1.0, float(units)]])
+    report = SyncEngine.run()
+    assert report["error"] is None
+    return id_factura, int(localValue(f"SELECT stock FROM products WHERE code = {code}"))
+
+
+def test_two_tills_keep_their_invoices_and_add_their_stock(server, tmp_path):
+    openTill(tmp_path, "A")
+    code = localValue("SELECT code FROM products ORDER BY code LIMIT 1")
+    name = localValue(f"SELECT name FROM products WHERE code = {code}")
+
+    invoice_a, stock_a = sellAndSync(tmp_path, "A", code, 2)
+    invoice_b, stock_b = sellAndSync(tmp_path, "B", code, 3)
+
+    # Both tills numbered their invoice alike, the server keeps both
+    assert invoice_a == invoice_b
+    rows = ConnectionServer._fetch("SELECT i.till_id, s.amount FROM invoices i JOIN sales s ON s.idFactura = i.idFac "
+                                   "WHERE i.till_idFac = %s ORDER BY i.till_id", (invoice_a,))
+    assert rows == [("A", 2), ("B", 3)]
+
+    # The server stock is what both tills hold, not the stock of the last till synced
+    server_code, server_stock = ConnectionServer._fetch("SELECT code, stock FROM products WHERE name = %s", (name,))[0]
+    assert server_stock == stock_a + stock_b
+    mapped = ConnectionServer._fetch("SELECT till_id, code FROM till_products WHERE till_code = %s ORDER BY till_id",
+                                     (code,))
+    assert mapped == [("A", server_code), ("B", server_code)]
+
+
+def test_replayed_movements_are_applied_once(server, tmp_path):
+    openTill(tmp_path, "A")
+    assert SyncEngine.run()["error"] is None
+    before = ConnectionServer._fetch("SELECT sum(stock) FROM products")
+
+    query = QtSql.QSqlQuery()
+    assert query.exec(f"SELECT {columnList(StockMovementRow)} FROM stock_movements")
+    movements = fetchRows(query, StockMovementRow)
+    ConnectionServer.applyChanges("A", [("stock_movements", StockMovementRow, movements)], [])
+
+    assert ConnectionServer._fetch("SELECT sum(stock) FROM products") == before
+    assert SyncEngine.pending() == 0
+
+
+def test_renamed_product_keeps_its_server_row(server, tmp_path):
+    openTill(tmp_path, "A")
+    code = localValue("SELECT code FROM products ORDER BY code LIMIT 1")
+    assert SyncEngine.run()["error"] is None
+    count = ConnectionServer._fetch("SELECT count(*) FROM products")
+
+    query = QtSql.QSqlQuery()
+    assert query.exec(f"UPDATE products SET name = 'Renamed on A' WHERE code = {code}")
+    assert SyncEngine.run()["error"] is None
+
+    assert ConnectionServer._fetch("SELECT count(*) FROM products") == count
+    assert ConnectionServer._fetch("SELECT p.name FROM products p JOIN till_products tp ON tp.code = p.code "
+                                   "WHERE tp.till_id = 'A' AND tp.till_code = %s", (code,)) == [("Renamed on A",)]
@@ -0,0 +1,61 @@
+"""
+    TabLoader: the current tab is loaded first and the hidden tabs wait for its
+    background reads, or for FALLBACK_MS when they take longer.
+"""
+import time
+
+import pytest
+from PyQt6 import QtCore, QtWidgets
+
+from queryExecutor import QueryExecutor
+from tabLoader import TabLoader
+
+
+def wait(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        QtCore.QCoreApplication.processEvents()
+    return condition()
+
+
+@pytest.fixture
+def tabs(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(TabLoader, "_loaders", {})
+    monkeypatch.setattr(TabLoader, "_loaded", set())
+    tabs = QtWidgets.QTabWidget()
+    for _ in range(3):
+        tabs.addTab(QtWidgets.QWidget(), "")
+    executor = QueryExecutor(str(tmp_path / "unused.sqlite"))
+    yield tabs, executor
+    executor.reset()
+    monkeypatch.setattr(TabLoader, "_tabs", None)
+
+
+def load(tabs, executor, read_seconds):
+    """Opens on the middle tab, whose data is read on the executor."""
+    def read():
+        executor.submit("middle", lambda db=None: time.sleep(read_seconds), local=False)
+
+    TabLoader.register(tabs.widget(0), "first tab")
+    TabLoader.register(tabs.widget(1), "middle tab", read, reads=("middle",))
+    TabLoader.register(tabs.widget(2), "last tab")
+    tabs.setCurrentIndex(1)
+    TabLoader.begin()
+    TabLoader.start(tabs, executor)
+    TabLoader.firstPaint()
+    assert wait(lambda: "all tabs" in labels() and "middle read" in labels())
+
+
+def labels():
+    return [label for label, _ in TabLoader.timeline()]
+
+
+def test_hidden_tabs_wait_for_the_reads_of_the_current_tab(tabs):
+    load(*tabs, read_seconds=0.1)
+    assert labels() == ["start", "first paint", "middle tab", "middle read", "first tab", "last tab", "all tabs"]
+
+
+def test_slow_reads_hold_the_hidden_tabs_back_for_the_fallback_only(tabs, monkeypatch):
+    monkeypatch.setattr(TabLoader, "FALLBACK_MS", 50)
+    load(*tabs, read_seconds=1)
+    assert labels() == ["start", "first paint", "middle tab", "first tab", "last tab", "all tabs", "middle read"]
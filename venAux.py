@@ -6,8 +6,13 @@ import styles
 from dlgCalendar import *
 from dlgAbout import *
 from dlgSettings import *
+from dlgQueryStats import *
 from datetime import  datetime
 from connection import Connection
+from sqliteProfile import SqliteProfile
+from queryStats import QueryStats
+from statementCache import StatementCache
+from tabLoader import TabLoader
 
 from events import Events
 
@@ -34,6 +39,48 @@ class About(QtWidgets.QDialog):
         self.setStyleSheet(styles.load_stylesheet())
 
 
+class QueryStatsDialog(QtWidgets.QDialog):
+    def __init__(self):
+        super(QueryStatsDialog, self).__init__()
+        self.ui = Ui_dlgQueryStats()
+        self.ui.setupUi(self)
+        self.ui.btn_refresh_query_stats.clicked.connect(self.loadStats)
+        self.ui.btn_reset_query_stats.clicked.connect(self.resetStats)
+        self.ui.btn_close_query_stats.clicked.connect(self.hide)
+        self.setStyleSheet(styles.load_stylesheet())
+
+    def loadStats(self):
+        """
+            Fills the table with the aggregates recorded by QueryStats.
+        """
+        try:
+            all_stats = QueryStats.summary()
+            table = self.ui.table_query_stats
+            table.setRowCount(len(all_stats))
+            for index, stats in enumerate(all_stats):
+                values = [stats["method"], str(stats["count"]), f"{stats['total_ms']:.1f}", f"{stats['p50_ms']:.2f}",
+                          f"{stats['p95_ms']:.2f}", f"{stats['max_ms']:.2f}", str(stats["rows"])]
+                for column, value in enumerate(values):
+                    item = QtWidgets.QTableWidgetItem(value)
+                    if column > 0:
+                        item.setTextAlignment(QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter)
+                    table.setItem(index, column, item)
+            table.resizeColumnsToContents()
+
+            cache = StatementCache.stats()
+            threshold = "disabled" if QueryStats.threshold_ms < 0 else f"{QueryStats.threshold_ms:g} ms"
+            self.ui.lbl_query_stats_summary.setText(
+                f"Slow query log: {threshold} ({QueryStats.LOG_PATH})    "
+                f"Statement cache: {cache['size']} statements, {cache['hit_rate']:.0%} hits\n"
+                f"Startup: {TabLoader.summary()}")
+        except Exception as error:
+            print("Error QueryStatsDialog.loadStats: ", error)
+
+    def resetStats(self):
+        QueryStats.reset()
+        self.loadStats()
+
+
 class FileDialog(QtWidgets.QFileDialog):
     def __init__(self):
         super(FileDialog, self).__init__()
@@ -48,6 +95,7 @@ class Settings(QtWidgets.QDialog):
         self.setStyleSheet(styles.load_stylesheet())
 
         self.loadAllStyles()
+        self.loadDbProfiles()
 
     @staticmethod
     def loadSettings():
@@ -65,6 +113,12 @@ class Settings(QtWidgets.QDialog):
         globals.settings_ui.cb_themes.clear()
         globals.settings_ui.cb_themes.addItems(styles.get_all_styles())
 
+    @staticmethod
+    def loadDbProfiles():
+        globals.settings_ui.cb_db_profile.clear()
+        globals.settings_ui.cb_db_profile.addItems(list(SqliteProfile.PRESETS))
+        globals.settings_ui.cb_db_profile.setCurrentText(SqliteProfile.DEFAULT)
+
     @staticmethod
     def displayCurrentSettings(data):
 
@@ -72,3 +126,7 @@ class Settings(QtWidgets.QDialog):
             if key == "theme":
                 print(value)
                 globals.settings_ui.cb_themes.setCurrentText(str(value))
+            elif key == SqliteProfile.SETTING_KEY:
+                globals.settings_ui.cb_db_profile.setCurrentText(str(value))
+
+        globals.settings_ui.lbl_db_profile_status.setText(SqliteProfile.summary())
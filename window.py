@@ -201,7 +201,13 @@ class Ui_window(object):
         self.lbl_list_cust.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         self.lbl_list_cust.setObjectName("lbl_list_cust")
         self.verticalLayout_3.addWidget(self.lbl_list_cust)
-        self.table_customer = QtWidgets.QTableWidget(parent=self.tab_customer)
+        self.le_filter_customer = QtWidgets.QLineEdit(parent=self.tab_customer)
+        self.le_filter_customer.setMinimumSize(QtCore.QSize(100, 25))
+        self.le_filter_customer.setMaximumSize(QtCore.QSize(999999, 25))
+        self.le_filter_customer.setClearButtonEnabled(True)
+        self.le_filter_customer.setObjectName("le_filter_customer")
+        self.verticalLayout_3.addWidget(self.le_filter_customer)
+        self.table_customer = QtWidgets.QTableView(parent=self.tab_customer)
         self.table_customer.setEnabled(True)
         self.table_customer.setMinimumSize(QtCore.QSize(100, 100))
         self.table_customer.setMaximumSize(QtCore.QSize(999999, 401))
@@ -209,22 +215,6 @@ class Ui_window(object):
         self.table_customer.setAlternatingRowColors(True)
         self.table_customer.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
         self.table_customer.setObjectName("table_customer")
-        self.table_customer.setColumnCount(7)
-        self.table_customer.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(5, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_customer.setHorizontalHeaderItem(6, item)
         self.table_customer.verticalHeader().setVisible(False)
         self.verticalLayout_3.addWidget(self.table_customer)
         self.horizontalLayout_2.addLayout(self.verticalLayout_3)
@@ -365,20 +355,12 @@ class Ui_window(object):
         self.btn_clear_invoice.setObjectName("btn_clear_invoice")
         self.horizontalLayout_4.addWidget(self.btn_clear_invoice)
         self.vLayout_left.addLayout(self.horizontalLayout_4)
-        self.table_invoice = QtWidgets.QTableWidget(parent=self.frame_invoice_list)
+        self.table_invoice = QtWidgets.QTableView(parent=self.frame_invoice_list)
         self.table_invoice.setMouseTracking(False)
         self.table_invoice.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table_invoice.setAlternatingRowColors(True)
         self.table_invoice.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
         self.table_invoice.setObjectName("table_invoice")
-        self.table_invoice.setColumnCount(3)
-        self.table_invoice.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_invoice.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_invoice.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.table_invoice.setHorizontalHeaderItem(2, item)
         self.table_invoice.verticalHeader().setVisible(False)
         self.vLayout_left.addWidget(self.table_invoice)
         self.hLayout_main_invoicing.addWidget(self.frame_invoice_list)
@@ -527,6 +509,10 @@ class Ui_window(object):
         icon5.addPixmap(QtGui.QPixmap(".\\templates\\../img/backup-restore.svg"), QtGui.QIcon.Mode.Normal, QtGui.QIcon.State.Off)
         self.actionRestoreBackup.setIcon(icon5)
         self.actionRestoreBackup.setObjectName("actionRestoreBackup")
+        self.actionSyncServer = QtGui.QAction(parent=window)
+        self.actionSyncServer.setObjectName("actionSyncServer")
+        self.actionQueryStats = QtGui.QAction(parent=window)
+        self.actionQueryStats.setObjectName("actionQueryStats")
         self.actionSettings = QtGui.QAction(parent=window)
         icon6 = QtGui.QIcon()
         icon6.addPixmap(QtGui.QPixmap(".\\templates\\../img/setting.svg"), QtGui.QIcon.Mode.Normal, QtGui.QIcon.State.Off)
@@ -542,6 +528,10 @@ class Ui_window(object):
         self.actionProductLowStockReport.setObjectName("actionProductLowStockReport")
         self.actionProductbyfamilyReport = QtGui.QAction(parent=window)
         self.actionProductbyfamilyReport.setObjectName("actionProductbyfamilyReport")
+        self.actionInvoiceReport = QtGui.QAction(parent=window)
+        self.actionInvoiceReport.setObjectName("actionInvoiceReport")
+        self.actionRevenueByFamilyReport = QtGui.QAction(parent=window)
+        self.actionRevenueByFamilyReport.setObjectName("actionRevenueByFamilyReport")
         self.menuExport_Data.addAction(self.actionExportCustomers)
         self.menuFile.addAction(self.actionSettings)
         self.menuFile.addAction(self.menuExport_Data.menuAction())
@@ -549,6 +539,9 @@ class Ui_window(object):
         self.menuFile.addAction(self.actionExit)
         self.menuTools.addAction(self.actionBackup)
         self.menuTools.addAction(self.actionRestoreBackup)
+        self.menuTools.addSeparator()
+        self.menuTools.addAction(self.actionSyncServer)
+        self.menuTools.addAction(self.actionQueryStats)
         self.menuReports.addAction(self.actionCustomerReport)
         self.menuReports.addSeparator()
         self.menuReports.addAction(self.actionProductReport)
@@ -556,6 +549,8 @@ class Ui_window(object):
         self.menuReports.addAction(self.actionProductbyfamilyReport)
         self.menuReports.addSeparator()
         self.menuReports.addAction(self.actionTicketReport)
+        self.menuReports.addAction(self.actionInvoiceReport)
+        self.menuReports.addAction(self.actionRevenueByFamilyReport)
         self.menuAbout.addAction(self.dlg_about)
         self.menubar.addAction(self.menuFile.menuAction())
         self.menubar.addAction(self.menuTools.menuAction())
@@ -585,7 +580,8 @@ class Ui_window(object):
         window.setTabOrder(self.btn_save_cust, self.btn_modify_cust)
         window.setTabOrder(self.btn_modify_cust, self.btn_del_cust)
         window.setTabOrder(self.btn_del_cust, self.btn_clear)
-        window.setTabOrder(self.btn_clear, self.table_customer)
+        window.setTabOrder(self.btn_clear, self.le_filter_customer)
+        window.setTabOrder(self.le_filter_customer, self.table_customer)
         window.setTabOrder(self.table_customer, self.pan_main)
         window.setTabOrder(self.pan_main, self.le_name_product)
         window.setTabOrder(self.le_name_product, self.cb_family)
@@ -618,20 +614,7 @@ class Ui_window(object):
         self.btn_del_cust.setText(_translate("window", "Delete"))
         self.btn_clear.setText(_translate("window", "Clear"))
         self.lbl_list_cust.setText(_translate("window", "Customer List"))
-        item = self.table_customer.horizontalHeaderItem(0)
-        item.setText(_translate("window", "Surname"))
-        item = self.table_customer.horizontalHeaderItem(1)
-        item.setText(_translate("window", "Name"))
-        item = self.table_customer.horizontalHeaderItem(2)
-        item.setText(_translate("window", "Mobile"))
-        item = self.table_customer.horizontalHeaderItem(3)
-        item.setText(_translate("window", "Province"))
-        item = self.table_customer.horizontalHeaderItem(4)
-        item.setText(_translate("window", "City"))
-        item = self.table_customer.horizontalHeaderItem(5)
-        item.setText(_translate("window", "Invoice Type"))
-        item = self.table_customer.horizontalHeaderItem(6)
-        item.setText(_translate("window", "Status"))
+        self.le_filter_customer.setPlaceholderText(_translate("window", "Filter by surname, name, mobile or city"))
         self.pan_main.setTabText(self.pan_main.indexOf(self.tab_customer), _translate("window", "Customers"))
         self.lbl_name_product.setText(_translate("window", "name:"))
         self.lbl_unit_price.setText(_translate("window", "unit price:"))
@@ -663,12 +646,6 @@ class Ui_window(object):
         self.btn_save_invoice.setText(_translate("window", "Save"))
         self.btn_delete_invoice.setText(_translate("window", "Delete"))
         self.btn_clear_invoice.setText(_translate("window", "Clear"))
-        item = self.table_invoice.horizontalHeaderItem(0)
-        item.setText(_translate("window", "Nº Factura"))
-        item = self.table_invoice.horizontalHeaderItem(1)
-        item.setText(_translate("window", "DNI"))
-        item = self.table_invoice.horizontalHeaderItem(2)
-        item.setText(_translate("window", "Date"))
         self.label_4.setText(_translate("window", "Name:"))
         self.label_6.setText(_translate("window", "Phone:"))
         self.label_5.setText(_translate("window", "Address:"))
@@ -704,6 +681,8 @@ class Ui_window(object):
         self.actionBackup.setShortcut(_translate("window", "Ctrl+B"))
         self.actionRestoreBackup.setText(_translate("window", "Restore Backup"))
         self.actionRestoreBackup.setShortcut(_translate("window", "Ctrl+R"))
+        self.actionSyncServer.setText(_translate("window", "Sync with Server"))
+        self.actionQueryStats.setText(_translate("window", "Query Statistics"))
         self.actionSettings.setText(_translate("window", "Settings"))
         self.actionSettings.setShortcut(_translate("window", "Ctrl+S"))
         self.actionExportCustomers.setText(_translate("window", "Customers"))
@@ -711,3 +690,5 @@ class Ui_window(object):
         self.actionTicketReport.setText(_translate("window", "Ticket Report"))
         self.actionProductLowStockReport.setText(_translate("window", "Product with low stock Report"))
         self.actionProductbyfamilyReport.setText(_translate("window", "Product by family Report"))
+        self.actionInvoiceReport.setText(_translate("window", "Invoice Report"))
+        self.actionRevenueByFamilyReport.setText(_translate("window", "Revenue by Family (Last Quarter)"))